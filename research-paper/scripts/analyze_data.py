@@ -6,313 +6,369 @@ for 3-user co-located VR training system using Meta Quest 3 headsets.
 
 ⚠️ WARNING: This script analyzes MOCK DATA for demonstration purposes.
 No actual user studies have been conducted.
+
+The analysis is split into sections that can be run on their own. The text
+sections only need pandas; matplotlib and seaborn are imported when the
+figures section runs, so a text-only summary starts quickly.
+
+Usage:
+    python analyze_data.py [session_dir] [--output-dir DIR] [--sections rq12 rq3 rq45 summary]
+                           [--workers N] [--force]
+    python analyze_data.py --text-only
 """
 
+import os
+import sys
+import argparse
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-import os
-import glob
-
-# Set style
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (10, 6)
-plt.rcParams['font.size'] = 10
-
-# Create output directory
-os.makedirs('../figures', exist_ok=True)
-
-print("="*70)
-print("DATA ANALYSIS")
-print("="*70)
-print("This analysis uses collected data to demonstrate MetricsLogger")
-print("capabilities and expected performance patterns.")
-print("="*70 + "\n")
-
-# Load real data from all three headsets
-print("Loading datasets...")
-
-# Find all CSV files in session directory
-session_dir = '../data/sessions/20251209'
-headset_files = []
-for root, dirs, files in os.walk(session_dir):
-    for file in files:
-        if file.endswith(".csv") and "session_" in file:
-             headset_files.append(os.path.join(root, file))
-
-if not headset_files:
-    print(f"ERROR: No data files found in {session_dir}")
-    exit(1)
-
-# Load and merge data from all headsets
-tech_perf_list = []
-for file in headset_files:
-    df = pd.read_csv(file)
-    # Ensure headset_id is correct (it's in the CSV, but let's double check)
-    # df['headset_id'] is already there
-    
+
+from metrics_io import read_metrics_csv, find_session_csvs, concat_metrics_frames
+from analyze_metrics import split_by_headset
+from metrics_plot import plot_series, density_scatter
+from metrics_drift import DRIFT_COLUMNS, drift_summary
+from metrics_correlation import correlation_matrix, correlation_table
+from figure_pipeline import FigureJob, render_figures
+from session_index import DEFAULT_SESSIONS_ROOT, update_index, latest_session_folder, select_sessions
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIGURES_DIR = os.path.join(SCRIPT_DIR, '..', 'figures')
+DEMO_DATA_DIR = os.path.join(SCRIPT_DIR, '..', 'data', 'mock_session_demo')
+
+# Only the columns used by the sections below are parsed
+TECH_PERF_COLUMNS = [
+    'session_id',
+    'headset_id',
+    'timestamp_sec',
+    'frame_rate_fps',
+    'network_latency_ms',
+    'calibration_error_mm',
+    'battery_temp_c',
+    'headset_temp_c',
+]
+
+# Drift columns with the temperature under its mapped name, which older logs also have
+STABILITY_DRIFT_COLUMNS = ['headset_temp_c' if c == 'battery_temp_c' else c for c in DRIFT_COLUMNS]
+
+# Report sections in run order; 'figures' is the only one that needs matplotlib
+SECTIONS = ['rq12', 'rq3', 'rq45', 'figures', 'summary']
+TEXT_SECTIONS = [s for s in SECTIONS if s != 'figures']
+
+
+def find_headset_files(session_dir: str = None, sessions_root: str = DEFAULT_SESSIONS_ROOT) -> list:
+    """
+    CSV files to analyze: those in ``session_dir``, or by default the most
+    recent session folder in the session index (see session_index.py for
+    date/headset filters).
+    """
+    if session_dir:
+        return find_session_csvs(session_dir)
+    update_index(sessions_root)
+    session_folder = latest_session_folder(sessions_root)
+    if session_folder is None:
+        return []
+    return select_sessions(sessions_root, session_folder=session_folder)['path'].tolist()
+
+
+def _map_temperature(df: pd.DataFrame) -> pd.DataFrame:
     # Map column names if necessary
     if 'battery_temp_c' in df.columns and 'headset_temp_c' not in df.columns:
         df['headset_temp_c'] = df['battery_temp_c']
-        
-    tech_perf_list.append(df)
-
-tech_perf = pd.concat(tech_perf_list, ignore_index=True)
-
-# Try to load demo performance and calibration data, or create empty/mock if missing
-try:
-    demo_perf = pd.read_csv('../data/mock_session_demo/demo_performance.csv')
-    calib_acc = pd.read_csv('../data/mock_session_demo/calibration_log.csv')
-except FileNotFoundError:
-    print("Warning: Demo performance or calibration logs not found. Skipping those sections.")
-    demo_perf = pd.DataFrame()
-    calib_acc = pd.DataFrame(columns=['calibration_type', 'alignment_error_mm']) # Empty with expected columns
+    return df
+
+
+def load_tech_perf(headset_files: list, session_dir: str = None) -> pd.DataFrame:
+    """
+    Load and merge the technical performance data from all headsets.
+
+    With ``session_dir``, the session's merged Parquet store is read instead
+    of the CSVs when it is current for ``headset_files``.
+    """
+    if session_dir:
+        from metrics_store import read_current_store
+        stored = read_current_store(session_dir, headset_files, columns=TECH_PERF_COLUMNS)
+        if stored is not None:
+            return _map_temperature(stored)
+    tech_perf_list = [read_metrics_csv(file, columns=TECH_PERF_COLUMNS) for file in headset_files]
+    return _map_temperature(concat_metrics_frames(tech_perf_list, report=True))
+
+
+def load_demo_data(demo_dir: str = DEMO_DATA_DIR) -> tuple:
+    """Load demo performance and calibration logs, or empty frames if missing."""
+    try:
+        demo_perf = pd.read_csv(os.path.join(demo_dir, 'demo_performance.csv'))
+        calib_acc = pd.read_csv(os.path.join(demo_dir, 'calibration_log.csv'))
+    except FileNotFoundError:
+        print("Warning: Demo performance or calibration logs not found. Skipping those sections.")
+        demo_perf = pd.DataFrame()
+        calib_acc = pd.DataFrame(columns=['calibration_type', 'alignment_error_mm']) # Empty with expected columns
+    return demo_perf, calib_acc
+
+
+def temperature_correlations(tech_perf: pd.DataFrame) -> dict:
+    """Pearson r of headset temperature against FPS, calibration error and latency."""
+    corr = correlation_matrix(tech_perf, ['headset_temp_c', 'frame_rate_fps', 'calibration_error_mm',
+                                          'network_latency_ms'])['headset_temp_c']
+    return {
+        'fps': corr['frame_rate_fps'],
+        'calibration': corr['calibration_error_mm'],
+        'latency': corr['network_latency_ms'],
+    }
 
-print(f"Technical Performance: {len(tech_perf)} measurements from {tech_perf['headset_id'].nunique()} headsets")
-print(f"Demo Performance: {len(demo_perf)} demo scenarios")
-print(f"Calibration Accuracy: {len(calib_acc)} calibration events")
 
 # ============================================
 # RQ1 & RQ2: Technical Performance Analysis
 # ============================================
 
-print("\n" + "=" * 60)
-print("RQ1 & RQ2: Technical Performance Capabilities")
-print("=" * 60)
-
-# Network Latency Analysis
-print("\nNetwork Latency Statistics (ms):")
-print(f"  Mean: {tech_perf['network_latency_ms'].mean():.1f}ms")
-print(f"  Std Dev: {tech_perf['network_latency_ms'].std():.1f}ms")
-print(f"  Min: {tech_perf['network_latency_ms'].min():.1f}ms")
-print(f"  Max: {tech_perf['network_latency_ms'].max():.1f}ms")
-print(f"\n  Target: ≤75ms (Van Damme et al.)")
-print(f"  Achievement: {(tech_perf['network_latency_ms'] <= 75).mean() * 100:.1f}% of measurements")
-
-# Frame Rate Analysis
-print("\nFrame Rate Statistics (fps):")
-print(f"  Mean: {tech_perf['frame_rate_fps'].mean():.1f}fps")
-print(f"  Std Dev: {tech_perf['frame_rate_fps'].std():.1f}fps")
-print(f"  Min: {tech_perf['frame_rate_fps'].min():.1f}fps")
-print(f"  Max: {tech_perf['frame_rate_fps'].max():.1f}fps")
-print(f"\n  Target: ≥90fps")
-print(f"  Achievement: {(tech_perf['frame_rate_fps'] >= 90).mean() * 100:.1f}% of measurements")
-print(f"  Note: Slight degradation due to thermal effects over 20min session")
-
-# Calibration Accuracy Analysis
-print("\nCalibration Accuracy Statistics (mm):")
-if 'calibration_error_mm' in tech_perf.columns:
-    calib_data = tech_perf['calibration_error_mm']
-    # Filter out 0s if they represent uninitialized state, or keep them if valid. 
-    # Usually 0.0 means perfect or not yet set. Let's assume valid for now or filter > 0 if needed.
-    # But let's stick to simple stats.
-    print(f"  Mean: {calib_data.mean():.2f}mm")
-    print(f"  Std Dev: {calib_data.std():.2f}mm")
-    print(f"  Range: {calib_data.min():.2f}-{calib_data.max():.2f}mm")
-    print(f"\n  Target: <10mm (Reimer et al.)")
-    print(f"  Achievement: {(calib_data < 10).mean() * 100:.1f}% of measurements")
-else:
-    print("  No calibration data available.")
-
-# initial_calib = calib_acc[calib_acc['calibration_type'] == 'initial']
-# recalib = calib_acc[calib_acc['calibration_type'] == 'recalibration']
-
-# print("\nCalibration Accuracy Statistics (mm):")
-# print(f"  Initial Alignment:")
-# print(f"    Mean: {initial_calib['alignment_error_mm'].mean():.2f}mm")
-# print(f"    Std Dev: {initial_calib['alignment_error_mm'].std():.2f}mm")
-# print(f"    Range: {initial_calib['alignment_error_mm'].min():.2f}-{initial_calib['alignment_error_mm'].max():.2f}mm")
-# if len(recalib) > 0:
-#     print(f"  After Recalibration:")
-#     print(f"    Error: {recalib['alignment_error_mm'].iloc[0]:.2f}mm")
-# print(f"\n  Target: <10mm (Reimer et al.)")
-# print(f"  Status: ✓ All calibrations within safety threshold")
+def report_technical_performance(tech_perf: pd.DataFrame):
+    print("\n" + "=" * 60)
+    print("RQ1 & RQ2: Technical Performance Capabilities")
+    print("=" * 60)
+
+    # Network Latency Analysis
+    print("\nNetwork Latency Statistics (ms):")
+    print(f"  Mean: {tech_perf['network_latency_ms'].mean():.1f}ms")
+    print(f"  Std Dev: {tech_perf['network_latency_ms'].std():.1f}ms")
+    print(f"  Min: {tech_perf['network_latency_ms'].min():.1f}ms")
+    print(f"  Max: {tech_perf['network_latency_ms'].max():.1f}ms")
+    print(f"\n  Target: ≤75ms (Van Damme et al.)")
+    print(f"  Achievement: {(tech_perf['network_latency_ms'] <= 75).mean() * 100:.1f}% of measurements")
+
+    # Frame Rate Analysis
+    print("\nFrame Rate Statistics (fps):")
+    print(f"  Mean: {tech_perf['frame_rate_fps'].mean():.1f}fps")
+    print(f"  Std Dev: {tech_perf['frame_rate_fps'].std():.1f}fps")
+    print(f"  Min: {tech_perf['frame_rate_fps'].min():.1f}fps")
+    print(f"  Max: {tech_perf['frame_rate_fps'].max():.1f}fps")
+    print(f"\n  Target: ≥90fps")
+    print(f"  Achievement: {(tech_perf['frame_rate_fps'] >= 90).mean() * 100:.1f}% of measurements")
+    print(f"  Note: Slight degradation due to thermal effects over 20min session")
+
+    # Calibration Accuracy Analysis
+    print("\nCalibration Accuracy Statistics (mm):")
+    if 'calibration_error_mm' in tech_perf.columns:
+        calib_data = tech_perf['calibration_error_mm']
+        # Filter out 0s if they represent uninitialized state, or keep them if valid.
+        # Usually 0.0 means perfect or not yet set. Let's assume valid for now or filter > 0 if needed.
+        # But let's stick to simple stats.
+        print(f"  Mean: {calib_data.mean():.2f}mm")
+        print(f"  Std Dev: {calib_data.std():.2f}mm")
+        print(f"  Range: {calib_data.min():.2f}-{calib_data.max():.2f}mm")
+        print(f"\n  Target: <10mm (Reimer et al.)")
+        print(f"  Achievement: {(calib_data < 10).mean() * 100:.1f}% of measurements")
+    else:
+        print("  No calibration data available.")
+
+    # initial_calib = calib_acc[calib_acc['calibration_type'] == 'initial']
+    # recalib = calib_acc[calib_acc['calibration_type'] == 'recalibration']
+
+    # print("\nCalibration Accuracy Statistics (mm):")
+    # print(f"  Initial Alignment:")
+    # print(f"    Mean: {initial_calib['alignment_error_mm'].mean():.2f}mm")
+    # print(f"    Std Dev: {initial_calib['alignment_error_mm'].std():.2f}mm")
+    # print(f"    Range: {initial_calib['alignment_error_mm'].min():.2f}-{initial_calib['alignment_error_mm'].max():.2f}mm")
+    # if len(recalib) > 0:
+    #     print(f"  After Recalibration:")
+    #     print(f"    Error: {recalib['alignment_error_mm'].iloc[0]:.2f}mm")
+    # print(f"\n  Target: <10mm (Reimer et al.)")
+    # print(f"  Status: ✓ All calibrations within safety threshold")
+
 
 # ============================================
 # RQ3: Demo Scenario Performance
 # ============================================
 
-print("\n" + "=" * 60)
-print("RQ3: Demo Scenario Execution")
-print("=" * 60)
-
-for idx, row in demo_perf.iterrows():
-    print(f"\n{row['demo_scenario']}:")
-    print(f"  Completion Time: {row['completion_time_sec']}s")
-    if 'anchor_creation_time_sec' in row:
-        print(f"  Anchor Creation: {row['anchor_creation_time_sec']}s")
-        print(f"  Anchor Discovery: {row['anchor_discovery_time_sec']}s")
-    if 'room_anchor_sync_time_sec' in row:
-        print(f"  Room Sync Time: {row['room_anchor_sync_time_sec']}s")
-    print(f"  Coordination Events: {row['coordination_events']}")
-    print(f"  Communication Events: {row['communication_events']}")
-    print(f"  Success: {'✓ Yes' if row['demo_success'] else '✗ No'}")
-    print(f"  Notes: {row['observer_notes']}")
+def report_demo_scenarios(demo_perf: pd.DataFrame):
+    print("\n" + "=" * 60)
+    print("RQ3: Demo Scenario Execution")
+    print("=" * 60)
+
+    for idx, row in demo_perf.iterrows():
+        print(f"\n{row['demo_scenario']}:")
+        print(f"  Completion Time: {row['completion_time_sec']}s")
+        if 'anchor_creation_time_sec' in row:
+            print(f"  Anchor Creation: {row['anchor_creation_time_sec']}s")
+            print(f"  Anchor Discovery: {row['anchor_discovery_time_sec']}s")
+        if 'room_anchor_sync_time_sec' in row:
+            print(f"  Room Sync Time: {row['room_anchor_sync_time_sec']}s")
+        print(f"  Coordination Events: {row['coordination_events']}")
+        print(f"  Communication Events: {row['communication_events']}")
+        print(f"  Success: {'✓ Yes' if row['demo_success'] else '✗ No'}")
+        print(f"  Notes: {row['observer_notes']}")
+
 
 # ============================================
 # RQ4 & RQ5: Performance Stability Analysis
 # ============================================
 
-print("\n" + "=" * 60)
-print("RQ4 & RQ5: Performance Stability and Hardware Limitations")
-print("=" * 60)
-
-# Calculate drift rates
-print("\nPerformance Drift Analysis:")
-
-# Analyze drift per headset
-for headset in sorted(tech_perf['headset_id'].unique()):
-    headset_data = tech_perf[tech_perf['headset_id'] == headset].sort_values('timestamp_sec')
-    
-    # Frame rate degradation
-    fps_initial = headset_data['frame_rate_fps'].head(60).mean()  # First minute average
-    fps_final = headset_data['frame_rate_fps'].tail(60).mean()    # Last minute average
-    fps_drift = fps_initial - fps_final
-    
-    # Calibration drift
-    calib_initial = headset_data['calibration_error_mm'].head(60).mean()
-    calib_final = headset_data['calibration_error_mm'].tail(60).mean()
-    calib_drift = calib_final - calib_initial
-    
-    # Latency variance
-    latency_jitter = headset_data['network_latency_ms'].std()
-    
-    # Temperature increase
-    temp_initial = headset_data['headset_temp_c'].head(60).mean()
-    temp_final = headset_data['headset_temp_c'].tail(60).mean()
-    temp_increase = temp_final - temp_initial
-    
-    duration = (headset_data['timestamp_sec'].max() - headset_data['timestamp_sec'].min()) / 60
-    
-    print(f"\n{headset} ({duration:.0f}min session):")
-    print(f"  FPS drift: -{fps_drift:.2f}fps ({fps_drift/duration:.3f}fps/min)")
-    print(f"  Calibration drift: +{calib_drift:.2f}mm ({calib_drift/duration:.3f}mm/min)")
-    print(f"  Latency jitter (SD): {latency_jitter:.2f}ms")
-    print(f"  Temperature increase: +{temp_increase:.1f}°C")
-    print(f"  Final FPS: {fps_final:.1f} ({'✓ PASS' if fps_final >= 85 else '⚠ WARNING'})")
-
-# Correlation analysis
-print("\nCorrelation Analysis: Temperature vs Performance:")
-temp_fps_corr = tech_perf['headset_temp_c'].corr(tech_perf['frame_rate_fps'])
-temp_calib_corr = tech_perf['headset_temp_c'].corr(tech_perf['calibration_error_mm'])
-temp_latency_corr = tech_perf['headset_temp_c'].corr(tech_perf['network_latency_ms'])
-
-print(f"  Temperature vs FPS: r={temp_fps_corr:.3f} (negative correlation expected)")
-print(f"  Temperature vs Calibration Error: r={temp_calib_corr:.3f}")
-print(f"  Temperature vs Latency: r={temp_latency_corr:.3f}")
+def report_stability(tech_perf: pd.DataFrame):
+    print("\n" + "=" * 60)
+    print("RQ4 & RQ5: Performance Stability and Hardware Limitations")
+    print("=" * 60)
+
+    # Calculate drift rates over the first and last minute of each headset session
+    print("\nPerformance Drift Analysis:")
+    drift = drift_summary(tech_perf, columns=STABILITY_DRIFT_COLUMNS)
+
+    for _, row in drift.iterrows():
+        duration = row['duration_min']
+        fps_drift = -row['frame_rate_fps_drift']
+        calib_drift = row['calibration_error_mm_drift']
+        fps_final = row['frame_rate_fps_final']
+
+        print(f"\n{row['headset_id']} session {row['session_id']} ({duration:.0f}min):")
+        print(f"  FPS drift: -{fps_drift:.2f}fps ({fps_drift/duration:.3f}fps/min)")
+        print(f"  Calibration drift: +{calib_drift:.2f}mm ({calib_drift/duration:.3f}mm/min)")
+        print(f"  Latency jitter (SD): {row['latency_jitter_ms']:.2f}ms")
+        print(f"  Temperature increase: +{row['headset_temp_c_drift']:.1f}°C")
+        print(f"  Final FPS: {fps_final:.1f} ({'✓ PASS' if fps_final >= 85 else '⚠ WARNING'})")
+        if pd.notna(row['frame_rate_fps_worst_window']):
+            print(f"  Worst 1-min FPS: {row['frame_rate_fps_worst_window']:.1f}")
+        if pd.notna(row['frame_rate_fps_onset_min']):
+            print(f"  FPS degradation onset: minute {row['frame_rate_fps_onset_min']:.1f} "
+                  f"({row['frame_rate_fps_before']:.1f} -> {row['frame_rate_fps_after']:.1f}fps)")
+
+    # Correlation analysis
+    print("\nCorrelation Analysis: Temperature vs Performance:")
+    corr = temperature_correlations(tech_perf)
+    print(f"  Temperature vs FPS: r={corr['fps']:.3f} (negative correlation expected)")
+    print(f"  Temperature vs Calibration Error: r={corr['calibration']:.3f}")
+    print(f"  Temperature vs Latency: r={corr['latency']:.3f}")
+
+    # Per-headset uncertainty; the samples are autocorrelated, hence the block bootstrap
+    print("\nTemperature vs FPS per headset (95% block-bootstrap CI):")
+    table = correlation_table(tech_perf, columns=['headset_temp_c', 'frame_rate_fps'],
+                              replicates=1000, seed=0, workers=1)
+    for _, row in table.iterrows():
+        print(f"  {row['headset_id']}: r={row['r']:.3f} [{row['ci_low']:.3f}, {row['ci_high']:.3f}] "
+              f"(n={row['n']:,})")
+
 
 # ============================================
 # Generate Visualizations
 # ============================================
 
-print("\n" + "=" * 60)
-print("Generating Figures...")
-print("=" * 60)
-
-# Figure 1: Technical Performance Overview (2x2 grid)
-fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-
-# Network Latency Over Time
-ax1 = axes[0, 0]
-for headset in sorted(tech_perf['headset_id'].unique()):
-    headset_data = tech_perf[tech_perf['headset_id'] == headset].sort_values('timestamp_sec')
-    ax1.plot(headset_data['timestamp_sec'] / 60, headset_data['network_latency_ms'],
-            linewidth=1.5, alpha=0.7, label=headset)
-ax1.axhline(y=75, color='g', linestyle='--', linewidth=2.5, label='Good QoE (≤75ms)')
-ax1.set_xlabel('Time (minutes)', fontsize=11, fontweight='bold')
-ax1.set_ylabel('Network Latency (ms)', fontsize=11, fontweight='bold')
-ax1.set_title('Network Performance', fontsize=12, fontweight='bold')
-ax1.legend(fontsize=9)
-ax1.grid(True, alpha=0.3)
-
-# Frame Rate Over Time
-ax2 = axes[0, 1]
-for headset in sorted(tech_perf['headset_id'].unique()):
-    headset_data = tech_perf[tech_perf['headset_id'] == headset].sort_values('timestamp_sec')
-    ax2.plot(headset_data['timestamp_sec'] / 60, headset_data['frame_rate_fps'],
-            linewidth=1.5, alpha=0.7, label=headset)
-ax2.axhline(y=90, color='g', linestyle='--', linewidth=2.5, label='Target (90fps)')
-ax2.axhline(y=85, color='orange', linestyle=':', linewidth=2, label='Minimum (85fps)')
-ax2.set_xlabel('Time (minutes)', fontsize=11, fontweight='bold')
-ax2.set_ylabel('Frame Rate (fps)', fontsize=11, fontweight='bold')
-ax2.set_title('Frame Rate Stability', fontsize=12, fontweight='bold')
-ax2.legend(fontsize=9)
-ax2.grid(True, alpha=0.3)
-# Calibration Error Over Time
-ax3 = axes[1, 0]
-for headset in sorted(tech_perf['headset_id'].unique()):
-    headset_data = tech_perf[tech_perf['headset_id'] == headset].sort_values('timestamp_sec')
-    ax3.plot(headset_data['timestamp_sec'] / 60, headset_data['calibration_error_mm'],
-            marker='s', markersize=3, linewidth=1.5, alpha=0.7, label=headset)
-ax3.axhline(y=10, color='r', linestyle='--', linewidth=2.5, label='Safety Threshold (10mm)')
-# Mark recalibration event at 10 minutes
-ax3.axvline(x=10, color='purple', linestyle=':', linewidth=2, alpha=0.6, label='Recalibration (H2)')
-ax3.set_xlabel('Time (minutes)', fontsize=11, fontweight='bold')
-ax3.set_ylabel('Calibration Error (mm)', fontsize=11, fontweight='bold')
-ax3.set_title('Calibration Drift', fontsize=12, fontweight='bold')
-ax3.legend(fontsize=9)
-ax3.grid(True, alpha=0.3)
-
-# Temperature Increase
-ax4 = axes[1, 1]
-for headset in sorted(tech_perf['headset_id'].unique()):
-    headset_data = tech_perf[tech_perf['headset_id'] == headset].sort_values('timestamp_sec')
-    ax4.plot(headset_data['timestamp_sec'] / 60, headset_data['headset_temp_c'],
-            linewidth=1.5, alpha=0.7, label=headset)
-ax4.set_xlabel('Time (minutes)', fontsize=11, fontweight='bold')
-ax4.set_ylabel('Temperature (°C)', fontsize=11, fontweight='bold')
-ax4.set_title('Thermal Performance', fontsize=12, fontweight='bold')
-ax4.legend(fontsize=9)
-ax4.grid(True, alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('../figures/technical_performance_summary.png', dpi=300, bbox_inches='tight')
-print("  ✓ Saved: technical_performance_summary.png")
-plt.close()
-
-# Figure 2: Temperature vs Performance Correlation
-fig, axes = plt.subplots(1, 2, figsize=(14, 5))
-
-# Temperature vs FPS
-axes[0].scatter(tech_perf['headset_temp_c'], tech_perf['frame_rate_fps'], 
-               alpha=0.4, s=20, c=tech_perf['timestamp_sec']/60, cmap='viridis')
-z = np.polyfit(tech_perf['headset_temp_c'], tech_perf['frame_rate_fps'], 1)
-p = np.poly1d(z)
-x_line = np.linspace(tech_perf['headset_temp_c'].min(), tech_perf['headset_temp_c'].max(), 100)
-axes[0].plot(x_line, p(x_line), "r--", linewidth=2, label=f'r={temp_fps_corr:.3f}')
-axes[0].axhline(y=90, color='g', linestyle=':', linewidth=2, alpha=0.7, label='Target')
-axes[0].set_xlabel('Headset Temperature (°C)', fontsize=11, fontweight='bold')
-axes[0].set_ylabel('Frame Rate (fps)', fontsize=11, fontweight='bold')
-axes[0].set_title('Temperature Impact on Frame Rate', fontsize=12, fontweight='bold')
-axes[0].legend(fontsize=10)
-axes[0].grid(True, alpha=0.3)
-cbar1 = plt.colorbar(axes[0].collections[0], ax=axes[0])
-cbar1.set_label('Time (minutes)', fontsize=9)
-
-# Temperature vs Calibration Error
-sc = axes[1].scatter(tech_perf['headset_temp_c'], tech_perf['calibration_error_mm'], 
-               alpha=0.4, s=20, c=tech_perf['timestamp_sec']/60, cmap='viridis')
-z2 = np.polyfit(tech_perf['headset_temp_c'], tech_perf['calibration_error_mm'], 1)
-p2 = np.poly1d(z2)
-axes[1].plot(x_line, p2(x_line), "r--", linewidth=2, label=f'r={temp_calib_corr:.3f}')
-axes[1].axhline(y=10, color='orange', linestyle='--', linewidth=2, label='Safety Threshold')
-axes[1].set_xlabel('Headset Temperature (°C)', fontsize=11, fontweight='bold')
-axes[1].set_ylabel('Calibration Error (mm)', fontsize=11, fontweight='bold')
-axes[1].set_title('Temperature Impact on Calibration', fontsize=12, fontweight='bold')
-axes[1].legend(fontsize=10)
-axes[1].grid(True, alpha=0.3)
-cbar2 = plt.colorbar(sc, ax=axes[1])
-cbar2.set_label('Time (minutes)', fontsize=9)
-
-plt.tight_layout()
-plt.savefig('../figures/temperature_correlation.png', dpi=300, bbox_inches='tight')
-print("  ✓ Saved: temperature_correlation.png")
-plt.close()
-
-# Figure 3: Demo Performance Comparison
-if not demo_perf.empty:
+def _setup_plotting():
+    """Import the plotting stack on first use and apply the figure style."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Set style
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.figsize'] = (10, 6)
+    plt.rcParams['font.size'] = 10
+    return plt
+
+
+def render_technical_performance(tech_perf: pd.DataFrame, output_path: str):
+    """Figure 1: latency, FPS, calibration error and temperature over time per headset."""
+    plt = _setup_plotting()
+    headset_frames = split_by_headset(tech_perf)
+
+    # Figure 1: Technical Performance Overview (2x2 grid)
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    # Network Latency Over Time
+    ax1 = axes[0, 0]
+    for headset, headset_data in headset_frames:
+        plot_series(ax1, headset_data['timestamp_sec'] / 60, headset_data['network_latency_ms'],
+                    linewidth=1.5, alpha=0.7, label=headset)
+    ax1.axhline(y=75, color='g', linestyle='--', linewidth=2.5, label='Good QoE (≤75ms)')
+    ax1.set_xlabel('Time (minutes)', fontsize=11, fontweight='bold')
+    ax1.set_ylabel('Network Latency (ms)', fontsize=11, fontweight='bold')
+    ax1.set_title('Network Performance', fontsize=12, fontweight='bold')
+    ax1.legend(fontsize=9)
+    ax1.grid(True, alpha=0.3)
+
+    # Frame Rate Over Time
+    ax2 = axes[0, 1]
+    for headset, headset_data in headset_frames:
+        plot_series(ax2, headset_data['timestamp_sec'] / 60, headset_data['frame_rate_fps'],
+                    linewidth=1.5, alpha=0.7, label=headset)
+    ax2.axhline(y=90, color='g', linestyle='--', linewidth=2.5, label='Target (90fps)')
+    ax2.axhline(y=85, color='orange', linestyle=':', linewidth=2, label='Minimum (85fps)')
+    ax2.set_xlabel('Time (minutes)', fontsize=11, fontweight='bold')
+    ax2.set_ylabel('Frame Rate (fps)', fontsize=11, fontweight='bold')
+    ax2.set_title('Frame Rate Stability', fontsize=12, fontweight='bold')
+    ax2.legend(fontsize=9)
+    ax2.grid(True, alpha=0.3)
+    # Calibration Error Over Time
+    ax3 = axes[1, 0]
+    for headset, headset_data in headset_frames:
+        plot_series(ax3, headset_data['timestamp_sec'] / 60, headset_data['calibration_error_mm'],
+                    marker='s', markersize=3, linewidth=1.5, alpha=0.7, label=headset)
+    ax3.axhline(y=10, color='r', linestyle='--', linewidth=2.5, label='Safety Threshold (10mm)')
+    # Mark recalibration event at 10 minutes
+    ax3.axvline(x=10, color='purple', linestyle=':', linewidth=2, alpha=0.6, label='Recalibration (H2)')
+    ax3.set_xlabel('Time (minutes)', fontsize=11, fontweight='bold')
+    ax3.set_ylabel('Calibration Error (mm)', fontsize=11, fontweight='bold')
+    ax3.set_title('Calibration Drift', fontsize=12, fontweight='bold')
+    ax3.legend(fontsize=9)
+    ax3.grid(True, alpha=0.3)
+
+    # Temperature Increase
+    ax4 = axes[1, 1]
+    for headset, headset_data in headset_frames:
+        plot_series(ax4, headset_data['timestamp_sec'] / 60, headset_data['headset_temp_c'],
+                    linewidth=1.5, alpha=0.7, label=headset)
+    ax4.set_xlabel('Time (minutes)', fontsize=11, fontweight='bold')
+    ax4.set_ylabel('Temperature (°C)', fontsize=11, fontweight='bold')
+    ax4.set_title('Thermal Performance', fontsize=12, fontweight='bold')
+    ax4.legend(fontsize=9)
+    ax4.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.close()
+
+
+def render_temperature_correlation(tech_perf: pd.DataFrame, output_path: str):
+    """Figure 2: temperature against FPS and calibration error, with fitted trend lines."""
+    plt = _setup_plotting()
+    corr = temperature_correlations(tech_perf)
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+
+    # Temperature vs FPS
+    sc1 = density_scatter(axes[0], tech_perf['headset_temp_c'], tech_perf['frame_rate_fps'],
+                          c=tech_perf['timestamp_sec']/60, alpha=0.4, s=20)
+    z = np.polyfit(tech_perf['headset_temp_c'], tech_perf['frame_rate_fps'], 1)
+    p = np.poly1d(z)
+    x_line = np.linspace(tech_perf['headset_temp_c'].min(), tech_perf['headset_temp_c'].max(), 100)
+    axes[0].plot(x_line, p(x_line), "r--", linewidth=2, label=f"r={corr['fps']:.3f}")
+    axes[0].axhline(y=90, color='g', linestyle=':', linewidth=2, alpha=0.7, label='Target')
+    axes[0].set_xlabel('Headset Temperature (°C)', fontsize=11, fontweight='bold')
+    axes[0].set_ylabel('Frame Rate (fps)', fontsize=11, fontweight='bold')
+    axes[0].set_title('Temperature Impact on Frame Rate', fontsize=12, fontweight='bold')
+    axes[0].legend(fontsize=10)
+    axes[0].grid(True, alpha=0.3)
+    cbar1 = plt.colorbar(sc1, ax=axes[0])
+    cbar1.set_label('Time (minutes)', fontsize=9)
+
+    # Temperature vs Calibration Error
+    sc2 = density_scatter(axes[1], tech_perf['headset_temp_c'], tech_perf['calibration_error_mm'],
+                          c=tech_perf['timestamp_sec']/60, alpha=0.4, s=20)
+    z2 = np.polyfit(tech_perf['headset_temp_c'], tech_perf['calibration_error_mm'], 1)
+    p2 = np.poly1d(z2)
+    axes[1].plot(x_line, p2(x_line), "r--", linewidth=2, label=f"r={corr['calibration']:.3f}")
+    axes[1].axhline(y=10, color='orange', linestyle='--', linewidth=2, label='Safety Threshold')
+    axes[1].set_xlabel('Headset Temperature (°C)', fontsize=11, fontweight='bold')
+    axes[1].set_ylabel('Calibration Error (mm)', fontsize=11, fontweight='bold')
+    axes[1].set_title('Temperature Impact on Calibration', fontsize=12, fontweight='bold')
+    axes[1].legend(fontsize=10)
+    axes[1].grid(True, alpha=0.3)
+    cbar2 = plt.colorbar(sc2, ax=axes[1])
+    cbar2.set_label('Time (minutes)', fontsize=9)
+
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.close()
+
+
+def render_demo_performance(demo_perf: pd.DataFrame, output_path: str):
+    """Figure 3: completion time per demo scenario."""
+    plt = _setup_plotting()
     fig, ax = plt.subplots(figsize=(10, 6))
 
     demo_names = demo_perf['demo_scenario'].tolist()
@@ -334,63 +390,174 @@ if not demo_perf.empty:
                 ha='center', va='bottom', fontsize=10, fontweight='bold')
 
     plt.tight_layout()
-    plt.savefig('../figures/demo_performance.png', dpi=300, bbox_inches='tight')
-    print("  ✓ Saved: demo_performance.png")
+    plt.savefig(output_path, dpi=150, bbox_inches='tight')
     plt.close()
-else:
-    print("  Skipping demo_performance.png (no data)")
+
+
+def figure_jobs(tech_perf: pd.DataFrame, demo_perf: pd.DataFrame, output_dir: str = DEFAULT_FIGURES_DIR) -> list:
+    """One FigureJob per figure, each holding only the columns it draws."""
+    jobs = [
+        FigureJob('technical_performance_summary', render_technical_performance,
+                  tech_perf[['headset_id', 'timestamp_sec', 'network_latency_ms', 'frame_rate_fps',
+                             'calibration_error_mm', 'headset_temp_c']],
+                  os.path.join(output_dir, 'technical_performance_summary.png')),
+        FigureJob('temperature_correlation', render_temperature_correlation,
+                  tech_perf[['timestamp_sec', 'headset_temp_c', 'frame_rate_fps',
+                             'calibration_error_mm', 'network_latency_ms']],
+                  os.path.join(output_dir, 'temperature_correlation.png')),
+    ]
+    if not demo_perf.empty:
+        jobs.append(FigureJob('demo_performance', render_demo_performance,
+                              demo_perf[['demo_scenario', 'completion_time_sec', 'demo_success']],
+                              os.path.join(output_dir, 'demo_performance.png')))
+    return jobs
+
+
+def generate_figures(tech_perf: pd.DataFrame, demo_perf: pd.DataFrame, output_dir: str = DEFAULT_FIGURES_DIR,
+                     workers: int = None, force: bool = False):
+    print("\n" + "=" * 60)
+    print("Generating Figures...")
+    print("=" * 60)
+
+    render_figures(figure_jobs(tech_perf, demo_perf, output_dir), workers=workers, force=force)
+    if demo_perf.empty:
+        print("  Skipping demo_performance.png (no data)")
+
 
 # ============================================
 # Summary Statistics Table
 # ============================================
 
-print("\n" + "=" * 60)
-print("Summary: Capabilities vs Literature Benchmarks")
-print("=" * 60)
-
-summary_data = {
-    'Capability': [
-        'Calibration Accuracy',
-        'Network Latency', 
-        'Frame Rate',
-        'Session Duration',
-        'Spatial Anchor Alignment'
-    ],
-    'Literature Target': [
-        '<10mm',
-        '≤75ms',
-        '≥90fps',
-        '30-60min',
-        'Automatic'
-    ],
-    'Measured Performance': [
-        f'{tech_perf["calibration_error_mm"].mean():.1f}±{tech_perf["calibration_error_mm"].std():.1f}mm' if 'calibration_error_mm' in tech_perf.columns else 'N/A',
-        f'{tech_perf["network_latency_ms"].mean():.1f}±{tech_perf["network_latency_ms"].std():.1f}ms',
-        f'{tech_perf["frame_rate_fps"].mean():.1f}±{tech_perf["frame_rate_fps"].std():.1f}fps',
-        f'{tech_perf["timestamp_sec"].max()/60:.0f}min session',
-        'N/A'
-    ],
-    'Assessment': [
-        '✓ Within threshold',
-        '✓ Meets threshold' if tech_perf["network_latency_ms"].mean() <= 75 else '⚠ Above threshold',
-        '⚠ Below target' if tech_perf["frame_rate_fps"].mean() < 90 else '✓ Meets target',
-        '✓ Stable performance',
-        '✓ Successful'
-    ]
-}
-
-summary_df = pd.DataFrame(summary_data)
-print("\n" + summary_df.to_string(index=False))
-
-print("\n" + "=" * 60)
-print("Analysis Complete!")
-print("=" * 60)
-print(f"\nGenerated {len([f for f in os.listdir('../figures') if f.endswith('.png')])} figures in ../figures/")
-print("\nIMPORTANT REMINDER:")
-print("  This analysis uses MOCK DATA for demonstration purposes only.")
-print("  No actual user studies have been conducted.")
-print("  For real validation, conduct studies with IRB approval and actual participants.")
-print("\nFiles can be referenced in research paper to demonstrate:")
-print("  1. MetricsLogger system capabilities")
-print("  2. Expected data collection formats")
-print("  3. Analysis methodology for future validation studies")
+def summary_table(tech_perf: pd.DataFrame) -> pd.DataFrame:
+    summary_data = {
+        'Capability': [
+            'Calibration Accuracy',
+            'Network Latency',
+            'Frame Rate',
+            'Session Duration',
+            'Spatial Anchor Alignment'
+        ],
+        'Literature Target': [
+            '<10mm',
+            '≤75ms',
+            '≥90fps',
+            '30-60min',
+            'Automatic'
+        ],
+        'Measured Performance': [
+            f'{tech_perf["calibration_error_mm"].mean():.1f}±{tech_perf["calibration_error_mm"].std():.1f}mm' if 'calibration_error_mm' in tech_perf.columns else 'N/A',
+            f'{tech_perf["network_latency_ms"].mean():.1f}±{tech_perf["network_latency_ms"].std():.1f}ms',
+            f'{tech_perf["frame_rate_fps"].mean():.1f}±{tech_perf["frame_rate_fps"].std():.1f}fps',
+            f'{tech_perf["timestamp_sec"].max()/60:.0f}min session',
+            'N/A'
+        ],
+        'Assessment': [
+            '✓ Within threshold',
+            '✓ Meets threshold' if tech_perf["network_latency_ms"].mean() <= 75 else '⚠ Above threshold',
+            '⚠ Below target' if tech_perf["frame_rate_fps"].mean() < 90 else '✓ Meets target',
+            '✓ Stable performance',
+            '✓ Successful'
+        ]
+    }
+    return pd.DataFrame(summary_data)
+
+
+def report_summary(tech_perf: pd.DataFrame):
+    print("\n" + "=" * 60)
+    print("Summary: Capabilities vs Literature Benchmarks")
+    print("=" * 60)
+    print("\n" + summary_table(tech_perf).to_string(index=False))
+
+
+def run_analysis(session_dir: str = None, output_dir: str = DEFAULT_FIGURES_DIR,
+                 sections: list = None, sessions_root: str = DEFAULT_SESSIONS_ROOT,
+                 workers: int = None, force: bool = False) -> pd.DataFrame:
+    """
+    Run the selected report ``sections`` (default: all) and return the merged
+    technical performance data. Returns None when there is nothing to analyze.
+    """
+    sections = set(sections or SECTIONS)
+
+    print("="*70)
+    print("DATA ANALYSIS")
+    print("="*70)
+    print("This analysis uses collected data to demonstrate MetricsLogger")
+    print("capabilities and expected performance patterns.")
+    print("="*70 + "\n")
+
+    # Load real data from all three headsets
+    print("Loading datasets...")
+    headset_files = find_headset_files(session_dir, sessions_root)
+    if not headset_files:
+        print(f"ERROR: No data files found in {session_dir or sessions_root}")
+        return None
+
+    tech_perf = load_tech_perf(headset_files, session_dir)
+    demo_perf, calib_acc = load_demo_data()
+
+    print(f"Technical Performance: {len(tech_perf)} measurements from {tech_perf['headset_id'].nunique()} headsets")
+    print(f"Demo Performance: {len(demo_perf)} demo scenarios")
+    print(f"Calibration Accuracy: {len(calib_acc)} calibration events")
+
+    if 'rq12' in sections:
+        report_technical_performance(tech_perf)
+    if 'rq3' in sections:
+        report_demo_scenarios(demo_perf)
+    if 'rq45' in sections:
+        report_stability(tech_perf)
+    if 'figures' in sections:
+        generate_figures(tech_perf, demo_perf, output_dir, workers=workers, force=force)
+    if 'summary' in sections:
+        report_summary(tech_perf)
+
+    print("\n" + "=" * 60)
+    print("Analysis Complete!")
+    print("=" * 60)
+    if 'figures' in sections:
+        print(f"\nGenerated {len([f for f in os.listdir(output_dir) if f.endswith('.png')])} figures in {output_dir}/")
+    print("\nIMPORTANT REMINDER:")
+    print("  This analysis uses MOCK DATA for demonstration purposes only.")
+    print("  No actual user studies have been conducted.")
+    print("  For real validation, conduct studies with IRB approval and actual participants.")
+    print("\nFiles can be referenced in research paper to demonstrate:")
+    print("  1. MetricsLogger system capabilities")
+    print("  2. Expected data collection formats")
+    print("  3. Analysis methodology for future validation studies")
+    return tech_perf
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Research question analysis of MetricsLogger sessions.")
+    parser.add_argument("session_dir", nargs="?", default=None,
+                        help="Session directory (default: most recent session in the index)")
+    parser.add_argument("--sessions-root", default=DEFAULT_SESSIONS_ROOT,
+                        help="Sessions root used to find the most recent session")
+    parser.add_argument("--output-dir", default=DEFAULT_FIGURES_DIR, help="Figure directory (default: research-paper/figures)")
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=None,
+                        help="Sections to run, in report order (default: all)")
+    parser.add_argument("--text-only", action="store_true",
+                        help="Skip the figures; matplotlib is never imported")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Figure render processes (default: one per figure)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-render figures even if their input data is unchanged")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.session_dir and not os.path.isdir(args.session_dir):
+        print(f"Error: Directory not found: {args.session_dir}")
+        sys.exit(1)
+
+    sections = args.sections or SECTIONS
+    if args.text_only:
+        sections = [s for s in sections if s in TEXT_SECTIONS]
+
+    if run_analysis(args.session_dir, args.output_dir, sections, args.sessions_root,
+                    workers=args.workers, force=args.force) is None:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,28 +6,39 @@ This script processes CSV metrics files collected by MetricsLogger and generates
 summary statistics and visualizations for research analysis.
 
 Usage:
-    python analyze_metrics.py [session_dir]
+    python analyze_metrics.py [session_dir] [--workers N] [--processes] [--stream | --incremental | --follow]
+                              [--profile [--cprofile]]
     
 Example:
     python analyze_metrics.py research-paper/data/sessions/20251206
+    python analyze_metrics.py research-paper/data/sessions/20251206 --workers 8
+    python analyze_metrics.py research-paper/data/sessions/20251206 --stream --chunksize 50000
+    python analyze_metrics.py research-paper/data/sessions/20251206 --incremental
+    python analyze_metrics.py research-paper/data/sessions/20251206 --follow
+    python analyze_metrics.py research-paper/data/sessions/20251206 --profile [--cprofile]
 """
 
 import os
 import sys
 import json
 import glob
+import argparse
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 import numpy as np
 
-# Optional: matplotlib for visualization
-try:
-    import matplotlib.pyplot as plt
-    HAS_MATPLOTLIB = True
-except ImportError:
-    HAS_MATPLOTLIB = False
+from metrics_io import read_metrics_csv, find_session_csvs, concat_metrics_frames, constant_category, as_reported_float
+from metrics_plot import plot_series
+from figure_pipeline import FigureJob, render_figures
+from metrics_profile import StageProfiler
+
+# Optional: matplotlib for visualization (imported only when plotting)
+HAS_MATPLOTLIB = importlib.util.find_spec('matplotlib') is not None
+if not HAS_MATPLOTLIB:
     print("Note: matplotlib not installed. Visualizations will be skipped.")
 
 
@@ -35,142 +46,355 @@ except ImportError:
 THRESHOLDS = {
     'fps_target': 90,
     'fps_minimum': 72,
+    'fps_drop': 60,
+    'fps_recovered': 70,
     'latency_target_ms': 75,
     'latency_good_ms': 50,
+    'latency_spike_ms': 100,
     'calibration_target_mm': 10,
     'calibration_warning_mm': 25,
     'packet_loss_target_pct': 1.0,
 }
 
 
-def load_session_data(session_dir: str) -> pd.DataFrame:
-    """Load and merge all metrics CSVs from a session directory."""
+def _load_metrics_file(csv_file: str, columns: list = None):
+    """Read one metrics CSV, returning (path, frame, error) so pool workers never raise."""
+    try:
+        df = read_metrics_csv(csv_file, columns=columns)
+        df['source_file'] = constant_category(os.path.basename(csv_file), len(df))
+        return csv_file, df, None
+    except Exception as e:
+        return csv_file, None, e
+
+
+def load_session_data(session_dir: str, columns: list = None,
+                      workers: int = 1, use_processes: bool = False,
+                      profiler: StageProfiler = None, use_store: bool = False) -> pd.DataFrame:
+    """Load and merge all metrics CSVs from a session directory.
+
+    Pass ``columns`` to parse only the columns an analysis needs. With
+    ``workers`` > 1 the files are read concurrently by a thread pool (or a
+    process pool with ``use_processes``) and concatenated once at the end.
+    A ``profiler`` records the read and merge/sort stages separately.
+    With ``use_store`` the rows come from the session's merged Parquet store
+    (see metrics_store.py) when it is current for the CSVs on disk; otherwise
+    the CSVs are fingerprinted before they are read and the fingerprints of
+    those that loaded are kept in ``attrs['input_fingerprints']`` for
+    write_merged_store.
+    """
+    profiler = profiler or StageProfiler()
     all_data = []
+    fingerprints = None
     
-    # Find all CSV files in headset subdirectories
-    for headset_dir in glob.glob(os.path.join(session_dir, 'H*')):
-        csv_files = glob.glob(os.path.join(headset_dir, '*.csv'))
-        csv_files.extend(glob.glob(os.path.join(headset_dir, 'metrics', '*.csv')))
+    with profiler.stage('read') as record:
+        # Find all CSV files in headset subdirectories
+        csv_files = find_session_csvs(session_dir)
+        
+        if use_store and csv_files:
+            from metrics_store import read_current_store
+            # The CSV path below always adds source_file, so the store read does too
+            store_columns = columns if columns is None or 'source_file' in columns else columns + ['source_file']
+            stored = read_current_store(session_dir, csv_files, columns=store_columns)
+            if stored is not None:
+                record['rows'] = len(stored)
+                print(f"  Loaded: merged store ({len(stored)} rows from {len(csv_files)} files)")
+                return stored
+            from metrics_store import fingerprint_before_read
+            fingerprints = fingerprint_before_read(session_dir, csv_files)
         
-        for csv_file in csv_files:
-            try:
-                df = pd.read_csv(csv_file)
-                df['source_file'] = os.path.basename(csv_file)
+        if workers > 1 and len(csv_files) > 1:
+            pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            with pool_cls(max_workers=min(workers, len(csv_files))) as pool:
+                results = list(pool.map(_load_metrics_file, csv_files, [columns] * len(csv_files)))
+        else:
+            results = [_load_metrics_file(csv_file, columns) for csv_file in csv_files]
+        
+        # Report in file order, whichever worker finished first
+        for csv_file, df, error in results:
+            if error is not None:
+                print(f"  Error loading {csv_file}: {error}")
+                if fingerprints is not None:
+                    fingerprints.pop(os.path.relpath(csv_file, session_dir), None)
+            else:
                 all_data.append(df)
                 print(f"  Loaded: {csv_file} ({len(df)} rows)")
-            except Exception as e:
-                print(f"  Error loading {csv_file}: {e}")
+        record['rows'] = sum(len(df) for df in all_data)
     
     if not all_data:
         print("No data files found.")
         return pd.DataFrame()
     
     # Merge all data
-    merged_df = pd.concat(all_data, ignore_index=True)
-    merged_df = merged_df.sort_values(['headset_id', 'timestamp_sec'])
+    with profiler.stage('merge_sort', rows=record['rows']):
+        merged_df = concat_metrics_frames(all_data, report=True)
+        merged_df = merged_df.sort_values(['headset_id', 'timestamp_sec'])
+    if fingerprints is not None:
+        merged_df.attrs['input_fingerprints'] = fingerprints
     
     return merged_df
 
 
+# Percentiles reported in the summary, all selected in one pass per column
+SUMMARY_QUANTILES = [0.05, 0.50, 0.95, 0.99]
+
+# Columns summarised by calculate_statistics; True marks those that also need a std dev
+SUMMARY_COLUMNS = {
+    'timestamp_sec': False,
+    'frame_rate_fps': True,
+    'frame_time_ms': False,
+    'network_latency_ms': True,
+    'packet_loss_pct': False,
+    'calibration_error_mm': True,
+    'battery_temp_c': False,
+    'headset_temp_c': False,
+    'cpu_usage_pct': False,
+    'memory_used_mb': False,
+}
+
+
+def _summarize_column(values: np.ndarray, with_std: bool) -> dict:
+    """Reduce one column to mean/std/min/max, accumulating in float64."""
+    if values.dtype.kind == 'f':
+        nan_mask = np.isnan(values)
+        if nan_mask.any():
+            values = values[~nan_mask]
+    n = values.size
+    if n == 0:
+        return {'mean': np.nan, 'std': np.nan, 'min': np.nan, 'max': np.nan}
+    
+    mean = values.sum(dtype=np.float64) / n
+    std = np.nan
+    if with_std and n > 1:
+        centered = values - mean
+        std = np.sqrt(np.dot(centered, centered) / (n - 1))
+    return {'mean': mean, 'std': std, 'min': as_reported_float(values.min()), 'max': as_reported_float(values.max())}
+
+
+def _select_in_place(values: np.ndarray, positions: list):
+    """Partially sort ``values`` so each of the sorted ``positions`` holds its order statistic.
+
+    np.partition with several kth values is far slower than repeated single
+    partitions, so partition at the middle position and recurse into each side.
+    """
+    def select(lo, hi, ks):
+        if not ks:
+            return
+        mid = len(ks) // 2
+        k = ks[mid]
+        values[lo:hi].partition(k - lo)
+        select(lo, k, ks[:mid])
+        select(k + 1, hi, ks[mid + 1:])
+    
+    select(0, len(values), positions)
+
+
+def _quantiles(values: np.ndarray, quantiles: list) -> dict:
+    """Linear-interpolated quantiles (as pandas/numpy compute them) from a single selection pass."""
+    values = values[~np.isnan(values)] if values.dtype.kind == 'f' else values.copy()
+    n = values.size
+    if n == 0:
+        return {q: np.nan for q in quantiles}
+    
+    pos = np.asarray(quantiles) * (n - 1)
+    lower = np.floor(pos).astype(np.int64)
+    upper = np.minimum(lower + 1, n - 1)
+    _select_in_place(values, sorted(set(lower) | set(upper)))
+    
+    low_values = as_reported_float(values[lower])
+    result = low_values + (as_reported_float(values[upper]) - low_values) * (pos - lower)
+    return dict(zip(quantiles, result))
+
+
+def _first_last_per_group(codes: np.ndarray, n_groups: int, values: pd.Series) -> tuple:
+    """Return the first and last of ``values`` for each factorized group, in frame order."""
+    positions = np.arange(len(codes))
+    valid = codes >= 0
+    
+    first = np.full(n_groups, len(codes))
+    last = np.full(n_groups, -1)
+    np.minimum.at(first, codes[valid], positions[valid])
+    np.maximum.at(last, codes[valid], positions[valid])
+    
+    values = values.to_numpy()
+    return values[first], values[last]
+
+
 def calculate_statistics(df: pd.DataFrame) -> dict:
-    """Calculate summary statistics for the session."""
+    """Calculate summary statistics for the session.
+
+    Each summary column is reduced once, all percentiles of a column come
+    from a single selection pass and the per-headset battery levels from a
+    single grouped pass, instead of rescanning the frame for every metric. Optional columns
+    that are missing from the log report 0, as the device health metrics
+    always have.
+    """
     if df.empty:
         return {}
     
+    n = len(df)
+    temp_col = 'battery_temp_c' if 'battery_temp_c' in df.columns else 'headset_temp_c'
+    
+    columns = {col: _summarize_column(df[col].to_numpy(), with_std)
+               for col, with_std in SUMMARY_COLUMNS.items() if col in df.columns}
+    
+    quantiles = {col: _quantiles(df[col].to_numpy(), SUMMARY_QUANTILES)
+                 for col in ['frame_rate_fps', 'network_latency_ms'] if col in df.columns}
+    
+    def col_stat(col, stat):
+        return columns[col][stat] if col in columns else 0
+    
+    def col_quantile(col, q):
+        return quantiles[col][q] if col in quantiles else 0
+    
+    def pct_at_least(col, threshold):
+        if col not in df.columns:
+            return 0
+        return np.count_nonzero(df[col].to_numpy() >= threshold) / n * 100
+    
+    def pct_at_most(col, threshold):
+        if col not in df.columns:
+            return 0
+        return np.count_nonzero(df[col].to_numpy() <= threshold) / n * 100
+    
+    # Headsets in order of first appearance, as Series.unique() lists them
+    headset_codes, headsets = pd.factorize(df['headset_id'])
+    battery_first, battery_last = _first_last_per_group(headset_codes, len(headsets), df['battery_level'])
+    battery_start = battery_first.mean()
+    battery_end = battery_last.mean()
+    
     stats = {
         # Session info
-        'total_samples': len(df),
-        'headset_count': df['headset_id'].nunique(),
-        'headsets': df['headset_id'].unique().tolist(),
-        'duration_seconds': df['timestamp_sec'].max(),
-        'duration_minutes': df['timestamp_sec'].max() / 60,
+        'total_samples': n,
+        'headset_count': len(headsets),
+        'headsets': headsets.tolist(),
+        'duration_seconds': col_stat('timestamp_sec', 'max'),
+        'duration_minutes': col_stat('timestamp_sec', 'max') / 60,
         
         # Frame rate
-        'fps_mean': df['frame_rate_fps'].mean(),
-        'fps_std': df['frame_rate_fps'].std(),
-        'fps_min': df['frame_rate_fps'].min(),
-        'fps_max': df['frame_rate_fps'].max(),
-        'fps_p5': df['frame_rate_fps'].quantile(0.05),
-        'fps_p95': df['frame_rate_fps'].quantile(0.95),
-        'fps_target_achieved_pct': (df['frame_rate_fps'] >= THRESHOLDS['fps_target']).mean() * 100,
-        'fps_minimum_achieved_pct': (df['frame_rate_fps'] >= THRESHOLDS['fps_minimum']).mean() * 100,
+        'fps_mean': col_stat('frame_rate_fps', 'mean'),
+        'fps_std': col_stat('frame_rate_fps', 'std'),
+        'fps_min': col_stat('frame_rate_fps', 'min'),
+        'fps_max': col_stat('frame_rate_fps', 'max'),
+        'fps_p5': col_quantile('frame_rate_fps', 0.05),
+        'fps_p95': col_quantile('frame_rate_fps', 0.95),
+        'fps_target_achieved_pct': pct_at_least('frame_rate_fps', THRESHOLDS['fps_target']),
+        'fps_minimum_achieved_pct': pct_at_least('frame_rate_fps', THRESHOLDS['fps_minimum']),
         
         # Frame time
-        'frame_time_mean_ms': df['frame_time_ms'].mean(),
-        'frame_time_max_ms': df['frame_time_ms'].max(),
+        'frame_time_mean_ms': col_stat('frame_time_ms', 'mean'),
+        'frame_time_max_ms': col_stat('frame_time_ms', 'max'),
         
         # Network latency
-        'latency_mean_ms': df['network_latency_ms'].mean(),
-        'latency_std_ms': df['network_latency_ms'].std(),
-        'latency_min_ms': df['network_latency_ms'].min(),
-        'latency_max_ms': df['network_latency_ms'].max(),
-        'latency_p50_ms': df['network_latency_ms'].quantile(0.50),
-        'latency_p95_ms': df['network_latency_ms'].quantile(0.95),
-        'latency_p99_ms': df['network_latency_ms'].quantile(0.99),
-        'latency_target_achieved_pct': (df['network_latency_ms'] <= THRESHOLDS['latency_target_ms']).mean() * 100,
+        'latency_mean_ms': col_stat('network_latency_ms', 'mean'),
+        'latency_std_ms': col_stat('network_latency_ms', 'std'),
+        'latency_min_ms': col_stat('network_latency_ms', 'min'),
+        'latency_max_ms': col_stat('network_latency_ms', 'max'),
+        'latency_p50_ms': col_quantile('network_latency_ms', 0.50),
+        'latency_p95_ms': col_quantile('network_latency_ms', 0.95),
+        'latency_p99_ms': col_quantile('network_latency_ms', 0.99),
+        'latency_target_achieved_pct': pct_at_most('network_latency_ms', THRESHOLDS['latency_target_ms']),
         
         # Packet loss
-        'packet_loss_mean_pct': df['packet_loss_pct'].mean(),
-        'packet_loss_max_pct': df['packet_loss_pct'].max(),
-        'packet_loss_target_achieved_pct': (df['packet_loss_pct'] <= THRESHOLDS['packet_loss_target_pct']).mean() * 100,
+        'packet_loss_mean_pct': col_stat('packet_loss_pct', 'mean'),
+        'packet_loss_max_pct': col_stat('packet_loss_pct', 'max'),
+        'packet_loss_target_achieved_pct': pct_at_most('packet_loss_pct', THRESHOLDS['packet_loss_target_pct']),
         
         # Calibration
-        'calibration_mean_mm': df['calibration_error_mm'].mean(),
-        'calibration_std_mm': df['calibration_error_mm'].std(),
-        'calibration_max_mm': df['calibration_error_mm'].max(),
-        'calibration_target_achieved_pct': (df['calibration_error_mm'] <= THRESHOLDS['calibration_target_mm']).mean() * 100,
+        'calibration_mean_mm': col_stat('calibration_error_mm', 'mean'),
+        'calibration_std_mm': col_stat('calibration_error_mm', 'std'),
+        'calibration_max_mm': col_stat('calibration_error_mm', 'max'),
+        'calibration_target_achieved_pct': pct_at_most('calibration_error_mm', THRESHOLDS['calibration_target_mm']),
         
         # Battery Temperature
-        'battery_temp_mean_c': df['battery_temp_c'].mean() if 'battery_temp_c' in df.columns else df.get('headset_temp_c', pd.Series([0])).mean(),
-        'battery_temp_max_c': df['battery_temp_c'].max() if 'battery_temp_c' in df.columns else df.get('headset_temp_c', pd.Series([0])).max(),
+        'battery_temp_mean_c': col_stat(temp_col, 'mean'),
+        'battery_temp_max_c': col_stat(temp_col, 'max'),
         
         # CPU Usage
-        'cpu_usage_mean_pct': df['cpu_usage_pct'].mean() if 'cpu_usage_pct' in df.columns else 0,
-        'cpu_usage_max_pct': df['cpu_usage_pct'].max() if 'cpu_usage_pct' in df.columns else 0,
+        'cpu_usage_mean_pct': col_stat('cpu_usage_pct', 'mean'),
+        'cpu_usage_max_pct': col_stat('cpu_usage_pct', 'max'),
         
         # Memory Usage
-        'memory_used_mean_mb': df['memory_used_mb'].mean() if 'memory_used_mb' in df.columns else 0,
-        'memory_used_max_mb': df['memory_used_mb'].max() if 'memory_used_mb' in df.columns else 0,
+        'memory_used_mean_mb': col_stat('memory_used_mb', 'mean'),
+        'memory_used_max_mb': col_stat('memory_used_mb', 'max'),
         
         # Battery
-        'battery_start_pct': df.groupby('headset_id')['battery_level'].first().mean(),
-        'battery_end_pct': df.groupby('headset_id')['battery_level'].last().mean(),
-        'battery_drain_pct': df.groupby('headset_id')['battery_level'].first().mean() - 
-                            df.groupby('headset_id')['battery_level'].last().mean(),
+        'battery_start_pct': battery_start,
+        'battery_end_pct': battery_end,
+        'battery_drain_pct': battery_start - battery_end,
     }
     
     return stats
 
 
+# Per-group summary columns: output name -> (source column, aggregation)
+GROUP_AGGREGATIONS = {
+    'samples': ('timestamp_sec', 'size'),
+    'duration_min': ('timestamp_sec', 'max'),
+    'fps_mean': ('frame_rate_fps', 'mean'),
+    'fps_min': ('frame_rate_fps', 'min'),
+    'latency_mean_ms': ('network_latency_ms', 'mean'),
+    'latency_max_ms': ('network_latency_ms', 'max'),
+    'calibration_mean_mm': ('calibration_error_mm', 'mean'),
+    'packet_loss_mean_pct': ('packet_loss_pct', 'mean'),
+    'battery_first': ('battery_level', 'first'),
+    'battery_last': ('battery_level', 'last'),
+}
+
+# Keys for which calculate_breakdowns produces a table
+BREAKDOWN_KEYS = ['headset_id', 'session_id', 'scene_state']
+
+
+def calculate_group_statistics(df: pd.DataFrame, by: str = 'headset_id') -> pd.DataFrame:
+    """Calculate per-group statistics for every value of ``by`` in one groupby.
+
+    Groups are listed in order of first appearance. Each group also reports
+    its most frequent scene_state, unless it is grouped by scene_state itself.
+    """
+    if df.empty or by not in df.columns:
+        return pd.DataFrame()
+    
+    aggregations = {name: spec for name, spec in GROUP_AGGREGATIONS.items() if spec[0] in df.columns}
+    grouped = df.groupby(by, observed=True, sort=False)
+    table = grouped.agg(**aggregations)
+    table.index = pd.Index(table.index.tolist(), name=by)
+    
+    if 'duration_min' in table.columns:
+        table['duration_min'] = table['duration_min'] / 60
+    if 'battery_first' in table.columns:
+        table['battery_drain_pct'] = table.pop('battery_first') - table.pop('battery_last')
+    
+    if by != 'scene_state' and 'scene_state' in df.columns:
+        # Most frequent state per group; ties go to the first state in sort order, like Series.mode()
+        group_codes, groups = pd.factorize(df[by])
+        state_codes, states = pd.factorize(df['scene_state'], sort=True)
+        valid = (group_codes >= 0) & (state_codes >= 0)
+        counts = np.bincount(group_codes[valid] * len(states) + state_codes[valid],
+                             minlength=len(groups) * len(states)).reshape(len(groups), len(states))
+        scene_mode = pd.Series(np.asarray(states, dtype=object)[counts.argmax(axis=1)], index=groups.tolist())
+        table.insert(min(2, len(table.columns)), 'scene_state', scene_mode.reindex(table.index).to_numpy())
+    
+    return table.reset_index()
+
+
 def calculate_per_headset_statistics(df: pd.DataFrame) -> pd.DataFrame:
     """Calculate statistics per headset."""
+    return calculate_group_statistics(df, by='headset_id')
+
+
+def calculate_breakdowns(df: pd.DataFrame) -> dict:
+    """Calculate the per-headset, per-session and per-scene-state tables."""
+    return {key: calculate_group_statistics(df, by=key) for key in BREAKDOWN_KEYS if key in df.columns}
+
+
+def split_by_headset(df: pd.DataFrame) -> list:
+    """Split the frame into (headset_id, rows sorted by time) pairs, sorted by headset, in one pass."""
     if df.empty:
-        return pd.DataFrame()
-    
-    stats_list = []
-    
-    for headset_id in df['headset_id'].unique():
-        hdf = df[df['headset_id'] == headset_id]
-        
-        stats = {
-            'headset_id': headset_id,
-            'samples': len(hdf),
-            'duration_min': hdf['timestamp_sec'].max() / 60,
-            'scene_state': hdf['scene_state'].mode().iloc[0] if len(hdf) > 0 else 'Unknown',
-            'fps_mean': hdf['frame_rate_fps'].mean(),
-            'fps_min': hdf['frame_rate_fps'].min(),
-            'latency_mean_ms': hdf['network_latency_ms'].mean(),
-            'latency_max_ms': hdf['network_latency_ms'].max(),
-            'calibration_mean_mm': hdf['calibration_error_mm'].mean(),
-            'packet_loss_mean_pct': hdf['packet_loss_pct'].mean(),
-            'battery_drain_pct': hdf['battery_level'].iloc[0] - hdf['battery_level'].iloc[-1],
-        }
-        stats_list.append(stats)
-    
-    return pd.DataFrame(stats_list)
-
-
-def print_report(stats: dict, per_headset_stats: pd.DataFrame):
+        return []
+    ordered = df.sort_values(['headset_id', 'timestamp_sec'], kind='stable')
+    return [(str(headset_id), hdf) for headset_id, hdf in ordered.groupby('headset_id', observed=True, sort=False)]
+
+
+def print_report(stats: dict, per_headset_stats: pd.DataFrame, breakdowns: dict = None):
     """Print a formatted report of statistics."""
     print("\n" + "=" * 60)
     print("SESSION METRICS REPORT")
@@ -216,22 +440,32 @@ def print_report(stats: dict, per_headset_stats: pd.DataFrame):
         print(f"\n{'Per-Headset Summary':=^60}")
         print(per_headset_stats.to_string(index=False))
     
+    for key, title in [('session_id', 'Per-Session Summary'), ('scene_state', 'Per-Scene-State Summary')]:
+        table = (breakdowns or {}).get(key)
+        if table is not None and not table.empty:
+            print(f"\n{title:=^60}")
+            print(table.to_string(index=False))
+    
     print("\n" + "=" * 60)
 
 
-def create_visualizations(df: pd.DataFrame, output_dir: str):
-    """Create visualization charts from the data."""
-    if not HAS_MATPLOTLIB or df.empty:
-        return
+# Columns drawn by the metrics overview figure
+OVERVIEW_COLUMNS = ['headset_id', 'timestamp_sec', 'frame_rate_fps', 'network_latency_ms']
+
+
+def render_metrics_overview(df: pd.DataFrame, output_path: str):
+    """Render the 2x2 session overview (FPS/latency over time and distributions)."""
+    import matplotlib.pyplot as plt
     
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
     fig.suptitle('Session Metrics Overview', fontsize=14)
     
+    headset_frames = split_by_headset(df)
+    
     # FPS over time
     ax1 = axes[0, 0]
-    for headset_id in df['headset_id'].unique():
-        hdf = df[df['headset_id'] == headset_id]
-        ax1.plot(hdf['timestamp_sec'] / 60, hdf['frame_rate_fps'], label=headset_id, alpha=0.7)
+    for headset_id, hdf in headset_frames:
+        plot_series(ax1, hdf['timestamp_sec'] / 60, hdf['frame_rate_fps'], label=headset_id, alpha=0.7)
     ax1.axhline(y=THRESHOLDS['fps_target'], color='g', linestyle='--', label=f"Target ({THRESHOLDS['fps_target']} FPS)")
     ax1.axhline(y=THRESHOLDS['fps_minimum'], color='r', linestyle='--', label=f"Minimum ({THRESHOLDS['fps_minimum']} FPS)")
     ax1.set_xlabel('Time (minutes)')
@@ -242,9 +476,8 @@ def create_visualizations(df: pd.DataFrame, output_dir: str):
     
     # Latency over time
     ax2 = axes[0, 1]
-    for headset_id in df['headset_id'].unique():
-        hdf = df[df['headset_id'] == headset_id]
-        ax2.plot(hdf['timestamp_sec'] / 60, hdf['network_latency_ms'], label=headset_id, alpha=0.7)
+    for headset_id, hdf in headset_frames:
+        plot_series(ax2, hdf['timestamp_sec'] / 60, hdf['network_latency_ms'], label=headset_id, alpha=0.7)
     ax2.axhline(y=THRESHOLDS['latency_target_ms'], color='r', linestyle='--', label=f"Target ({THRESHOLDS['latency_target_ms']} ms)")
     ax2.set_xlabel('Time (minutes)')
     ax2.set_ylabel('Network Latency (ms)')
@@ -273,15 +506,37 @@ def create_visualizations(df: pd.DataFrame, output_dir: str):
     ax4.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    
-    output_path = os.path.join(output_dir, 'metrics_overview.png')
     plt.savefig(output_path, dpi=150)
-    print(f"\nVisualization saved to: {output_path}")
     plt.close()
 
 
-def save_report(stats: dict, per_headset_stats: pd.DataFrame, output_dir: str):
-    """Save statistics to JSON and CSV files."""
+def metrics_overview_job(df: pd.DataFrame, output_dir: str) -> FigureJob:
+    """Figure job for <output_dir>/metrics_overview.png with only the columns it draws."""
+    return FigureJob('metrics_overview', render_metrics_overview, df[OVERVIEW_COLUMNS],
+                     os.path.join(output_dir, 'metrics_overview.png'))
+
+
+def create_visualizations(df: pd.DataFrame, output_dir: str):
+    """Create visualization charts from the data (skipped if the data is unchanged)."""
+    if not HAS_MATPLOTLIB or df.empty:
+        return
+    print("\nVisualizations:")
+    render_figures([metrics_overview_job(df, output_dir)])
+
+
+def _remove_stale_table(table_path: str):
+    """Delete a table left by an earlier run that this run did not recompute."""
+    if os.path.exists(table_path):
+        os.remove(table_path)
+        print(f"Removed stale table: {table_path}")
+
+
+def save_report(stats: dict, per_headset_stats: pd.DataFrame, output_dir: str, breakdowns: dict = None):
+    """Save statistics to JSON and CSV files.
+
+    A table that is not given (or empty) is removed from ``output_dir`` so an
+    older run's numbers are never shown next to the new summary.
+    """
     # Save overall stats as JSON
     stats_path = os.path.join(output_dir, 'summary_statistics.json')
     
@@ -300,18 +555,79 @@ def save_report(stats: dict, per_headset_stats: pd.DataFrame, output_dir: str):
     print(f"Statistics saved to: {stats_path}")
     
     # Save per-headset stats as CSV
+    per_headset_path = os.path.join(output_dir, 'per_headset_statistics.csv')
     if not per_headset_stats.empty:
-        per_headset_path = os.path.join(output_dir, 'per_headset_statistics.csv')
         per_headset_stats.to_csv(per_headset_path, index=False)
         print(f"Per-headset statistics saved to: {per_headset_path}")
+    else:
+        _remove_stale_table(per_headset_path)
+    
+    # Save per-session and per-scene-state stats as CSV
+    for key, name in [('session_id', 'per_session_statistics.csv'), ('scene_state', 'per_scene_state_statistics.csv')]:
+        table = (breakdowns or {}).get(key)
+        table_path = os.path.join(output_dir, name)
+        if table is not None and not table.empty:
+            table.to_csv(table_path, index=False)
+            print(f"{key} breakdown saved to: {table_path}")
+        else:
+            _remove_stale_table(table_path)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Analyze collected metrics from co-located VR sessions.")
+    parser.add_argument("session_dir", nargs="?", default=None,
+                        help="Session directory (default: most recent in research-paper/data/sessions)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of files to read concurrently (default: 1)")
+    parser.add_argument("--processes", action="store_true",
+                        help="Read files in a process pool instead of a thread pool")
+    parser.add_argument("--stream", action="store_true",
+                        help="Compute summary_statistics.json in constant memory from chunked reads "
+                             "(percentiles are sketched; no merged store, per-group tables or plots)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-read new or changed CSVs, merging cached per-file aggregates "
+                             "(percentiles are sketched); merged store and plots are rebuilt only on change")
+    parser.add_argument("--follow", action="store_true",
+                        help="Watch an in-progress session and update running statistics and alerts live")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="Seconds between checks in --follow mode without inotify (default: 2)")
+    parser.add_argument("--chunksize", type=int, default=100_000,
+                        help="Rows per chunk in --stream and --incremental mode (default: 100000)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record wall/CPU time, rows and peak memory per stage in <session_dir>/profile.json")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="With --profile, also dump a cProfile file per stage into <session_dir>/profile/")
+    return parser.parse_args(argv)
+
+
+def _finish_profile(profiler: StageProfiler, session_dir: str):
+    """Print the stage table and write profile.json when profiling is enabled."""
+    if not profiler.enabled:
+        return
+    print(profiler.report())
+    print(f"\nProfile saved to: {profiler.save(session_dir)}")
+
+
+def _write_merged(df: pd.DataFrame, session_dir: str, profiler: StageProfiler):
+    """Write the merged Parquet store, skipped when the input CSVs are unchanged."""
+    from metrics_store import write_merged_store
+    with profiler.stage('write_merged', rows=len(df)):
+        merged_path, written = write_merged_store(df, session_dir, find_session_csvs(session_dir),
+                                                  df.attrs.get('input_fingerprints'))
+    if written:
+        print(f"\nMerged data saved to: {merged_path}")
+    else:
+        print(f"\nMerged data unchanged: {merged_path}")
 
 
 def main():
-    if len(sys.argv) < 2:
+    args = parse_args()
+    
+    if args.session_dir is None:
         # Find the most recent session
         sessions_dir = 'research-paper/data/sessions'
         if os.path.exists(sessions_dir):
-            sessions = sorted(glob.glob(os.path.join(sessions_dir, '*')))
+            sessions = sorted(d for d in glob.glob(os.path.join(sessions_dir, '*')) if os.path.isdir(d))
             if sessions:
                 session_dir = sessions[-1]
                 print(f"Using most recent session: {session_dir}")
@@ -323,7 +639,7 @@ def main():
             print("Usage: python analyze_metrics.py <session_directory>")
             sys.exit(1)
     else:
-        session_dir = sys.argv[1]
+        session_dir = args.session_dir
     
     if not os.path.exists(session_dir):
         print(f"Error: Directory not found: {session_dir}")
@@ -332,30 +648,107 @@ def main():
     print(f"Analyzing session: {session_dir}")
     print("-" * 40)
     
+    profiler = StageProfiler(enabled=args.profile or args.cprofile,
+                             cprofile_dir=os.path.join(session_dir, 'profile') if args.cprofile else None)
+    
+    if args.follow:
+        from metrics_follow import follow_session
+        from metrics_stream import SummaryAccumulator
+        follower = follow_session(session_dir, poll_interval=args.poll_interval)
+        total = SummaryAccumulator()
+        rows = []
+        for headset_id in sorted(follower.per_headset):
+            total.merge(follower.per_headset[headset_id])
+            rows.append(dict(headset_id=headset_id, **follower.per_headset[headset_id].to_group_statistics()))
+        if total.rows:
+            print_report(total.to_statistics(), pd.DataFrame(rows))
+        return
+    
+    if args.stream:
+        from metrics_stream import stream_session_statistics
+        with profiler.stage('stream_statistics') as record:
+            stats = stream_session_statistics(session_dir, chunksize=args.chunksize)
+            record['rows'] = stats.get('total_samples')
+        if not stats:
+            print("No data to analyze.")
+            sys.exit(1)
+        print_report(stats, pd.DataFrame())
+        with profiler.stage('save'):
+            save_report(stats, pd.DataFrame(), session_dir)
+        _finish_profile(profiler, session_dir)
+        return
+    
+    if args.incremental:
+        from metrics_incremental import incremental_session_statistics
+        with profiler.stage('incremental') as record:
+            stats, per_headset_stats, changes = incremental_session_statistics(session_dir, chunksize=args.chunksize)
+            record['rows'] = stats.get('total_samples')
+        print(f"\nFiles: {changes['new']} new, {changes['changed']} changed, "
+              f"{changes['unchanged']} unchanged, {changes['removed']} removed"
+              + (f", {changes['failed']} unreadable (cached results kept)" if changes['failed'] else ''))
+        if not stats:
+            print("No data to analyze.")
+            sys.exit(1)
+        print_report(stats, per_headset_stats)
+        
+        up_to_date = (changes['new'] + changes['changed'] + changes['removed'] == 0
+                      and os.path.exists(os.path.join(session_dir, 'summary_statistics.json')))
+        if up_to_date:
+            print("No new or changed files; saved reports, merged data and plots are up to date.")
+            _finish_profile(profiler, session_dir)
+            return
+        with profiler.stage('save'):
+            save_report(stats, per_headset_stats, session_dir)
+        
+        # The plots need the raw rows: refresh the store partitions of the changed files and plot from it
+        from metrics_store import refresh_merged_store, read_merged_store
+        with profiler.stage('refresh_store'):
+            refreshed = refresh_merged_store(session_dir, find_session_csvs(session_dir))
+        if refreshed is None:
+            df = load_session_data(session_dir, workers=args.workers, use_processes=args.processes,
+                                   profiler=profiler, use_store=True)
+            _write_merged(df, session_dir, profiler)
+        else:
+            print(f"\nMerged data updated: {refreshed['partitions']} partition(s) from {refreshed['files']} file(s)")
+            with profiler.stage('read') as record:
+                df = read_merged_store(session_dir)
+                record['rows'] = len(df)
+        with profiler.stage('plots', rows=len(df)):
+            create_visualizations(df, session_dir)
+        _finish_profile(profiler, session_dir)
+        return
+    
     # Load data
-    df = load_session_data(session_dir)
+    df = load_session_data(session_dir, workers=args.workers, use_processes=args.processes,
+                           profiler=profiler, use_store=True)
     
     if df.empty:
         print("No data to analyze.")
         sys.exit(1)
     
     # Save merged data
-    merged_path = os.path.join(session_dir, 'merged_metrics.csv')
-    df.to_csv(merged_path, index=False)
-    print(f"\nMerged data saved to: {merged_path}")
+    _write_merged(df, session_dir, profiler)
     
     # Calculate statistics
-    stats = calculate_statistics(df)
-    per_headset_stats = calculate_per_headset_statistics(df)
+    with profiler.stage('statistics', rows=len(df)):
+        stats = calculate_statistics(df)
+    with profiler.stage('breakdowns', rows=len(df)):
+        breakdowns = calculate_breakdowns(df)
+    per_headset_stats = breakdowns.get('headset_id', pd.DataFrame())
     
     # Print report
-    print_report(stats, per_headset_stats)
+    with profiler.stage('report'):
+        print_report(stats, per_headset_stats, breakdowns)
     
     # Save report files
-    save_report(stats, per_headset_stats, session_dir)
+    with profiler.stage('save'):
+        save_report(stats, per_headset_stats, session_dir, breakdowns)
     
     # Create visualizations
-    create_visualizations(df, session_dir)
+    with profiler.stage('plots', rows=len(df)):
+        create_visualizations(df, session_dir)
+    
+    _finish_profile(profiler, session_dir)
 
 
 if __name__ == '__main__':
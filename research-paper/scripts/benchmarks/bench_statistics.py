@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+bench_statistics.py - Compare calculate_statistics with the previous implementation.
+
+Builds a synthetic MetricsLogger frame, times the per-column implementation
+that calculate_statistics replaced against the single-pass engine, and checks
+that both produce the same summary dict.
+
+Usage:
+    python benchmarks/bench_statistics.py [--rows 1000000 100000000] [--headsets 3] [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analyze_metrics import THRESHOLDS, calculate_statistics  # noqa: E402
+
+
+def make_metrics_frame(rows: int, headsets: int = 3, seed: int = 0) -> pd.DataFrame:
+    """Build a sorted synthetic frame with every column calculate_statistics reads."""
+    rng = np.random.default_rng(seed)
+    per_headset = -(-rows // headsets)
+    headset_ids = [f"H_{1000 + i}" for i in range(headsets)]
+    
+    df = pd.DataFrame({
+        'headset_id': pd.Categorical(np.repeat(headset_ids, per_headset)[:rows], categories=headset_ids),
+        'timestamp_sec': np.tile(np.arange(per_headset, dtype=np.float64), headsets)[:rows],
+        'frame_rate_fps': rng.normal(72, 4, rows).astype(np.float32),
+        'frame_time_ms': rng.normal(13.9, 1, rows).astype(np.float32),
+        'network_latency_ms': rng.gamma(2.0, 20.0, rows).astype(np.float32),
+        'packet_loss_pct': rng.exponential(0.3, rows).astype(np.float32),
+        'calibration_error_mm': np.abs(rng.normal(4, 3, rows)).astype(np.float32),
+        'battery_temp_c': rng.normal(36, 2, rows).astype(np.float32),
+        'cpu_usage_pct': rng.uniform(20, 90, rows).astype(np.float32),
+        'memory_used_mb': rng.normal(1800, 100, rows).astype(np.float32),
+        'battery_level': np.tile(np.linspace(100, 40, per_headset).astype(np.int16), headsets)[:rows],
+    })
+    return df
+
+
+def legacy_calculate_statistics(df: pd.DataFrame) -> dict:
+    """calculate_statistics as it was before the single-pass engine."""
+    if df.empty:
+        return {}
+    
+    stats = {
+        # Session info
+        'total_samples': len(df),
+        'headset_count': df['headset_id'].nunique(),
+        'headsets': df['headset_id'].unique().tolist(),
+        'duration_seconds': df['timestamp_sec'].max(),
+        'duration_minutes': df['timestamp_sec'].max() / 60,
+        
+        # Frame rate
+        'fps_mean': df['frame_rate_fps'].mean(),
+        'fps_std': df['frame_rate_fps'].std(),
+        'fps_min': df['frame_rate_fps'].min(),
+        'fps_max': df['frame_rate_fps'].max(),
+        'fps_p5': df['frame_rate_fps'].quantile(0.05),
+        'fps_p95': df['frame_rate_fps'].quantile(0.95),
+        'fps_target_achieved_pct': (df['frame_rate_fps'] >= THRESHOLDS['fps_target']).mean() * 100,
+        'fps_minimum_achieved_pct': (df['frame_rate_fps'] >= THRESHOLDS['fps_minimum']).mean() * 100,
+        
+        # Frame time
+        'frame_time_mean_ms': df['frame_time_ms'].mean(),
+        'frame_time_max_ms': df['frame_time_ms'].max(),
+        
+        # Network latency
+        'latency_mean_ms': df['network_latency_ms'].mean(),
+        'latency_std_ms': df['network_latency_ms'].std(),
+        'latency_min_ms': df['network_latency_ms'].min(),
+        'latency_max_ms': df['network_latency_ms'].max(),
+        'latency_p50_ms': df['network_latency_ms'].quantile(0.50),
+        'latency_p95_ms': df['network_latency_ms'].quantile(0.95),
+        'latency_p99_ms': df['network_latency_ms'].quantile(0.99),
+        'latency_target_achieved_pct': (df['network_latency_ms'] <= THRESHOLDS['latency_target_ms']).mean() * 100,
+        
+        # Packet loss
+        'packet_loss_mean_pct': df['packet_loss_pct'].mean(),
+        'packet_loss_max_pct': df['packet_loss_pct'].max(),
+        'packet_loss_target_achieved_pct': (df['packet_loss_pct'] <= THRESHOLDS['packet_loss_target_pct']).mean() * 100,
+        
+        # Calibration
+        'calibration_mean_mm': df['calibration_error_mm'].mean(),
+        'calibration_std_mm': df['calibration_error_mm'].std(),
+        'calibration_max_mm': df['calibration_error_mm'].max(),
+        'calibration_target_achieved_pct': (df['calibration_error_mm'] <= THRESHOLDS['calibration_target_mm']).mean() * 100,
+        
+        # Battery Temperature
+        'battery_temp_mean_c': df['battery_temp_c'].mean() if 'battery_temp_c' in df.columns else df.get('headset_temp_c', pd.Series([0])).mean(),
+        'battery_temp_max_c': df['battery_temp_c'].max() if 'battery_temp_c' in df.columns else df.get('headset_temp_c', pd.Series([0])).max(),
+        
+        # CPU Usage
+        'cpu_usage_mean_pct': df['cpu_usage_pct'].mean() if 'cpu_usage_pct' in df.columns else 0,
+        'cpu_usage_max_pct': df['cpu_usage_pct'].max() if 'cpu_usage_pct' in df.columns else 0,
+        
+        # Memory Usage
+        'memory_used_mean_mb': df['memory_used_mb'].mean() if 'memory_used_mb' in df.columns else 0,
+        'memory_used_max_mb': df['memory_used_mb'].max() if 'memory_used_mb' in df.columns else 0,
+        
+        # Battery
+        'battery_start_pct': df.groupby('headset_id')['battery_level'].first().mean(),
+        'battery_end_pct': df.groupby('headset_id')['battery_level'].last().mean(),
+        'battery_drain_pct': df.groupby('headset_id')['battery_level'].first().mean() - 
+                            df.groupby('headset_id')['battery_level'].last().mean(),
+    }
+    
+    return stats
+
+
+def time_call(func, df: pd.DataFrame, repeat: int):
+    """Return (best wall time in seconds, result) over ``repeat`` calls."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compare_stats(a: dict, b: dict) -> list:
+    """Return the keys whose values differ between two summary dicts."""
+    mismatched = []
+    for key in a:
+        va, vb = a[key], b.get(key)
+        if isinstance(va, list):
+            if list(va) != list(vb):
+                mismatched.append(key)
+        elif not np.isclose(va, vb, rtol=1e-6, atol=0, equal_nan=True):
+            mismatched.append(key)
+    if list(a) != list(b):
+        mismatched.append('<key order>')
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark calculate_statistics against the previous implementation.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 100_000_000],
+                        help="Frame sizes to benchmark (default: 1M and 100M rows)")
+    parser.add_argument("--headsets", type=int, default=3, help="Number of headsets (default: 3)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed calls per implementation (default: 3)")
+    args = parser.parse_args()
+    
+    print(f"{'rows':>12} {'legacy (s)':>12} {'engine (s)':>12} {'speedup':>9}  match")
+    for rows in args.rows:
+        df = make_metrics_frame(rows, args.headsets)
+        legacy_time, legacy_stats = time_call(legacy_calculate_statistics, df, args.repeat)
+        engine_time, engine_stats = time_call(calculate_statistics, df, args.repeat)
+        mismatched = compare_stats(legacy_stats, engine_stats)
+        
+        print(f"{rows:>12,} {legacy_time:>12.3f} {engine_time:>12.3f} {legacy_time / engine_time:>8.1f}x  "
+              f"{'yes' if not mismatched else 'NO: ' + ', '.join(mismatched)}")
+        del df
+
+
+if __name__ == '__main__':
+    main()
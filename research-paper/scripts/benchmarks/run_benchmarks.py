@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+run_benchmarks.py - Wall time and peak memory of every analysis pipeline stage.
+
+Builds synthetic MetricsLogger session trees at several sizes with
+generate_synthetic_client.generate_fleet (real CSV schema, H<k>/ folders,
+noise fitted to the bundled recordings), then times each stage separately: load_session_data,
+calculate_statistics, calculate_per_headset_statistics, save_report,
+create_visualizations and the analyze_data.py sections. Each stage is timed
+as the best of ``--repeat`` runs, followed by one run under tracemalloc for
+its peak allocation (Python objects and numpy buffers; pyarrow's own memory
+pool is not traced). The results can be saved as JSON and compared against a
+stored baseline; the exit code is 1 when any stage got slower than the
+allowed ratio.
+
+Corpora are cached in ``--corpus-dir`` and reused across runs.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes small medium] [--repeat 3]
+                                        [--output results.json] [--compare baseline.json]
+
+Example:
+    python benchmarks/run_benchmarks.py --sizes small --output baseline.json
+    python benchmarks/run_benchmarks.py --sizes small --compare baseline.json --max-slowdown 1.2
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import matplotlib  # noqa: E402
+matplotlib.use('Agg')
+
+import analyze_data  # noqa: E402
+from analyze_metrics import (load_session_data, calculate_statistics,  # noqa: E402
+                             calculate_per_headset_statistics, save_report, create_visualizations)
+from figure_pipeline import CACHE_FILENAME  # noqa: E402
+from generate_synthetic_client import generate_fleet  # noqa: E402
+from metrics_io import find_session_csvs  # noqa: E402
+
+
+# Corpus presets: name -> (total rows, headsets)
+CORPUS_SIZES = {
+    'small': (10_000, 3),
+    'medium': (1_000_000, 10),
+    'large': (10_000_000, 30),
+    'huge': (100_000_000, 100),
+}
+
+# Rows per generated session (all headsets), so building a corpus needs bounded memory
+SESSION_CHUNK_ROWS = 1_000_000
+
+# Recordings the synthetic corpora are modelled on
+SOURCE_SESSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'sessions', '20251209')
+
+
+def write_corpus(corpus_root: str, rows: int, headsets: int, seed: int = 0) -> str:
+    """
+    Write about ``rows`` samples over ``headsets`` headsets with generate_fleet
+    and return the session dir. Large corpora are split into several
+    sessions a minute apart, which share one <yyyyMMdd>/H<k>/ tree.
+    """
+    sources = find_session_csvs(SOURCE_SESSION_DIR)[:headsets]
+    if not sources:
+        raise FileNotFoundError(f"No source recordings in {SOURCE_SESSION_DIR}")
+    samples = -(-min(rows, SESSION_CHUNK_ROWS) // headsets)
+    sessions = -(-rows // (samples * headsets))
+    with redirect_stdout(io.StringIO()):
+        written = generate_fleet(sources, headsets, sessions, output_dir=corpus_root, seed=seed,
+                                 samples=samples, session_spacing=timedelta(minutes=1))
+    session_dirs = {os.path.dirname(os.path.dirname(path)) for path in written}
+    if len(session_dirs) != 1:
+        raise RuntimeError(f"Corpus spans several days: {sorted(session_dirs)}")
+    return session_dirs.pop()
+
+
+def ensure_corpus(corpus_dir: str, name: str, rows: int, headsets: int) -> str:
+    """Return the session dir for a corpus, building it unless a complete copy exists."""
+    corpus_root = os.path.join(corpus_dir, f"{name}_{rows}x{headsets}")
+    marker = os.path.join(corpus_root, '.complete')
+    if os.path.exists(marker):
+        with open(marker, 'r') as f:
+            session_name = f.read().strip()
+        # An empty marker is a corpus from before generate_fleet: rebuild it
+        if session_name:
+            return os.path.join(corpus_root, session_name)
+    shutil.rmtree(corpus_root, ignore_errors=True)
+    print(f"Building corpus {name}: {rows:,} rows, {headsets} headsets in {corpus_root}")
+    session_dir = write_corpus(corpus_root, rows, headsets)
+    with open(marker, 'w') as f:
+        f.write(os.path.basename(session_dir))
+    return session_dir
+
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """Best wall time over ``repeat`` runs, then peak traced allocation of one more run."""
+    best = float('inf')
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        with redirect_stdout(io.StringIO()):
+            func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'wall_s': best, 'peak_mb': peak / 1e6}
+
+
+def benchmark_corpus(session_dir: str, repeat: int, stages: list = None) -> dict:
+    """Time every pipeline stage on one corpus; returns {stage: {'wall_s', 'peak_mb'}}."""
+    out_dir = tempfile.mkdtemp(prefix='bench_out_')
+    with redirect_stdout(io.StringIO()):
+        df = load_session_data(session_dir)
+        stats = calculate_statistics(df)
+        per_headset = calculate_per_headset_statistics(df)
+        tech_perf = analyze_data.load_tech_perf(analyze_data.find_headset_files(session_dir))
+    demo_perf = pd.DataFrame()
+
+    def clear_figure_cache():
+        for root in (out_dir, os.path.join(out_dir, 'figures')):
+            path = os.path.join(root, CACHE_FILENAME)
+            if os.path.exists(path):
+                os.remove(path)
+
+    benchmarks = {
+        'load_session_data': (lambda: load_session_data(session_dir), None),
+        'calculate_statistics': (lambda: calculate_statistics(df), None),
+        'calculate_per_headset_statistics': (lambda: calculate_per_headset_statistics(df), None),
+        'save_report': (lambda: save_report(stats, per_headset, out_dir), None),
+        'create_visualizations': (lambda: create_visualizations(df, out_dir), clear_figure_cache),
+        'analyze_data.load': (lambda: analyze_data.load_tech_perf(analyze_data.find_headset_files(session_dir)), None),
+        'analyze_data.rq12': (lambda: analyze_data.report_technical_performance(tech_perf), None),
+        'analyze_data.rq45': (lambda: analyze_data.report_stability(tech_perf), None),
+        'analyze_data.figures': (lambda: analyze_data.generate_figures(
+            tech_perf, demo_perf, os.path.join(out_dir, 'figures'), workers=1, force=True), None),
+        'analyze_data.summary': (lambda: analyze_data.report_summary(tech_perf), None),
+    }
+
+    results = {}
+    try:
+        for name, (func, setup) in benchmarks.items():
+            if stages and name not in stages:
+                continue
+            results[name] = measure(func, repeat, setup)
+            print(f"  {name:<34} {results[name]['wall_s']:>9.3f} s {results[name]['peak_mb']:>10.1f} MB")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def compare_results(current: dict, baseline: dict, max_slowdown: float) -> list:
+    """Return (key, baseline s, current s, ratio) for every stage slower than ``max_slowdown``."""
+    regressions = []
+    for key, result in current['results'].items():
+        base = baseline.get('results', {}).get(key)
+        if not base or base['wall_s'] <= 0:
+            continue
+        ratio = result['wall_s'] / base['wall_s']
+        if ratio > max_slowdown:
+            regressions.append((key, base['wall_s'], result['wall_s'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline stages on synthetic corpora.")
+    parser.add_argument("--sizes", nargs="+", choices=list(CORPUS_SIZES), default=['small', 'medium'],
+                        help="Corpus presets to run (default: small medium)")
+    parser.add_argument("--stages", nargs="+", default=None, help="Only run these stages (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (default: 3)")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), 'metrics_bench_corpus'),
+                        help="Where synthetic corpora are built and cached")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=1.25,
+                        help="Fail when a stage is slower than this ratio of the baseline (default: 1.25)")
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+
+    for name in args.sizes:
+        rows, headsets = CORPUS_SIZES[name]
+        session_dir = ensure_corpus(args.corpus_dir, name, rows, headsets)
+        print(f"\n{name}: {rows:,} rows, {headsets} headsets")
+        for stage, result in benchmark_corpus(session_dir, args.repeat, args.stages).items():
+            results['results'][f"{name}/{stage}"] = dict(result, rows=rows, headsets=headsets)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.max_slowdown)
+        print(f"\nCompared with {args.compare} (max slowdown {args.max_slowdown:g}x):")
+        for key, base_s, current_s, ratio in regressions:
+            print(f"  SLOWER {key}: {base_s:.3f} s -> {current_s:.3f} s ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("  No regressions.")
+
+
+if __name__ == '__main__':
+    main()
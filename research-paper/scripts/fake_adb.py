@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+fake_adb.py - Stand-in for adb that serves headsets from local folders.
+
+Every folder under $FAKE_ADB_ROOT is one connected device named after the
+folder. Its files are the device's storage (<serial>/sdcard/...), an
+optional <serial>/props file holds `key=value` lines for getprop, and an
+optional <serial>/battery file is what `dumpsys battery` prints. Only the
+commands pull_metrics.py uses are supported: `devices`, `-s <serial> shell
+<command>` (run by the local sh with /sdcard mapped into the folder) and
+`-s <serial> pull <remote> <local>`. $FAKE_ADB_DELAY adds a delay in seconds
+to every call, like a slow USB link.
+
+Usage:
+    FAKE_ADB_ROOT=/tmp/devices python pull_metrics.py --adb "python fake_adb.py"
+"""
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+
+
+def main():
+    root = os.environ.get('FAKE_ADB_ROOT')
+    if not root or not os.path.isdir(root):
+        print("error: FAKE_ADB_ROOT is not a directory", file=sys.stderr)
+        sys.exit(1)
+    time.sleep(float(os.environ.get('FAKE_ADB_DELAY', 0)))
+
+    args = sys.argv[1:]
+    serials = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    if args == ['devices']:
+        print("List of devices attached")
+        for serial in serials:
+            print(f"{serial}\tdevice")
+        return
+
+    if len(args) < 3 or args[0] != '-s':
+        print(f"error: unsupported command: {' '.join(args)}", file=sys.stderr)
+        sys.exit(1)
+    serial, command, rest = args[1], args[2], args[3:]
+    if serial not in serials:
+        print(f"adb: device '{serial}' not found", file=sys.stderr)
+        sys.exit(1)
+    device = os.path.join(root, serial)
+
+    if command == 'pull' and len(rest) == 2:
+        remote, local = rest
+        source = os.path.join(device, remote.lstrip('/'))
+        if not os.path.isfile(source):
+            print(f"adb: error: failed to stat remote object '{remote}': No such file or directory", file=sys.stderr)
+            sys.exit(1)
+        shutil.copyfile(source, local)
+        print(f"{remote}: 1 file pulled.")
+        return
+
+    if command == 'shell' and rest:
+        functions = (
+            f"getprop() {{ sed -n \"s/^$1=//p\" '{device}/props' 2>/dev/null; }}; "
+            f"dumpsys() {{ cat '{device}/battery' 2>/dev/null || echo '  level: 100'; }}; "
+        )
+        script = ' '.join(rest).replace('/sdcard/', f"{device}/sdcard/")
+        sys.exit(subprocess.run(['sh', '-c', functions + script]).returncode)
+
+    print(f"error: unsupported command: {' '.join(args)}", file=sys.stderr)
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
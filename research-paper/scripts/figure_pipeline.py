@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+figure_pipeline.py - Parallel, cached figure rendering.
+
+Every figure is a self-contained FigureJob: a module-level render function,
+the DataFrame holding only the columns it draws, and its output path. Jobs
+render in a process pool using the Agg backend. A job is skipped when the
+hash of its input data and of the plotting code it calls matches the last
+render of the same file, as recorded in <output_dir>/.figure_cache.json.
+
+Usage:
+    python figure_pipeline.py <session_dir> [<session_dir> ...] [--workers N] [--force]
+"""
+
+import os
+import sys
+import json
+import inspect
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+
+CACHE_FILENAME = '.figure_cache.json'
+
+# Bump to re-render every figure after a change the cache key cannot see
+# (e.g. a matplotlib/seaborn upgrade or a new default style)
+FIGURE_PIPELINE_VERSION = 1
+
+_SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _referenced_names(code) -> set:
+    """Global names used by ``code`` and the lambdas/comprehensions nested in it."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _referenced_names(const)
+    return names
+
+
+def _is_local(obj) -> bool:
+    try:
+        return os.path.dirname(os.path.abspath(inspect.getsourcefile(obj))) == _SCRIPTS_DIR
+    except TypeError:
+        return False
+
+
+def _dependency_sources(render) -> list:
+    """
+    Source the output of ``render`` depends on besides its own body.
+
+    Helpers from the same module contribute their source; helpers imported
+    from another script (e.g. metrics_plot.plot_series) contribute that whole
+    module, so a change to the downsampling behind them re-renders the figure.
+    Plain constants such as THRESHOLDS contribute their value.
+    """
+    sources = {}
+    for name in sorted(_referenced_names(render.__code__)):
+        value = render.__globals__.get(name)
+        if inspect.isfunction(value) and value is not render and _is_local(value):
+            source_of = value if value.__module__ == render.__module__ else inspect.getmodule(value)
+            try:
+                sources.setdefault(source_of.__name__, inspect.getsource(source_of))
+            except (OSError, TypeError):
+                pass
+        elif isinstance(value, (int, float, str, list, tuple, dict)):
+            sources[name] = f"{name} = {json.dumps(value, sort_keys=True, default=str)}"
+    return list(sources.values())
+
+
+class FigureJob:
+    """One figure: ``render(data, output_path, **options)`` writes ``output_path``."""
+
+    def __init__(self, name: str, render, data: pd.DataFrame, output_path: str, **options):
+        self.name = name
+        self.render = render
+        self.data = data
+        self.output_path = output_path
+        self.options = options
+
+    def input_hash(self) -> str:
+        """Hash of the pipeline version, the plotting code, the options and the input data."""
+        digest = hashlib.sha1()
+        digest.update(f"v{FIGURE_PIPELINE_VERSION}:{self.render.__module__}.{self.render.__qualname__}".encode())
+        try:
+            digest.update(inspect.getsource(self.render).encode())
+        except (OSError, TypeError):
+            pass
+        for source in _dependency_sources(self.render):
+            digest.update(source.encode())
+        digest.update(json.dumps(self.options, sort_keys=True, default=str).encode())
+        digest.update(json.dumps([[c, str(t)] for c, t in self.data.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(self.data, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+
+def _load_cache(output_dir: str) -> dict:
+    path = os.path.join(output_dir, CACHE_FILENAME)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  Ignoring unreadable figure cache {path}: {e}")
+    return {}
+
+
+def _save_cache(output_dir: str, cache: dict):
+    path = os.path.join(output_dir, CACHE_FILENAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _use_agg():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _run_job(job: FigureJob) -> str:
+    job.render(job.data, job.output_path, **job.options)
+    return job.output_path
+
+
+def render_figures(jobs: list, workers: int = None, force: bool = False) -> dict:
+    """
+    Render ``jobs`` whose input changed since the last run.
+
+    ``workers`` defaults to one process per job (up to the CPU count);
+    ``workers=1`` renders in this process. Returns counts of rendered,
+    skipped and failed figures.
+    """
+    counts = {'rendered': 0, 'skipped': 0, 'failed': 0}
+    caches = {}
+    pending = []
+    for job in jobs:
+        output_dir = os.path.dirname(os.path.abspath(job.output_path))
+        os.makedirs(output_dir, exist_ok=True)
+        cache = caches.setdefault(output_dir, _load_cache(output_dir))
+        key = os.path.basename(job.output_path)
+        job_hash = job.input_hash()
+        if not force and cache.get(key) == job_hash and os.path.exists(job.output_path):
+            print(f"  - Unchanged: {job.output_path} (skipped)")
+            counts['skipped'] += 1
+            continue
+        pending.append((job, output_dir, key, job_hash))
+
+    def finished(entry, error=None):
+        job, output_dir, key, job_hash = entry
+        if error is not None:
+            print(f"  Error rendering {job.name}: {error}")
+            counts['failed'] += 1
+            return
+        caches[output_dir][key] = job_hash
+        counts['rendered'] += 1
+        print(f"  ✓ Saved: {job.output_path}")
+
+    workers = workers or min(len(pending), os.cpu_count() or 1)
+    if workers <= 1 or len(pending) <= 1:
+        for entry in pending:
+            try:
+                _run_job(entry[0])
+                finished(entry)
+            except Exception as e:
+                finished(entry, e)
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_use_agg) as executor:
+            futures = {executor.submit(_run_job, entry[0]): entry for entry in pending}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    finished(futures[future])
+                except Exception as e:
+                    finished(futures[future], e)
+
+    for output_dir, cache in caches.items():
+        _save_cache(output_dir, cache)
+    return counts
+
+
+def session_figure_jobs(session_dir: str, output_dir: str = None) -> list:
+    """
+    All figures for one session: the metrics overview in ``session_dir`` and
+    the analyze_data.py figures in ``output_dir`` (default <session_dir>/figures).
+    """
+    from analyze_metrics import load_session_data, metrics_overview_job
+    from analyze_data import figure_jobs, load_demo_data, load_tech_perf
+    from metrics_io import find_session_csvs
+
+    jobs = []
+    df = load_session_data(session_dir)
+    if not df.empty:
+        jobs.append(metrics_overview_job(df, session_dir))
+    csv_files = find_session_csvs(session_dir)
+    if csv_files:
+        tech_perf = load_tech_perf(csv_files)
+        demo_perf, _ = load_demo_data()
+        jobs.extend(figure_jobs(tech_perf, demo_perf, output_dir or os.path.join(session_dir, 'figures')))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the figures of one or more sessions in parallel.")
+    parser.add_argument("session_dirs", nargs="+", help="Session directories")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Re-render figures whose input is unchanged")
+    args = parser.parse_args()
+
+    jobs = []
+    for session_dir in args.session_dirs:
+        if not os.path.isdir(session_dir):
+            print(f"Error: Directory not found: {session_dir}")
+            sys.exit(1)
+        jobs.extend(session_figure_jobs(session_dir))
+
+    print(f"\nRendering {len(jobs)} figure(s)...")
+    counts = render_figures(jobs, workers=args.workers, force=args.force)
+    print(f"\n{counts['rendered']} rendered, {counts['skipped']} unchanged, {counts['failed']} failed")
+    if counts['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
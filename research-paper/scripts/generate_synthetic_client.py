@@ -3,12 +3,20 @@ import numpy as np
 import argparse
 import os
 import json
-import random
-from datetime import datetime
+from datetime import datetime, timedelta
 
-def generate_synthetic_data(input_csv_path, output_dir=None):
+from metrics_io import METRICS_COLUMNS, normalize_metrics_frame, read_metrics_csv
+from session_index import SESSION_FILE_RE, parse_timestamp
+from synthetic_noise import NOISE_COLUMNS, NOISE_MODELS
+
+# Headset ids are H_1000 .. H_9999, like the real devices
+HEADSET_ID_RANGE = (1000, 10000)
+
+def generate_synthetic_data(input_csv_path, output_dir=None, noise='iid', seed=None):
     """
     Generates a synthetic client dataset based on an existing client's CSV data.
+
+    ``noise`` names a model in synthetic_noise.NOISE_MODELS.
     """
     
     if not os.path.exists(input_csv_path):
@@ -16,49 +24,26 @@ def generate_synthetic_data(input_csv_path, output_dir=None):
         return
 
     print(f"Reading source data from: {input_csv_path}")
-    df = pd.read_csv(input_csv_path)
+    df = read_metrics_csv(input_csv_path)
     
+    rng = np.random.default_rng(seed)
+
     # Generate new Headset ID
     original_hid = df['headset_id'].iloc[0]
-    new_hid = f"H_{random.randint(1000, 9999)}"
+    new_hid = f"H_{rng.integers(*HEADSET_ID_RANGE)}"
     print(f"Generating synthetic client: {new_hid} (based on {original_hid})")
 
     # Create synthetic dataframe
     synth_df = df.copy()
     synth_df['headset_id'] = new_hid
     
-    # Apply realistic variations to metrics
-    
-    # 1. Frame Rate: Add small jitter (+/- 1-2 FPS), clamp to reasonable range
-    # Quest 3 target is 72Hz, usually stable but can drop
-    fps_noise = np.random.normal(0, 0.5, size=len(df))
-    synth_df['frame_rate_fps'] = df['frame_rate_fps'] + fps_noise
-    synth_df['frame_rate_fps'] = synth_df['frame_rate_fps'].clip(30, 75) # Clamp
-    
-    # 2. Network Latency: Add jitter (+/- 5-10ms), ensure no negative
-    # Latency often has spikes, so we might add some random spikes too
-    latency_noise = np.random.normal(2, 5, size=len(df)) # Add 2ms bias (maybe further away?)
-    synth_df['network_latency_ms'] = df['network_latency_ms'] + latency_noise
-    
-    # Add occasional spikes (5% chance of 20-50ms spike)
-    spikes = np.random.choice([0, 1], size=len(df), p=[0.95, 0.05]) * np.random.uniform(20, 50, size=len(df))
-    synth_df['network_latency_ms'] += spikes
-    synth_df['network_latency_ms'] = synth_df['network_latency_ms'].clip(lower=1)
-
-    # 3. Calibration Error: Add small drift (+/- 1-3mm)
-    calib_noise = np.random.normal(0, 1.5, size=len(df))
-    synth_df['calibration_error_mm'] = df['calibration_error_mm'] + calib_noise
-    synth_df['calibration_error_mm'] = synth_df['calibration_error_mm'].abs() # Error is magnitude
-
-    # 4. Battery Temp: Start slightly different, trend similarly
-    temp_offset = np.random.uniform(-1.0, 1.0)
-    synth_df['battery_temp_c'] = df['battery_temp_c'] + temp_offset
-    
-    # 5. Battery Level: Start slightly different
-    battery_offset = np.random.randint(-5, 5)
-    synth_df['battery_level'] = (df['battery_level'] + battery_offset).clip(0, 100)
+    # Apply realistic variations to metrics (see synthetic_noise.py)
+    model = NOISE_MODELS[noise].fit(df)
+    base = {col: df[col].to_numpy(dtype=np.float64) for col in NOISE_COLUMNS}
+    for col, values in model.apply(base, 1, rng).items():
+        synth_df[col] = values[0].astype(df[col].dtype) if col == 'battery_level' else values[0]
 
-    # 6. Participant Count: 
+    # Participant Count: 
     # If we are simulating a 3rd player, technically the count in the logs *should* have been 3
     # but since we are faking it post-hoc, we can either leave it as 2 (what was observed) 
     # or update it to 3 to pretend it was a 3-player session.
@@ -66,6 +51,7 @@ def generate_synthetic_data(input_csv_path, output_dir=None):
     # Assuming the original had 2. If it had 1, we make it 2.
     # Actually, let's just increment it by 1 to represent "this added player".
     synth_df['participant_count'] = synth_df['participant_count'] + 1
+    synth_df = normalize_metrics_frame(synth_df)
 
     # Determine output path
     if output_dir is None:
@@ -101,11 +87,187 @@ def generate_synthetic_data(input_csv_path, output_dir=None):
     else:
         print("No metadata JSON found, skipping.")
 
+def _load_source(csv_path):
+    """Read a source session and its metadata (empty dict if there is none)."""
+    df = read_metrics_csv(csv_path)
+    meta = {}
+    json_path = csv_path.replace('.csv', '_metadata.json')
+    if os.path.exists(json_path):
+        with open(json_path, 'r', encoding='utf-8-sig') as f:
+            meta = json.load(f)
+    return df, meta
+
+
+def _source_start(csv_path, meta):
+    """Start time of a source session from its metadata, else from its file name."""
+    start = parse_timestamp(meta.get('startTime'))
+    if start is None:
+        match = SESSION_FILE_RE.match(os.path.basename(csv_path))
+        start = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S') if match else datetime.now()
+    return start
+
+
+def _format_timestamp(dt):
+    """ISO-8601 with 7 fractional digits, like C#'s DateTime "o" format."""
+    text = dt.isoformat(timespec='microseconds')
+    return text[:26] + '0' + text[26:]
+
+
+def _tile_source(df, length):
+    """
+    Repeat a source session until it has ``length`` samples.
+
+    Timestamps continue across repeats and the battery keeps draining at the
+    source's rate, so a 20-minute source can back a multi-hour session.
+    """
+    n = len(df)
+    reps = -(-length // n)
+    idx = np.tile(np.arange(n), reps)[:length]
+    rep = np.repeat(np.arange(reps), n)[:length]
+
+    ts = df['timestamp_sec'].to_numpy(dtype=np.float64)
+    step = np.median(np.diff(ts)) if n > 1 else 1.0
+    period = ts[-1] - ts[0] + step
+    battery = df['battery_level'].to_numpy(dtype=np.float64)
+    drain = max(battery[0] - battery[-1], 0)
+
+    return {
+        'timestamp_sec': ts[idx] + rep * period,
+        'frame_rate_fps': df['frame_rate_fps'].to_numpy(dtype=np.float64)[idx],
+        'network_latency_ms': df['network_latency_ms'].to_numpy(dtype=np.float64)[idx],
+        'calibration_error_mm': df['calibration_error_mm'].to_numpy(dtype=np.float64)[idx],
+        'battery_temp_c': df['battery_temp_c'].to_numpy(dtype=np.float64)[idx],
+        'battery_level': battery[idx] - rep * drain,
+        'scene_state': df['scene_state'].astype(str).to_numpy()[idx],
+    }
+
+
+def generate_fleet(input_csv_paths, n_headsets, n_sessions=1, output_dir='.',
+                   duration_min=None, seed=None, noise='iid', samples=None,
+                   session_spacing=timedelta(days=1)):
+    """
+    Generate ``n_headsets`` synthetic headsets x ``n_sessions`` sessions in bulk.
+
+    Every metric is drawn for all headsets of a session at once as an
+    (n_headsets, samples) array from a seeded np.random.Generator, with the
+    ``noise`` model fitted to each source. Headset k of session m is
+    based on source (k + m) mod len(sources). participant_count is
+    ``n_headsets`` throughout. Each headset session has ``samples`` rows
+    (default: ``duration_min`` worth). Sessions start ``session_spacing``
+    apart (default one day) and are written like real recordings:
+    <output_dir>/<yyyyMMdd>/H<k>/session_<id>_<headset>.csv with a metadata
+    JSON next to each file, so sessions on the same day share a folder.
+
+    Returns the list of written CSV files.
+    """
+    lo, hi = HEADSET_ID_RANGE
+    if n_headsets > hi - lo:
+        raise ValueError(f"At most {hi - lo} headsets can be given unique ids")
+
+    rng = np.random.default_rng(seed)
+    sources = [_load_source(path) for path in input_csv_paths]
+    if samples:
+        length = int(samples)
+    elif duration_min:
+        length = int(duration_min * 60 / np.median(np.diff(sources[0][0]['timestamp_sec'])))
+    else:
+        length = min(len(df) for df, _ in sources)
+    tiled = [_tile_source(df, length) for df, _ in sources]
+    models = [NOISE_MODELS[noise].fit(df) for df, _ in sources]
+    base_meta = sources[0][1]
+    base_start = _source_start(input_csv_paths[0], base_meta)
+
+    headset_ids = np.array([f"H_{n}" for n in rng.choice(np.arange(lo, hi), size=n_headsets, replace=False)])
+    print(f"Generating {n_headsets} headsets x {n_sessions} sessions x {length} samples "
+          f"from {len(sources)} source session(s) (seed={seed})")
+
+    written = []
+    shape = (n_headsets, length)
+    for m in range(n_sessions):
+        pick = (np.arange(n_headsets) + m) % len(sources)
+
+        # Each source's headsets get their noise in one vectorized draw
+        series = {col: np.empty(shape) for col in NOISE_COLUMNS + ['timestamp_sec']}
+        scenes = np.empty(shape, dtype=object)
+        for src, model in enumerate(models):
+            rows = pick == src
+            if not rows.any():
+                continue
+            for col, values in model.apply(tiled[src], int(rows.sum()), rng).items():
+                series[col][rows] = values
+            series['timestamp_sec'][rows] = tiled[src]['timestamp_sec']
+            scenes[rows] = tiled[src]['scene_state']
+        timestamps = series['timestamp_sec']
+
+        start = base_start + m * session_spacing
+        session_id = start.strftime('%Y%m%d_%H%M%S')
+        session_dir = os.path.join(output_dir, start.strftime('%Y%m%d'))
+
+        for k, headset_id in enumerate(headset_ids):
+            frame = pd.DataFrame({
+                'session_id': session_id,
+                'headset_id': headset_id,
+                'participant_count': n_headsets,
+                'timestamp_sec': timestamps[k].round(2),
+                'frame_rate_fps': series['frame_rate_fps'][k].round(1),
+                'network_latency_ms': series['network_latency_ms'][k].round(1),
+                'calibration_error_mm': series['calibration_error_mm'][k].round(2),
+                'battery_temp_c': series['battery_temp_c'][k].round(1),
+                'battery_level': series['battery_level'][k].astype(np.int64),
+                'scene_state': scenes[k],
+            }, columns=METRICS_COLUMNS)
+            frame = normalize_metrics_frame(frame)
+
+            headset_dir = os.path.join(session_dir, f"H{k + 1}")
+            os.makedirs(headset_dir, exist_ok=True)
+            stem = os.path.join(headset_dir, f"session_{session_id}_{headset_id}")
+            frame.to_csv(stem + '.csv', index=False)
+            written.append(stem + '.csv')
+
+            duration_sec = float(timestamps[k, -1])
+            meta = dict(base_meta)
+            meta.update({
+                'sessionId': session_id,
+                'headsetId': headset_id,
+                'startTime': _format_timestamp(start),
+                'endTime': _format_timestamp(start + timedelta(seconds=duration_sec)),
+                'durationMinutes': duration_sec / 60,
+                'totalMetrics': length,
+            })
+            with open(stem + '_metadata.json', 'w') as f:
+                json.dump(meta, f, indent=4)
+
+        print(f"  Session {session_id}: {n_headsets} files in {session_dir}")
+
+    return written
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate synthetic client data from existing session CSV.")
-    parser.add_argument("input_csv", help="Path to the source client CSV file")
+    parser.add_argument("input_csv", nargs="+", help="Path to the source client CSV file (several allowed with --headsets)")
     parser.add_argument("--output_dir", help="Directory to save the synthetic data (default: same as input)", default=None)
+    parser.add_argument("--headsets", type=int, default=None,
+                        help="Bulk mode: number of synthetic headsets per session")
+    parser.add_argument("--sessions", type=int, default=1, help="Bulk mode: number of sessions (default: 1)")
+    parser.add_argument("--duration-min", type=float, default=None,
+                        help="Bulk mode: session length in minutes, repeating the sources as needed "
+                             "(default: length of the shortest source)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible output")
+    parser.add_argument("--noise", choices=sorted(NOISE_MODELS), default='iid',
+                        help="Noise model: 'iid' jitter (default) or 'correlated' bursts and thermal drift "
+                             "fitted to the source")
     
     args = parser.parse_args()
     
-    generate_synthetic_data(args.input_csv, args.output_dir)
+    if args.headsets is None:
+        if len(args.input_csv) > 1:
+            parser.error("several input files require bulk mode (--headsets N)")
+        generate_synthetic_data(args.input_csv[0], args.output_dir, noise=args.noise, seed=args.seed)
+    else:
+        missing = [p for p in args.input_csv if not os.path.exists(p)]
+        if missing:
+            parser.error(f"input file not found: {missing[0]}")
+        if args.output_dir is None:
+            parser.error("bulk mode writes a session tree and needs --output_dir")
+        generate_fleet(args.input_csv, args.headsets, args.sessions, output_dir=args.output_dir,
+                       duration_min=args.duration_min, seed=args.seed, noise=args.noise)
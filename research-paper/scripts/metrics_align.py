@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+metrics_align.py - Align headsets on one wall-clock timeline.
+
+Each headset's timestamp_sec is relative to its own session start, so rows
+from different devices cannot be compared directly. The startTime in every
+*_metadata.json marks timestamp_sec = 0 for that CSV, which puts each sample
+on a shared wall clock. All headsets are then resampled onto a common grid
+with one as-of join, giving a wide (metric, headset) frame from which
+simultaneous latency spikes and FPS dips can be told apart from problems
+on a single device.
+
+Usage:
+    python metrics_align.py <session_dir> [--freq 1s] [--tolerance 1s]
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from analyze_metrics import THRESHOLDS, load_session_data
+from metrics_io import find_session_csvs
+from session_index import SESSION_FILE_RE, parse_timestamp
+
+
+# Metrics carried onto the aligned grid
+ALIGNED_COLUMNS = ['frame_rate_fps', 'network_latency_ms', 'calibration_error_mm', 'battery_temp_c']
+
+# Cross-headset checks: name -> (column, comparison, threshold)
+CROSS_CHECKS = {
+    'latency_spike': ('network_latency_ms', '>', THRESHOLDS['latency_target_ms']),
+    'fps_dip': ('frame_rate_fps', '<', THRESHOLDS['fps_minimum']),
+}
+
+
+def session_start_times(csv_files: list) -> dict:
+    """
+    Map each CSV's base name to the UTC wall-clock time of its timestamp_sec = 0.
+
+    Uses startTime from the metadata JSON; CSVs without metadata fall back to
+    the session id in the file name, read as local time.
+    """
+    starts = {}
+    for csv_file in csv_files:
+        name = os.path.basename(csv_file)
+        meta_path = csv_file[:-len('.csv')] + '_metadata.json'
+        start = None
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path, 'r', encoding='utf-8-sig') as f:
+                    start = parse_timestamp(json.load(f).get('startTime'))
+            except (OSError, ValueError) as e:
+                print(f"  Error reading {meta_path}: {e}")
+        if start is None:
+            match = SESSION_FILE_RE.match(name)
+            if not match:
+                print(f"  No start time for {csv_file}; skipped")
+                continue
+            start = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+            print(f"  No metadata for {name}; using the file name time (local)")
+        if start.tzinfo is None:
+            start = start.astimezone()
+        starts[name] = pd.Timestamp(start).tz_convert('UTC')
+    return starts
+
+
+def add_wall_clock(df: pd.DataFrame, starts: dict) -> pd.DataFrame:
+    """Add a UTC ``wall_time`` column from each row's source_file start time."""
+    start = df['source_file'].astype(object).map(starts)
+    aligned = df.loc[start.notna()].copy()
+    aligned['wall_time'] = (pd.to_datetime(start[start.notna()], utc=True)
+                            + pd.to_timedelta(aligned['timestamp_sec'], unit='s'))
+    return aligned
+
+
+def align_headsets(df: pd.DataFrame, freq: str = '1s', tolerance: str = '1s',
+                   columns: list = None) -> pd.DataFrame:
+    """
+    Resample every headset onto a common wall-clock grid with one as-of join.
+
+    The grid holds each ``freq`` slot in which at least one headset logged,
+    so gaps between sessions cost nothing. Each headset is only joined over
+    the span it was active, taking its nearest sample within ``tolerance``.
+    Returns a long frame with columns wall_time, headset_id and the metrics.
+    """
+    columns = [c for c in (columns or ALIGNED_COLUMNS) if c in df.columns]
+    if df.empty:
+        return pd.DataFrame(columns=['wall_time', 'headset_id'] + columns)
+
+    right = df[['wall_time', 'headset_id'] + columns].copy()
+    right['headset_id'] = right['headset_id'].astype(str)
+    right = right.sort_values('wall_time', kind='stable')
+
+    grid = pd.DatetimeIndex(np.unique(right['wall_time'].dt.floor(freq)))
+    spans = right.groupby('headset_id', sort=True)['wall_time'].agg(['min', 'max'])
+
+    slack = pd.Timedelta(tolerance)
+    left_parts = []
+    for headset_id, span in spans.iterrows():
+        active = grid[(grid >= span['min'] - slack) & (grid <= span['max'] + slack)]
+        left_parts.append(pd.DataFrame({'wall_time': active, 'headset_id': headset_id}))
+    left = pd.concat(left_parts, ignore_index=True).sort_values('wall_time', kind='stable')
+
+    aligned = pd.merge_asof(left, right, on='wall_time', by='headset_id',
+                            direction='nearest', tolerance=slack)
+    return aligned.sort_values(['wall_time', 'headset_id'], kind='stable').reset_index(drop=True)
+
+
+def to_wide(aligned: pd.DataFrame) -> pd.DataFrame:
+    """Pivot the aligned long frame to wall_time rows x (metric, headset_id) columns."""
+    return aligned.pivot(index='wall_time', columns='headset_id')
+
+
+def _crosses(values, op: str, threshold: float):
+    """Elementwise threshold test; NaN (headset inactive) never crosses."""
+    return values > threshold if op == '>' else values < threshold
+
+
+def cross_headset_timeline(wide: pd.DataFrame, min_shared: int = 2, shared_fraction: float = 0.5) -> pd.DataFrame:
+    """
+    Classify each grid slot's latency spikes and FPS dips as shared or single-device.
+
+    A slot is 'network-wide' when at least ``min_shared`` headsets and at
+    least ``shared_fraction`` of the active ones cross the threshold together,
+    and 'single-device' when exactly one does.
+    """
+    timeline = pd.DataFrame(index=wide.index)
+    for name, (col, op, threshold) in CROSS_CHECKS.items():
+        if col not in wide.columns.get_level_values(0):
+            continue
+        values = wide[col].to_numpy(dtype=np.float64)
+        active = ~np.isnan(values)
+        hits = _crosses(values, op, threshold)
+        n_active = active.sum(axis=1)
+        n_hits = hits.sum(axis=1)
+
+        timeline[f'{name}_active'] = n_active
+        timeline[f'{name}_count'] = n_hits
+        shared = (n_hits >= min_shared) & (n_hits >= shared_fraction * n_active)
+        timeline[f'{name}_scope'] = np.select([shared, n_hits == 1, n_hits > 0],
+                                              ['network-wide', 'single-device', 'partial'], default='')
+    return timeline
+
+
+def summarize_timeline(timeline: pd.DataFrame, wide: pd.DataFrame) -> dict:
+    """Count shared vs single-device slots overall and, for isolated ones, per headset."""
+    summary = {'grid_slots': len(timeline)}
+    for name, (col, op, threshold) in CROSS_CHECKS.items():
+        scope_col = f'{name}_scope'
+        if scope_col not in timeline.columns:
+            continue
+        scopes = timeline[scope_col].value_counts()
+        summary[f'{name}_network_wide_slots'] = int(scopes.get('network-wide', 0))
+        summary[f'{name}_single_device_slots'] = int(scopes.get('single-device', 0))
+        summary[f'{name}_partial_slots'] = int(scopes.get('partial', 0))
+
+        single = (timeline[scope_col] == 'single-device').to_numpy()
+        hits = _crosses(wide[col], op, threshold)
+        summary[f'{name}_single_device_by_headset'] = {
+            str(h): int(n) for h, n in hits[single].sum(axis=0).items() if n
+        }
+    return summary
+
+
+def align_session(session_dir: str, freq: str = '1s', tolerance: str = '1s') -> tuple:
+    """Load a session and return (aligned long frame, wide frame, cross-headset timeline)."""
+    columns = ['session_id', 'headset_id', 'timestamp_sec', 'source_file'] + ALIGNED_COLUMNS
+    df = load_session_data(session_dir, columns=columns, use_store=True)
+    if df.empty:
+        return df, pd.DataFrame(), pd.DataFrame()
+    starts = session_start_times(find_session_csvs(session_dir))
+    aligned = align_headsets(add_wall_clock(df, starts), freq=freq, tolerance=tolerance)
+    wide = to_wide(aligned)
+    return aligned, wide, cross_headset_timeline(wide)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Align headsets on a wall-clock grid and compare them.")
+    parser.add_argument("session_dir", help="Session directory")
+    parser.add_argument("--freq", default='1s', help="Grid resolution (default: 1s)")
+    parser.add_argument("--tolerance", default='1s', help="Max distance to the nearest sample (default: 1s)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.session_dir):
+        print(f"Error: Directory not found: {args.session_dir}")
+        sys.exit(1)
+
+    aligned, wide, timeline = align_session(args.session_dir, args.freq, args.tolerance)
+    if aligned.empty:
+        print("No data to analyze.")
+        sys.exit(1)
+
+    summary = summarize_timeline(timeline, wide)
+    print(f"\n{'Cross-Headset Timeline':=^60}")
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+
+    output_path = os.path.join(args.session_dir, 'cross_headset_timeline.csv')
+    timeline.join(wide.set_axis([f'{m}_{h}' for m, h in wide.columns], axis=1)).to_csv(output_path)
+    print(f"\nAligned timeline saved to: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+metrics_collector.py - Collect live MetricsLogger streams over the LAN.
+
+Headsets (or metrics_replay.py) send MetricsLogger CSV lines over TCP
+(one connection per headset, newline-terminated lines) or UDP (one or more
+lines per datagram). Every line names its own session_id and headset_id, so
+a connection can carry any session. A line starting with '{' is a JSON
+metadata message ({"sessionId", "headsetId", "appVersion", ...}) for one
+session, merged into its *_metadata.json.
+
+Lines are buffered per session and written in batches every
+``flush_interval`` seconds into the layout extract_metrics.sh produces:
+
+    <root>/<yyyyMMdd>/H<k>/metrics/session_<sessionId>_<headsetId>.csv
+
+A headset keeps its H<k> folder within a session folder. A session file is
+rotated (closed and its metadata written) when it goes idle or reaches
+``max_bytes``; a continuation is written as ..._part2.csv and so on.
+
+Aggregate counters (lines, bytes, malformed lines, active sessions, lines
+per headset) are printed periodically and served as JSON to any client
+connecting to the status port.
+
+TCP applies backpressure, so no line is lost while the collector keeps up;
+UDP datagrams can be dropped by the network or the kernel under load.
+
+Usage:
+    python metrics_collector.py [--root DIR] [--session-name yyyyMMdd] [--host 0.0.0.0]
+                                [--tcp-port 9750] [--udp-port 9751] [--status-port 9752]
+
+Example:
+    python metrics_collector.py --root /tmp/live &
+    python metrics_replay.py research-paper/data/sessions/20251209 --speed 60 --copies 40
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import signal
+import socket
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from metrics_io import METRICS_COLUMNS, METRICS_DTYPES
+from session_index import DEFAULT_SESSIONS_ROOT, SESSION_FILE_RE, parse_timestamp
+
+
+DEFAULT_TCP_PORT = 9750
+DEFAULT_UDP_PORT = 9751
+DEFAULT_STATUS_PORT = 9752
+
+HEADER_LINE = ','.join(METRICS_COLUMNS)
+
+SESSION_ID_RE = re.compile(r'^\d{8}_\d{6}$')
+# Headset ids become file names, so only plain characters are accepted
+HEADSET_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+TIMESTAMP_INDEX = METRICS_COLUMNS.index('timestamp_sec')
+FPS_INDEX = METRICS_COLUMNS.index('frame_rate_fps')
+LATENCY_INDEX = METRICS_COLUMNS.index('network_latency_ms')
+# Fields that must parse as numbers, or the line would break the typed CSV reader
+NUMERIC_INDICES = [i for i, c in enumerate(METRICS_COLUMNS) if METRICS_DTYPES[c] != 'category']
+
+# Longest accepted line; MetricsLogger lines are ~100 bytes
+MAX_LINE_BYTES = 4096
+UDP_RECEIVE_BUFFER = 4 * 1024 * 1024
+
+
+def session_file_name(session_id: str, headset_id: str, part: int = 1) -> str:
+    suffix = '' if part == 1 else f'_part{part}'
+    return f"session_{session_id}_{headset_id}{suffix}.csv"
+
+
+def count_rows(path: str, size: int) -> int:
+    """Data rows (lines after the header) in the first ``size`` bytes of a session CSV."""
+    lines = 0
+    with open(path, 'rb') as f:
+        while size > 0:
+            chunk = f.read(min(size, 1 << 20))
+            if not chunk:
+                break
+            lines += chunk.count(b'\n')
+            size -= len(chunk)
+    return max(lines - 1, 0)
+
+
+class SessionWriter:
+    """
+    Buffered, rotating CSV writer for one headset session.
+
+    Rows already in a reopened file are counted by ``executor`` when one is
+    given, so opening a large part does not block the caller.
+    """
+
+    def __init__(self, metrics_dir: str, session_id: str, headset_id: str, max_bytes: int,
+                 executor: ThreadPoolExecutor = None):
+        self.metrics_dir = metrics_dir
+        self.session_id = session_id
+        self.headset_id = headset_id
+        self.max_bytes = max_bytes
+        self.executor = executor
+        self.buffer = []
+        self.metadata = {}
+        self.last_activity = time.monotonic()
+        self.part = 1
+        # Resume after the last full part left by an earlier run
+        while os.path.exists(self.path) and os.path.getsize(self.path) >= max_bytes:
+            self.part += 1
+        self._reset_part()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.metrics_dir, session_file_name(self.session_id, self.headset_id, self.part))
+
+    def _reset_part(self):
+        self.lines = 0
+        self.existing_rows = None
+        self.start = None
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.size = 0
+        if os.path.exists(self.path):
+            # Reopened after an idle close or a restart: keep counting where the file left off
+            self.size = os.path.getsize(self.path)
+            if self.executor is None:
+                self.lines = count_rows(self.path, self.size)
+            else:
+                # Only the bytes present now are counted; later appends are in self.lines
+                self.existing_rows = self.executor.submit(count_rows, self.path, self.size)
+            try:
+                with open(self.path[:-len('.csv')] + '_metadata.json', 'r', encoding='utf-8-sig') as f:
+                    previous = json.load(f)
+                self.start = datetime.fromisoformat(previous['startTime'])
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+    def add(self, line: str, timestamp: float):
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+            if self.start is None:
+                # timestamp_sec counts from the session start on the headset
+                self.start = datetime.now().astimezone() - timedelta(seconds=timestamp)
+        self.last_timestamp = timestamp
+        self.buffer.append(line)
+        self.last_activity = time.monotonic()
+
+    def flush(self) -> int:
+        """Append the buffered lines; returns the number written."""
+        if not self.buffer:
+            return 0
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        data = ('' if self.size else HEADER_LINE + '\n') + '\n'.join(self.buffer) + '\n'
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            f.write(data)
+        written = len(self.buffer)
+        self.size += len(data.encode('utf-8'))
+        self.lines += written
+        self.buffer = []
+        if self.size >= self.max_bytes:
+            self.rotate()
+        return written
+
+    def write_metadata(self):
+        """Write *_metadata.json for the current part, as MetricsLogger does."""
+        if self.last_timestamp is None:
+            return
+        # The headset's own clock is preferred over the arrival time of its first line
+        start = parse_timestamp(self.metadata.get('startTime')) or self.start
+        metadata = {
+            'sessionId': self.session_id,
+            'headsetId': self.headset_id,
+            'startTime': start.isoformat(),
+            'endTime': (start + timedelta(seconds=self.last_timestamp)).isoformat(),
+            'durationMinutes': self.last_timestamp / 60,
+            'totalMetrics': self.lines + (self.existing_rows.result() if self.existing_rows else 0),
+        }
+        # Device and version fields come from the headset; the counts describe this file
+        metadata.update({k: v for k, v in self.metadata.items() if k not in metadata})
+        with open(self.path[:-len('.csv')] + '_metadata.json', 'w') as f:
+            json.dump(metadata, f, indent=4)
+
+    def rotate(self):
+        """Close the current part and continue in the next file."""
+        self.write_metadata()
+        self.part += 1
+        self._reset_part()
+
+    def close(self):
+        self.flush()
+        self.write_metadata()
+
+
+class MetricsCollector:
+    """Routes received lines to per-session writers and keeps the counters."""
+
+    def __init__(self, root: str = DEFAULT_SESSIONS_ROOT, session_name: str = None,
+                 flush_interval: float = 1.0, idle_timeout: float = 120.0, max_bytes: int = 64 * 1024 * 1024):
+        self.session_dir = os.path.join(root, session_name or datetime.now().strftime('%Y%m%d'))
+        self.flush_interval = flush_interval
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self.writers = {}
+        # Counts the rows of reopened session files off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.headset_dirs = self._existing_headset_dirs()
+        self.started = time.monotonic()
+        self.counters = {'lines_received': 0, 'lines_written': 0, 'bytes_received': 0, 'malformed_lines': 0,
+                         'metadata_messages': 0, 'tcp_connections': 0, 'active_connections': 0,
+                         'sessions_opened': 0, 'sessions_closed': 0}
+        self.per_headset = {}
+
+    def _existing_headset_dirs(self) -> dict:
+        """headset_id -> H<k> folder for the headsets already in the session folder."""
+        dirs = {}
+        for headset_dir in sorted(glob.glob(os.path.join(self.session_dir, 'H*'))):
+            for path in glob.glob(os.path.join(headset_dir, '**', 'session_*.csv'), recursive=True):
+                match = SESSION_FILE_RE.match(os.path.basename(path))
+                if match:
+                    dirs.setdefault(match.group(2), os.path.basename(headset_dir))
+        return dirs
+
+    def _writer(self, session_id: str, headset_id: str) -> SessionWriter:
+        key = (session_id, headset_id)
+        writer = self.writers.get(key)
+        if writer is None:
+            if headset_id not in self.headset_dirs:
+                used = {int(d[1:]) for d in self.headset_dirs.values() if d[1:].isdigit()}
+                used.update(int(os.path.basename(d)[1:]) for d in glob.glob(os.path.join(self.session_dir, 'H*'))
+                            if os.path.basename(d)[1:].isdigit())
+                self.headset_dirs[headset_id] = f"H{max(used, default=0) + 1}"
+            metrics_dir = os.path.join(self.session_dir, self.headset_dirs[headset_id], 'metrics')
+            writer = self.writers[key] = SessionWriter(metrics_dir, session_id, headset_id, self.max_bytes,
+                                                       self.executor)
+            self.counters['sessions_opened'] += 1
+        return writer
+
+    def handle_line(self, line: str):
+        """Validate one received line and buffer it for its session."""
+        line = line.strip()
+        if not line or line == HEADER_LINE:
+            return
+        self.counters['bytes_received'] += len(line) + 1
+        if line.startswith('{'):
+            self.handle_metadata(line)
+            return
+
+        fields = line.split(',')
+        if len(fields) != len(METRICS_COLUMNS):
+            self.counters['malformed_lines'] += 1
+            return
+        session_id, headset_id = fields[0], fields[1]
+        try:
+            values = {i: float(fields[i]) for i in NUMERIC_INDICES}
+        except ValueError:
+            values = None
+        if values is None or not SESSION_ID_RE.match(session_id) or not HEADSET_ID_RE.match(headset_id):
+            self.counters['malformed_lines'] += 1
+            return
+
+        timestamp = values[TIMESTAMP_INDEX]
+        self._writer(session_id, headset_id).add(line, timestamp)
+        self.counters['lines_received'] += 1
+        stats = self.per_headset.setdefault(headset_id, {'lines': 0})
+        stats['lines'] += 1
+        stats['session_id'] = session_id
+        stats['timestamp_sec'] = timestamp
+        stats['fps'] = fields[FPS_INDEX]
+        stats['latency_ms'] = fields[LATENCY_INDEX]
+
+    def handle_metadata(self, line: str):
+        try:
+            metadata = json.loads(line)
+            session_id, headset_id = metadata['sessionId'], metadata['headsetId']
+        except (ValueError, KeyError, TypeError):
+            self.counters['malformed_lines'] += 1
+            return
+        if not SESSION_ID_RE.match(str(session_id)) or not HEADSET_ID_RE.match(str(headset_id)):
+            self.counters['malformed_lines'] += 1
+            return
+        self._writer(session_id, headset_id).metadata.update(metadata)
+        self.counters['metadata_messages'] += 1
+
+    def flush(self, close_idle: bool = True):
+        """Write every buffer; close sessions idle for longer than ``idle_timeout``."""
+        now = time.monotonic()
+        for key, writer in list(self.writers.items()):
+            try:
+                self.counters['lines_written'] += writer.flush()
+                if close_idle and now - writer.last_activity > self.idle_timeout:
+                    writer.close()
+                    del self.writers[key]
+                    self.counters['sessions_closed'] += 1
+            except OSError as e:
+                print(f"  Error writing {writer.path}: {e}")
+
+    def close(self):
+        for writer in self.writers.values():
+            self.counters['lines_written'] += len(writer.buffer)
+            writer.close()
+        self.counters['sessions_closed'] += len(self.writers)
+        self.writers = {}
+        self.executor.shutdown()
+
+    def status(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return dict(self.counters, session_dir=self.session_dir, uptime_sec=round(elapsed, 1),
+                    active_sessions=len(self.writers), headsets=len(self.per_headset),
+                    lines_per_sec=round(self.counters['lines_received'] / elapsed, 1) if elapsed > 0 else 0.0,
+                    per_headset=self.per_headset)
+
+    async def handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.counters['tcp_connections'] += 1
+        self.counters['active_connections'] += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line longer than the stream limit: not MetricsLogger output
+                    self.counters['malformed_lines'] += 1
+                    break
+                if not line:
+                    break
+                self.handle_line(line.decode('utf-8', errors='replace'))
+        except ConnectionError:
+            pass
+        finally:
+            self.counters['active_connections'] -= 1
+            writer.close()
+
+    async def handle_status(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.write((json.dumps(self.status()) + '\n').encode('utf-8'))
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def flush_loop(self, report_interval: float = None):
+        last_report = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+            if report_interval and time.monotonic() - last_report >= report_interval:
+                last_report = time.monotonic()
+                s = self.status()
+                print(f"[{datetime.now():%H:%M:%S}] {s['lines_received']:,} lines ({s['lines_per_sec']}/s), "
+                      f"{s['headsets']} headsets, {s['active_sessions']} active sessions, "
+                      f"{s['active_connections']} connections, {s['malformed_lines']} malformed")
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, collector: MetricsCollector):
+        self.collector = collector
+
+    def datagram_received(self, data: bytes, addr):
+        for line in data.decode('utf-8', errors='replace').splitlines():
+            self.collector.handle_line(line)
+
+
+async def serve(collector: MetricsCollector, host: str = '0.0.0.0', tcp_port: int = DEFAULT_TCP_PORT,
+                udp_port: int = DEFAULT_UDP_PORT, status_port: int = DEFAULT_STATUS_PORT,
+                report_interval: float = 10.0):
+    """Run the TCP, UDP and status listeners until cancelled; buffers are flushed on the way out."""
+    loop = asyncio.get_running_loop()
+    servers = [await asyncio.start_server(collector.handle_tcp, host, tcp_port, limit=MAX_LINE_BYTES)]
+    if status_port:
+        servers.append(await asyncio.start_server(collector.handle_status, host, status_port))
+    transport = None
+    if udp_port:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER)
+        sock.bind((host, udp_port))
+        transport, _ = await loop.create_datagram_endpoint(lambda: _UdpProtocol(collector), sock=sock)
+
+    print(f"Collecting into {collector.session_dir} (TCP {tcp_port}, UDP {udp_port or '-'}, "
+          f"status {status_port or '-'}), Ctrl+C to stop")
+    # Stop cleanly on Ctrl+C and on SIGTERM (e.g. when run as a service)
+    task = asyncio.current_task()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+    try:
+        await collector.flush_loop(report_interval)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for server in servers:
+            server.close()
+        if transport:
+            transport.close()
+        collector.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect live MetricsLogger streams over TCP/UDP.")
+    parser.add_argument("--root", default=DEFAULT_SESSIONS_ROOT, help="Sessions root (default: research-paper/data/sessions)")
+    parser.add_argument("--session-name", default=None, help="Session folder name (default: today, yyyyMMdd)")
+    parser.add_argument("--host", default='0.0.0.0', help="Address to listen on (default: all interfaces)")
+    parser.add_argument("--tcp-port", type=int, default=DEFAULT_TCP_PORT, help=f"TCP port (default: {DEFAULT_TCP_PORT})")
+    parser.add_argument("--udp-port", type=int, default=DEFAULT_UDP_PORT, help=f"UDP port, 0 to disable (default: {DEFAULT_UDP_PORT})")
+    parser.add_argument("--status-port", type=int, default=DEFAULT_STATUS_PORT,
+                        help=f"Port serving the counters as JSON, 0 to disable (default: {DEFAULT_STATUS_PORT})")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="Seconds between batch writes (default: 1)")
+    parser.add_argument("--idle-timeout", type=float, default=120.0,
+                        help="Close a session after this many seconds without lines (default: 120)")
+    parser.add_argument("--max-mb", type=float, default=64.0, help="Rotate session files at this size (default: 64)")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between counter reports (default: 10)")
+    args = parser.parse_args()
+
+    collector = MetricsCollector(args.root, args.session_name, args.flush_interval, args.idle_timeout,
+                                 int(args.max_mb * 1024 * 1024))
+    try:
+        asyncio.run(serve(collector, args.host, args.tcp_port, args.udp_port, args.status_port,
+                          args.report_interval))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    s = collector.status()
+    print(f"\nStopped: {s['lines_written']:,} lines written for {s['headsets']} headsets "
+          f"({s['malformed_lines']} malformed)")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+metrics_correlation.py - Metric correlation matrices with block-bootstrap intervals.
+
+The Pearson matrix over all numeric MetricsLogger columns is computed in one
+vectorized pass, pooled and per headset. Rows with a missing value in any of
+the columns are dropped (listwise), so every pair uses the same samples.
+
+Samples logged a second apart are not independent, so confidence intervals
+come from a non-overlapping block bootstrap: each headset's sessions are cut
+into blocks of ``block_size`` consecutive samples (a block never spans two
+sessions), and each replicate draws blocks with replacement (per headset, so
+the pooled replicates keep every headset's share). A headset with fewer
+than two blocks has no interval. A correlation only needs sums, so every block is reduced
+once to its count, column sums and cross-products; a replicate is then a
+weighted sum over blocks, and a batch of replicates is one matrix product
+whatever the number of rows. Batches run in a process pool, each with its
+own child of one seeded np.random.SeedSequence, so the intervals depend on
+the seed but not on the number of workers.
+
+Usage:
+    python metrics_correlation.py <session_dir> [--replicates 2000] [--block-size 60]
+                                  [--seed 0] [--workers N] [--output correlations.csv]
+"""
+
+import os
+import sys
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analyze_metrics import load_session_data
+
+
+# Numeric MetricsLogger columns that vary within a session
+CORRELATION_COLUMNS = ['frame_rate_fps', 'network_latency_ms', 'calibration_error_mm',
+                       'battery_temp_c', 'battery_level']
+
+# ~1 minute of samples at the default 1 Hz logging interval
+DEFAULT_BLOCK_SIZE = 60
+DEFAULT_REPLICATES = 2000
+CONFIDENCE = 0.95
+
+# Replicates per pool task; fixed so the result does not depend on the worker count
+REPLICATES_PER_TASK = 250
+
+POOLED = 'pooled'
+
+
+def _complete_values(df: pd.DataFrame, columns: list) -> np.ndarray:
+    values = df[columns].to_numpy(dtype=np.float64)
+    return values[~np.isnan(values).any(axis=1)]
+
+
+def _moments_to_corr(count: np.ndarray, sums: np.ndarray, cross: np.ndarray) -> np.ndarray:
+    """
+    Pearson matrices from (..., ) counts, (..., k) sums and (..., k, k)
+    cross-products; NaN where a column has no variance.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / count[..., None]
+        cov = cross / count[..., None, None] - mean[..., :, None] * mean[..., None, :]
+        # A constant column leaves only rounding error of its squared mean as variance
+        var = np.diagonal(cov, axis1=-2, axis2=-1)
+        second_moment = np.diagonal(cross, axis1=-2, axis2=-1) / count[..., None]
+        std = np.sqrt(np.where(var > 1e-10 * second_moment, var, np.nan))
+        corr = cov / (std[..., :, None] * std[..., None, :])
+    return np.clip(corr, -1.0, 1.0)
+
+
+def correlation_matrix(df: pd.DataFrame, columns: list = None) -> pd.DataFrame:
+    """Pearson correlation of every pair of ``columns`` over the complete rows."""
+    columns = [c for c in (columns or CORRELATION_COLUMNS) if c in df.columns]
+    values = _complete_values(df, columns)
+    values = values - values.mean(axis=0) if len(values) else values
+    corr = _moments_to_corr(np.array(float(len(values))), values.sum(axis=0), values.T @ values)
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def block_moments(values: np.ndarray, block_size: int) -> tuple:
+    """
+    Per-block (count, sums, flattened cross-products) of consecutive
+    ``block_size`` rows; the last block may be shorter.
+    """
+    n, k = values.shape
+    n_blocks = -(-n // block_size)
+    # Zero rows pad the last block and add nothing to its sums
+    padded = np.zeros((n_blocks * block_size, k))
+    padded[:n] = values
+    blocks = padded.reshape(n_blocks, block_size, k)
+    counts = np.full(n_blocks, float(block_size))
+    counts[-1] = n - (n_blocks - 1) * block_size
+    sums = blocks.sum(axis=1)
+    cross = np.einsum('bti,btj->bij', blocks, blocks).reshape(n_blocks, k * k)
+    return counts, sums, cross
+
+
+def _concat_moments(moments: list) -> tuple:
+    """Join the block moments of several runs into one stratum."""
+    return tuple(np.concatenate(parts) for parts in zip(*moments))
+
+
+def _bootstrap_task(args: tuple) -> np.ndarray:
+    """(replicates, k, k) correlation matrices for one batch, from its own seed."""
+    strata, k, replicates, seed = args
+    rng = np.random.default_rng(seed)
+    count = np.zeros(replicates)
+    sums = np.zeros((replicates, k))
+    cross = np.zeros((replicates, k * k))
+    for counts, block_sums, block_cross in strata:
+        n_blocks = len(counts)
+        # How often each block is drawn in each replicate (n_blocks draws per replicate)
+        draws = rng.integers(n_blocks, size=(replicates, n_blocks))
+        draws += np.arange(replicates)[:, None] * n_blocks
+        weights = np.bincount(draws.ravel(), minlength=replicates * n_blocks)
+        weights = weights.reshape(replicates, n_blocks).astype(np.float64)
+        count += weights @ counts
+        sums += weights @ block_sums
+        cross += weights @ block_cross
+    return _moments_to_corr(count, sums, cross.reshape(replicates, k, k))
+
+
+def bootstrap_correlations(strata: list, k: int, replicates: int, seed: int = None,
+                           workers: int = None) -> np.ndarray:
+    """
+    Bootstrap replicates of the correlation matrix from per-stratum block
+    moments. Returns an array of shape (replicates, k, k).
+    """
+    children = np.random.SeedSequence(seed).spawn(-(-replicates // REPLICATES_PER_TASK))
+    tasks = [(strata, k, min(REPLICATES_PER_TASK, replicates - i * REPLICATES_PER_TASK), child)
+             for i, child in enumerate(children)]
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1 or len(tasks) == 1:
+        results = [_bootstrap_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_bootstrap_task, tasks))
+    return np.concatenate(results)
+
+
+def correlation_table(df: pd.DataFrame, columns: list = None, by: str = 'headset_id',
+                      replicates: int = DEFAULT_REPLICATES, block_size: int = DEFAULT_BLOCK_SIZE,
+                      confidence: float = CONFIDENCE, seed: int = None, workers: int = None) -> pd.DataFrame:
+    """
+    Long table of every column pair per ``by`` group and pooled: r, the
+    block-bootstrap interval (ci_low, ci_high) and the sample count.
+    Blocks are cut per session within each group. The interval is NaN when
+    ``replicates`` = 0 (no bootstrap) or when a group has fewer than two
+    blocks to resample.
+    """
+    columns = [c for c in (columns or CORRELATION_COLUMNS) if c in df.columns]
+    k = len(columns)
+    if df.empty or k < 2:
+        return pd.DataFrame()
+
+    # Blocks are runs of consecutive samples, so order each group by session and time
+    order = [c for c in ('session_id', 'timestamp_sec') if c in df.columns]
+    if order:
+        df = df.sort_values([by] + order, kind='stable')
+
+    # Each group's runs of consecutive samples: one per session
+    split = 'session_id' if 'session_id' in df.columns and by != 'session_id' else None
+    groups = []
+    for key, group in df.groupby(by, observed=True, sort=True):
+        runs = [group] if split is None else [run for _, run in group.groupby(split, observed=True, sort=True)]
+        runs = [values for values in (_complete_values(run, columns) for run in runs) if len(values)]
+        if runs:
+            groups.append((str(key), runs))
+    if not groups:
+        return pd.DataFrame()
+
+    # Centre on the pooled mean so the sums of products stay well conditioned
+    center = np.concatenate([values for _, runs in groups for values in runs]).mean(axis=0)
+    strata = {key: _concat_moments([block_moments(values - center, block_size) for values in runs])
+              for key, runs in groups}
+    strata[POOLED] = list(strata.values())
+
+    pairs = np.triu_indices(k, 1)
+    alpha = (1 - confidence) / 2
+    rows = []
+    for i, (key, stratum) in enumerate(strata.items()):
+        stratum = stratum if key == POOLED else [stratum]
+        count = sum(s[0].sum() for s in stratum)
+        sums = sum(s[1].sum(axis=0) for s in stratum)
+        cross = sum(s[2].sum(axis=0) for s in stratum).reshape(k, k)
+        r = _moments_to_corr(np.array(count), sums, cross)[pairs]
+        # A stratum of one block would resample to the same value every time
+        if replicates > 0 and min(len(s[0]) for s in stratum) >= 2:
+            child_seed = None if seed is None else [seed, i]
+            samples = bootstrap_correlations(stratum, k, replicates, child_seed, workers)[:, pairs[0], pairs[1]]
+            with warnings.catch_warnings():
+                # Pairs with a constant column have no interval
+                warnings.simplefilter('ignore', RuntimeWarning)
+                low, high = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+        else:
+            low = high = np.full(len(r), np.nan)
+        for (a, b), value, lo, hi in zip(zip(*pairs), r, low, high):
+            rows.append({by: key, 'x': columns[a], 'y': columns[b], 'r': value,
+                         'ci_low': lo, 'ci_high': hi, 'n': int(count)})
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metric correlations with block-bootstrap confidence intervals.")
+    parser.add_argument("session_dir", help="Session directory")
+    parser.add_argument("--replicates", type=int, default=DEFAULT_REPLICATES,
+                        help=f"Bootstrap replicates (default: {DEFAULT_REPLICATES}; 0 to skip)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE,
+                        help=f"Consecutive samples per bootstrap block (default: {DEFAULT_BLOCK_SIZE})")
+    parser.add_argument("--seed", type=int, default=0, help="Bootstrap seed (default: 0)")
+    parser.add_argument("--workers", type=int, default=None, help="Bootstrap processes (default: CPU count)")
+    parser.add_argument("--output", help="Correlation CSV (default: <session_dir>/correlations.csv)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.session_dir):
+        print(f"Error: Directory not found: {args.session_dir}")
+        sys.exit(1)
+
+    df = load_session_data(args.session_dir, columns=['session_id', 'headset_id', 'timestamp_sec'] + CORRELATION_COLUMNS,
+                           use_store=True)
+    if df.empty:
+        print("No data to analyze.")
+        sys.exit(1)
+
+    table = correlation_table(df, replicates=args.replicates, block_size=args.block_size,
+                              seed=args.seed, workers=args.workers)
+    if table.empty:
+        print("No data to analyze.")
+        sys.exit(1)
+    print(f"\n{'Correlations':=^60}")
+    for key, group in table.groupby('headset_id', sort=False):
+        print(f"\n{key} ({group['n'].iloc[0]:,} samples):")
+        for _, row in group.iterrows():
+            print(f"  {row['x']:>22} vs {row['y']:<22} r={row['r']:+.3f} "
+                  f"[{row['ci_low']:+.3f}, {row['ci_high']:+.3f}]")
+
+    output_path = args.output or os.path.join(args.session_dir, 'correlations.csv')
+    table.to_csv(output_path, index=False)
+    print(f"\nCorrelations saved to: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
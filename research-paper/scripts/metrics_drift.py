@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+metrics_drift.py - Time-based drift and degradation onset per headset.
+
+Drift is measured over time windows on timestamp_sec rather than row
+counts, so "first/last minute" stays a minute whatever m_logInterval was and
+however many samples a gap dropped: the initial/final means cover the first
+and last ``window_sec`` seconds of each group, and a trailing time-based
+rolling mean (rolling('60s') on timestamp_sec) gives the worst full window
+of every onset metric. All groups (headset sessions, or headsets) are
+handled in one grouped pass over the merged frame. As timestamp_sec
+restarts in every session, a headset's sessions are placed one after
+another in start order when grouping per headset.
+
+Degradation onset is found by change-point detection: each group's series
+is averaged into fixed time bins, split by binary segmentation on the mean
+(a split is kept when it lowers the squared error by more than a BIC
+penalty), and the onset is the first change point after which the mean is
+worse than at the start by at least the column's minimum shift (e.g. an FPS
+drop from thermal throttling).
+
+Usage:
+    python metrics_drift.py <session_dir> [<session_dir> ...] [--by headset|session]
+                            [--window-sec 60] [--bin-sec 10] [--output drift.csv]
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from analyze_metrics import load_session_data
+
+
+# Metrics whose drift is reported
+DRIFT_COLUMNS = ['frame_rate_fps', 'calibration_error_mm', 'network_latency_ms', 'battery_temp_c']
+
+# Onset detection: column -> (direction of degradation, minimum mean shift)
+ONSET_SHIFTS = {
+    'frame_rate_fps': (-1, 2.0),
+    'calibration_error_mm': (1, 1.0),
+    'network_latency_ms': (1, 10.0),
+}
+
+GROUP_KEYS = {
+    'headset': ['headset_id'],
+    'session': ['headset_id', 'session_id'],
+}
+
+DEFAULT_WINDOW_SEC = 60.0
+DEFAULT_BIN_SEC = 10.0
+
+
+def session_time(df: pd.DataFrame, by: list) -> pd.Series:
+    """
+    timestamp_sec on one time axis per group. When ``by`` pools several
+    sessions, each session is shifted to start where the group's previous
+    session (in session_id, i.e. start time, order) ended.
+    """
+    t = df['timestamp_sec']
+    if 'session_id' not in df.columns or 'session_id' in by:
+        return t
+    keys = df[by + ['session_id']].astype(str)
+    spans = t.groupby([keys[k] for k in keys.columns], sort=True).agg(['min', 'max'])
+    length = spans['max'] - spans['min']
+    offset = length.groupby(level=list(range(len(by))), sort=False).cumsum() - length - spans['min']
+    return t + offset.reindex(pd.MultiIndex.from_frame(keys)).to_numpy()
+
+
+def edge_window_means(df: pd.DataFrame, columns: list, by: list,
+                      window_sec: float = DEFAULT_WINDOW_SEC) -> tuple:
+    """
+    Mean of each column over the first and the last ``window_sec`` seconds
+    of every group. Returns two frames indexed by ``by``.
+    """
+    t = df['timestamp_sec']
+    grouped = df.groupby(by, observed=True, sort=True)['timestamp_sec']
+    start, end = grouped.transform('min'), grouped.transform('max')
+    first = df.loc[t - start < window_sec].groupby(by, observed=True, sort=True)[columns].mean()
+    last = df.loc[end - t < window_sec].groupby(by, observed=True, sort=True)[columns].mean()
+    return first, last
+
+
+def rolling_means(df: pd.DataFrame, columns: list, by: list,
+                  window_sec: float = DEFAULT_WINDOW_SEC) -> pd.DataFrame:
+    """
+    Trailing time-based rolling mean of each column per group: every row
+    gets the mean of its group's rows in (t - window_sec, t].
+    """
+    ordered = df.sort_values(by + ['timestamp_sec'], kind='stable')
+    offsets = pd.to_timedelta(ordered['timestamp_sec'], unit='s').rename('offset')
+    frame = ordered[by + columns].assign(offset=offsets)
+    rolled = (frame.groupby(by, observed=True, sort=False)
+              .rolling(f'{window_sec}s', on='offset')[columns].mean())
+    rolled.index = ordered.index
+    return ordered[by + ['timestamp_sec']].join(rolled)
+
+
+def worst_window_means(df: pd.DataFrame, columns: list, by: list,
+                       window_sec: float = DEFAULT_WINDOW_SEC) -> pd.DataFrame:
+    """
+    Worst rolling ``window_sec`` mean of each ONSET_SHIFTS column per group
+    (lowest for FPS, highest for error and latency). Only windows that lie
+    entirely inside the group count, so a group shorter than the window is NaN.
+    """
+    rolled = rolling_means(df, columns, by, window_sec)
+    elapsed = rolled['timestamp_sec'] - rolled.groupby(by, observed=True, sort=False)['timestamp_sec'].transform('min')
+    grouped = rolled.loc[elapsed >= window_sec].groupby(by, observed=True, sort=True)[columns]
+    lowest, highest = grouped.min(), grouped.max()
+    return pd.DataFrame({col: lowest[col] if ONSET_SHIFTS[col][0] < 0 else highest[col] for col in columns},
+                        index=lowest.index)
+
+
+def binned_means(df: pd.DataFrame, columns: list, by: list, bin_sec: float = DEFAULT_BIN_SEC) -> pd.DataFrame:
+    """Mean of each column per group and ``bin_sec`` time bin; empty bins (gaps) are absent."""
+    bins = (df['timestamp_sec'] // bin_sec).astype(np.int64).rename('time_bin')
+    binned = df[columns].groupby([df[k] for k in by] + [bins], observed=True, sort=True).mean()
+    return binned.reset_index()
+
+
+def _best_split(x: np.ndarray, min_size: int) -> tuple:
+    """(gain, k): the split of ``x`` into x[:k], x[k:] that most reduces the squared error."""
+    n = len(x)
+    if n < 2 * min_size:
+        return 0.0, None
+    cumsum = np.cumsum(x)
+    k = np.arange(min_size, n - min_size + 1)
+    left = cumsum[k - 1]
+    total = cumsum[-1]
+    gain = left ** 2 / k + (total - left) ** 2 / (n - k) - total ** 2 / n
+    best = int(np.argmax(gain))
+    return float(gain[best]), int(k[best])
+
+
+def change_points(x: np.ndarray, min_size: int = 6, penalty: float = None, max_points: int = 5) -> list:
+    """
+    Indices where the mean of ``x`` shifts, by binary segmentation.
+
+    The default penalty is the BIC term 2 * sigma^2 * log(n), with sigma the
+    noise level estimated robustly from the first differences.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    x = x[~np.isnan(x)]
+    n = len(x)
+    if n < 2 * min_size:
+        return []
+    if penalty is None:
+        sigma = 1.4826 * np.median(np.abs(np.diff(x) - np.median(np.diff(x)))) / np.sqrt(2)
+        penalty = 2 * max(sigma, 1e-9) ** 2 * np.log(n)
+
+    segments = [(0, n)]
+    points = []
+    while segments and len(points) < max_points:
+        splits = [(_best_split(x[a:b], min_size), a, b) for a, b in segments]
+        (gain, k), a, b = max(splits, key=lambda s: s[0][0])
+        if k is None or gain <= penalty:
+            break
+        points.append(a + k)
+        segments.remove((a, b))
+        segments += [(a, a + k), (a + k, b)]
+    return sorted(points)
+
+
+def degradation_onset(times: np.ndarray, values: np.ndarray, direction: int, min_shift: float,
+                      min_size: int = 6) -> tuple:
+    """
+    (onset time, mean before, mean after) at the first change point after
+    which the mean is worse than the first segment's by ``min_shift`` in
+    ``direction`` (-1: lower is worse), or None when there is none.
+    """
+    valid = ~np.isnan(values)
+    times, values = np.asarray(times)[valid], np.asarray(values, dtype=np.float64)[valid]
+    points = change_points(values, min_size=min_size)
+    if not points:
+        return None
+    bounds = [0] + points + [len(values)]
+    baseline = values[bounds[0]:bounds[1]].mean()
+    for start, end in zip(bounds[1:-1], bounds[2:]):
+        after = values[start:end].mean()
+        if direction * (after - baseline) >= min_shift:
+            return float(times[start]), float(baseline), float(after)
+    return None
+
+
+def drift_summary(df: pd.DataFrame, columns: list = None, by: list = None,
+                  window_sec: float = DEFAULT_WINDOW_SEC, bin_sec: float = DEFAULT_BIN_SEC) -> pd.DataFrame:
+    """
+    One row per group: duration, initial/final window means and drift of
+    every column, latency jitter, and the worst rolling window mean and the
+    degradation onset (minutes from the group's first sample) of every
+    column in ONSET_SHIFTS.
+    """
+    columns = [c for c in (columns or DRIFT_COLUMNS) if c in df.columns]
+    by = by or GROUP_KEYS['session']
+    if df.empty or not columns:
+        return pd.DataFrame()
+    df = df.assign(timestamp_sec=session_time(df, by))
+
+    spans = df.groupby(by, observed=True, sort=True)['timestamp_sec'].agg(['min', 'max'])
+    summary = pd.DataFrame({'duration_min': (spans['max'] - spans['min']) / 60}, index=spans.index)
+    first, last = edge_window_means(df, columns, by, window_sec)
+    for col in columns:
+        summary[f'{col}_initial'] = first[col]
+        summary[f'{col}_final'] = last[col]
+        summary[f'{col}_drift'] = last[col] - first[col]
+        summary[f'{col}_drift_per_min'] = summary[f'{col}_drift'] / summary['duration_min'].where(lambda d: d > 0)
+    if 'network_latency_ms' in columns:
+        summary['latency_jitter_ms'] = df.groupby(by, observed=True, sort=True)['network_latency_ms'].std()
+
+    onset_columns = [c for c in columns if c in ONSET_SHIFTS]
+    if onset_columns:
+        worst = worst_window_means(df, onset_columns, by, window_sec)
+        for col in onset_columns:
+            summary[f'{col}_worst_window'] = worst[col]
+        binned = binned_means(df, onset_columns, by, bin_sec)
+        for col in onset_columns:
+            summary[f'{col}_onset_min'] = np.nan
+            summary[f'{col}_before'] = np.nan
+            summary[f'{col}_after'] = np.nan
+        for key, group in binned.groupby(by, observed=True, sort=False):
+            key = key if len(by) > 1 else key[0]
+            start = spans.loc[key, 'min']
+            times = group['time_bin'].to_numpy() * bin_sec
+            for col in onset_columns:
+                direction, min_shift = ONSET_SHIFTS[col]
+                onset = degradation_onset(times, group[col].to_numpy(), direction, min_shift)
+                if onset is not None:
+                    summary.loc[key, [f'{col}_onset_min', f'{col}_before', f'{col}_after']] = \
+                        [max(onset[0] - start, 0.0) / 60, onset[1], onset[2]]
+    return summary.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-based drift and degradation onset per headset.")
+    parser.add_argument("session_dirs", nargs="+", help="Session directories")
+    parser.add_argument("--by", choices=list(GROUP_KEYS), default='session',
+                        help="Group per headset or per headset session (default: session)")
+    parser.add_argument("--window-sec", type=float, default=DEFAULT_WINDOW_SEC,
+                        help="Initial/final window length in seconds (default: 60)")
+    parser.add_argument("--bin-sec", type=float, default=DEFAULT_BIN_SEC,
+                        help="Time bin for change-point detection in seconds (default: 10)")
+    parser.add_argument("--output", help="Write the combined summary to this CSV file")
+    args = parser.parse_args()
+
+    columns = ['session_id', 'headset_id', 'timestamp_sec'] + DRIFT_COLUMNS
+    summaries = []
+    for session_dir in args.session_dirs:
+        if not os.path.exists(session_dir):
+            print(f"Error: Directory not found: {session_dir}")
+            sys.exit(1)
+        df = load_session_data(session_dir, columns=columns, use_store=True)
+        if df.empty:
+            continue
+        summary = drift_summary(df, by=GROUP_KEYS[args.by], window_sec=args.window_sec, bin_sec=args.bin_sec)
+        summaries.append(summary.assign(session_dir=session_dir))
+
+    if not summaries:
+        print("No data to analyze.")
+        sys.exit(1)
+    summary = pd.concat(summaries, ignore_index=True)
+
+    print(f"\n{'Degradation Onset':=^60}")
+    for _, row in summary.iterrows():
+        label = ' '.join(str(row[k]) for k in GROUP_KEYS[args.by])
+        onset = row.get('frame_rate_fps_onset_min')
+        worst = row.get('frame_rate_fps_worst_window')
+        worst_text = f", worst {args.window_sec:g}s mean {worst:.1f} FPS" if pd.notna(worst) else ''
+        if pd.notna(onset):
+            print(f"  {label} ({row['duration_min']:.0f}min): FPS {row['frame_rate_fps_before']:.1f} -> "
+                  f"{row['frame_rate_fps_after']:.1f} from minute {onset:.1f}{worst_text}")
+        else:
+            print(f"  {label} ({row['duration_min']:.0f}min): no FPS degradation{worst_text}")
+
+    if args.output:
+        summary.to_csv(args.output, index=False)
+        print(f"\nDrift summary saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+metrics_events.py - Latency-spike and frame-drop episodes with hysteresis.
+
+Aggregate percentages cannot show how long a stall lasts or how often one
+happens. This module turns the samples of every headset session into
+episodes (start, end, duration, peak, samples). An episode starts when a
+sample crosses the rule's enter threshold and only ends at the first sample
+back on the good side of its exit threshold, so a value flickering around
+one threshold is a single episode. Thresholds come from
+analyze_metrics.THRESHOLDS.
+
+EventDetector is O(n) and carries open episodes from one batch of rows to the
+next. The same code handles a whole merged frame, a chunked stream of the
+CSVs, or the rows metrics_follow.py reads from a live session.
+
+Usage:
+    python metrics_events.py <session_dir> [--stream] [--max-gap-sec 10] [--output events.csv]
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from analyze_metrics import THRESHOLDS, load_session_data
+from metrics_io import find_session_csvs, iter_metrics_csv
+
+
+# Episode rules: name -> (column, comparison, enter threshold, exit threshold)
+EVENT_RULES = {
+    'latency_spike': ('network_latency_ms', '>', THRESHOLDS['latency_spike_ms'], THRESHOLDS['latency_target_ms']),
+    'frame_drop': ('frame_rate_fps', '<', THRESHOLDS['fps_drop'], THRESHOLDS['fps_recovered']),
+}
+
+EVENT_KEYS = ['headset_id', 'session_id']
+
+EVENT_COLUMNS = EVENT_KEYS + ['event', 'start_sec', 'end_sec', 'duration_sec', 'peak', 'samples', 'open']
+
+# A longer pause between samples ends an episode; nothing is known about the gap
+DEFAULT_MAX_GAP_SEC = 10.0
+
+
+def _runs(times: np.ndarray, values: np.ndarray, op: str, enter: float, exit_: float,
+          active: bool, last_time: float, max_gap_sec: float) -> tuple:
+    """
+    Hysteresis state of one series, vectorized.
+
+    ``active`` and ``last_time`` are the state and last timestamp carried
+    over from the previous batch. Returns (run bounds as (first, last) index
+    arrays, break flags per row, state of the last row).
+    """
+    n = len(values)
+    if op == '>':
+        entered, exited = values > enter, values <= exit_
+    else:
+        entered, exited = values < enter, values >= exit_
+
+    # Each sample sets the state (1 enter, 0 exit) or keeps it (NaN)
+    marks = np.where(entered, 1.0, np.where(exited, 0.0, np.nan))
+
+    previous = np.empty(n)
+    previous[0] = times[0] if last_time is None else last_time
+    previous[1:] = times[:-1]
+    gaps = times - previous
+    # A gap or a timestamp that jumps back (a new session file) starts calm
+    breaks = (gaps > max_gap_sec) | (gaps < 0)
+    marks[breaks & np.isnan(marks)] = 0.0
+    if np.isnan(marks[0]):
+        marks[0] = 1.0 if active else 0.0
+
+    # Forward-fill the marks: each row takes the last set state
+    last_set = np.maximum.accumulate(np.where(np.isnan(marks), -1, np.arange(n)))
+    state = marks[last_set] == 1.0
+
+    edges = np.diff(state.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges[:-1] == 1)
+    ends = np.flatnonzero(edges[1:] == -1)
+    # Split runs that span a break into one episode per side
+    split = np.flatnonzero(breaks & state & np.r_[False, state[:-1]])
+    if len(split):
+        starts = np.sort(np.r_[starts, split])
+        ends = np.sort(np.r_[ends, split - 1])
+    return starts, ends, breaks, bool(state[-1])
+
+
+class EventDetector:
+    """
+    Streaming episode detector over any sequence of row batches.
+
+    ``update`` returns the episodes that ended within the batch; episodes
+    still running at its end are carried over and returned by a later
+    ``update`` or by ``flush``. Rows of one headset session must arrive in
+    time order; different sessions may be interleaved between batches.
+    """
+
+    def __init__(self, rules: dict = None, max_gap_sec: float = DEFAULT_MAX_GAP_SEC):
+        self.rules = rules or EVENT_RULES
+        self.max_gap_sec = max_gap_sec
+        # (headset_id, session_id) -> {'last_time', 'first_time', open episode per rule}
+        self.state = {}
+
+    def _key_state(self, key: tuple, first_time: float) -> dict:
+        return self.state.setdefault(key, {'first_time': first_time, 'last_time': None, 'open': {}})
+
+    def _detect(self, key: tuple, group: pd.DataFrame) -> list:
+        times = group['timestamp_sec'].to_numpy(dtype=np.float64)
+        state = self._key_state(key, times[0])
+        events = []
+
+        for name, (col, op, enter, exit_) in self.rules.items():
+            if col not in group.columns:
+                continue
+            values = group[col].to_numpy(dtype=np.float64)
+            pending = state['open'].pop(name, None)
+            starts, ends, breaks, active = _runs(times, values, op, enter, exit_, pending is not None,
+                                                 state['last_time'], self.max_gap_sec)
+            if pending is not None and (not len(starts) or starts[0] != 0 or breaks[0]):
+                # The carried episode ended at this batch's first sample, or before a gap
+                if not breaks[0]:
+                    pending['end_sec'] = times[0]
+                    pending['duration_sec'] = pending['end_sec'] - pending['start_sec']
+                events.append(pending)
+                pending = None
+
+            if len(starts):
+                # Peak of each run: reduce over [start, end] pairs, skipping the gaps between runs
+                reduce = np.fmax if op == '>' else np.fmin
+                bounds = np.column_stack([starts, ends + 1]).ravel()
+                peaks = reduce.reduceat(np.append(values, np.nan), bounds)[::2]
+                for first, last, peak in zip(starts, ends, peaks):
+                    closed_by_sample = last + 1 < len(values) and not breaks[last + 1]
+                    event = {
+                        'headset_id': key[0], 'session_id': key[1], 'event': name,
+                        'start_sec': times[first], 'end_sec': times[last + 1] if closed_by_sample else times[last],
+                        'peak': float(peak), 'samples': int(last - first + 1), 'open': False,
+                    }
+                    if first == 0 and pending is not None:
+                        event['start_sec'] = pending['start_sec']
+                        event['peak'] = float(reduce(pending['peak'], event['peak']))
+                        event['samples'] += pending['samples']
+                    event['duration_sec'] = event['end_sec'] - event['start_sec']
+                    if last == len(values) - 1 and active:
+                        state['open'][name] = event
+                    else:
+                        events.append(event)
+        state['last_time'] = times[-1]
+        return events
+
+    def update(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Feed a batch of rows; returns the episodes completed by it."""
+        events = []
+        if not rows.empty:
+            keys = [k for k in EVENT_KEYS if k in rows.columns]
+            for key, group in rows.groupby(keys, observed=True, sort=False):
+                key = tuple(str(k) for k in key) + ('',) * (len(EVENT_KEYS) - len(keys))
+                events.extend(self._detect(key, group))
+        return _event_frame(events)
+
+    def flush(self) -> pd.DataFrame:
+        """Return the episodes still running, marked ``open`` (ending at their last sample)."""
+        events = []
+        for state in self.state.values():
+            for event in state['open'].values():
+                events.append(dict(event, open=True))
+            state['open'] = {}
+        return _event_frame(events)
+
+    def spans(self) -> pd.DataFrame:
+        """Observed time span of every headset session so far."""
+        return pd.DataFrame([
+            {'headset_id': key[0], 'session_id': key[1], 'observed_sec': s['last_time'] - s['first_time']}
+            for key, s in self.state.items() if s['last_time'] is not None
+        ], columns=EVENT_KEYS + ['observed_sec'])
+
+
+def _event_frame(events: list) -> pd.DataFrame:
+    return pd.DataFrame(events, columns=EVENT_COLUMNS)
+
+
+def detect_events(df: pd.DataFrame, rules: dict = None, max_gap_sec: float = DEFAULT_MAX_GAP_SEC) -> pd.DataFrame:
+    """Episode table of a merged frame (rows in time order per headset session)."""
+    detector = EventDetector(rules, max_gap_sec)
+    ordered = df.sort_values([k for k in EVENT_KEYS if k in df.columns] + ['timestamp_sec'], kind='stable')
+    return pd.concat([detector.update(ordered), detector.flush()], ignore_index=True)
+
+
+def stream_session_events(session_dir: str, chunksize: int = 100_000, rules: dict = None,
+                          max_gap_sec: float = DEFAULT_MAX_GAP_SEC) -> tuple:
+    """Episode table of a session read in chunks. Returns (events, observed spans)."""
+    detector = EventDetector(rules, max_gap_sec)
+    columns = EVENT_KEYS + ['timestamp_sec'] + [rule[0] for rule in detector.rules.values()]
+    frames = []
+    for csv_file in find_session_csvs(session_dir):
+        try:
+            for chunk in iter_metrics_csv(csv_file, columns=columns, chunksize=chunksize):
+                frames.append(detector.update(chunk))
+            print(f"  Streamed: {csv_file}")
+        except Exception as e:
+            print(f"  Error loading {csv_file}: {e}")
+    frames.append(detector.flush())
+    return pd.concat(frames, ignore_index=True), detector.spans()
+
+
+def summarize_events(events: pd.DataFrame, spans: pd.DataFrame) -> pd.DataFrame:
+    """Per headset and event type: count, rate per hour and duration distribution."""
+    if events.empty:
+        return pd.DataFrame()
+    observed_h = spans.groupby('headset_id')['observed_sec'].sum() / 3600
+    summary = events.groupby(['headset_id', 'event'])['duration_sec'].agg(
+        count='count', total_sec='sum', mean_sec='mean', median_sec='median',
+        p95_sec=lambda d: d.quantile(0.95), max_sec='max').reset_index()
+    summary['per_hour'] = summary['count'] / summary['headset_id'].map(observed_h).where(lambda h: h > 0)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract latency-spike and frame-drop episodes.")
+    parser.add_argument("session_dir", help="Session directory")
+    parser.add_argument("--stream", action="store_true", help="Read the CSVs in chunks instead of loading them")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Rows per chunk with --stream")
+    parser.add_argument("--max-gap-sec", type=float, default=DEFAULT_MAX_GAP_SEC,
+                        help="Sample gap that ends an episode (default: 10)")
+    parser.add_argument("--output", help="Episode CSV (default: <session_dir>/events.csv)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.session_dir):
+        print(f"Error: Directory not found: {args.session_dir}")
+        sys.exit(1)
+
+    if args.stream:
+        events, spans = stream_session_events(args.session_dir, args.chunksize, max_gap_sec=args.max_gap_sec)
+    else:
+        columns = EVENT_KEYS + ['timestamp_sec'] + [rule[0] for rule in EVENT_RULES.values()]
+        df = load_session_data(args.session_dir, columns=columns, use_store=True)
+        if df.empty:
+            print("No data to analyze.")
+            sys.exit(1)
+        events = detect_events(df, max_gap_sec=args.max_gap_sec)
+        spans = df.groupby(EVENT_KEYS, observed=True)['timestamp_sec'].agg(lambda t: t.max() - t.min())
+        spans = spans.rename('observed_sec').reset_index()
+
+    print(f"\n{'Events':=^60}")
+    summary = summarize_events(events, spans)
+    if summary.empty:
+        print("  No latency spikes or frame drops.")
+    else:
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+
+    output_path = args.output or os.path.join(args.session_dir, 'events.csv')
+    events.to_csv(output_path, index=False)
+    print(f"\nEvents saved to: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+metrics_follow.py - Live tail of in-progress MetricsLogger sessions.
+
+MetricsLogger appends to the session CSV every AUTO_SAVE_INTERVAL (60 s).
+This module remembers a byte offset per CSV and, whenever a file grows,
+parses only the newly appended complete lines. The new rows are folded into
+running accumulators, checked against the alert thresholds and fed to a
+metrics_events.EventDetector, so the live console view never re-parses a
+file and shows each latency spike or frame drop once it has ended.
+
+Directory changes are picked up with inotify when the optional inotify_simple
+package is installed, and by polling otherwise.
+
+Usage:
+    python analyze_metrics.py <session_dir> --follow [--poll-interval 2]
+"""
+
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from analyze_metrics import THRESHOLDS
+from metrics_io import find_session_csvs, parse_metrics_lines, read_csv_header
+from metrics_stream import SummaryAccumulator
+from metrics_events import EventDetector
+
+# Optional: inotify_simple for change notifications instead of polling
+try:
+    from inotify_simple import INotify, flags
+    HAS_INOTIFY = True
+except ImportError:
+    HAS_INOTIFY = False
+
+
+# Live alerts: name -> (column, comparison, threshold)
+ALERT_RULES = {
+    'fps_low': ('frame_rate_fps', '<', THRESHOLDS['fps_minimum']),
+    'latency_high': ('network_latency_ms', '>', THRESHOLDS['latency_target_ms']),
+    'calibration_high': ('calibration_error_mm', '>', THRESHOLDS['calibration_target_mm']),
+}
+
+
+class CsvTail:
+    """Reads the complete lines appended to a CSV since the last call."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.columns = None
+        self.offset = 0
+
+    def read_new_rows(self) -> pd.DataFrame:
+        """Return the rows appended since the last call (empty if none)."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return pd.DataFrame()
+        if size < self.offset:
+            # File was truncated or replaced; start over
+            self.columns = None
+            self.offset = 0
+        if size == self.offset:
+            return pd.DataFrame()
+
+        if self.columns is None:
+            self.columns = read_csv_header(self.path)
+            if not self.columns:
+                return pd.DataFrame()
+            with open(self.path, 'rb') as f:
+                self.offset = len(f.readline())
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+
+        # Leave a partially written last line for the next call
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return pd.DataFrame()
+        rows = parse_metrics_lines(data[:end], self.columns)
+        # Only move past the lines once they parsed, so a failed read is retried
+        self.offset += end
+        return rows
+
+
+def check_alerts(rows: pd.DataFrame) -> list:
+    """Return (headset_id, rule, count, worst value, timestamp of worst) for every rule that fired."""
+    alerts = []
+    for name, (col, op, threshold) in ALERT_RULES.items():
+        if col not in rows.columns:
+            continue
+        values = rows[col].to_numpy()
+        hits = values < threshold if op == '<' else values > threshold
+        if not hits.any():
+            continue
+        hit_rows = rows.loc[hits, ['headset_id', 'timestamp_sec', col]]
+        for headset_id, group in hit_rows.groupby('headset_id', observed=True, sort=True):
+            worst = group[col].idxmin() if op == '<' else group[col].idxmax()
+            alerts.append((str(headset_id), name, len(group), group.at[worst, col], group.at[worst, 'timestamp_sec']))
+    return alerts
+
+
+class SessionFollower:
+    """Running per-headset statistics and alerts over the growing CSVs of one session."""
+
+    def __init__(self, session_dir: str):
+        self.session_dir = session_dir
+        self.tails = {}
+        self.per_headset = {}
+        self.alert_counts = {}
+        self.events = EventDetector()
+        self.finished_events = []
+        self.new_events = []
+
+    def poll(self) -> tuple:
+        """
+        Read everything appended since the last poll. Returns (new row count,
+        alerts); episodes that ended are in ``new_events`` and ``finished_events``.
+        """
+        self.new_events = []
+        for csv_file in find_session_csvs(self.session_dir):
+            if csv_file not in self.tails and os.path.basename(csv_file) != 'merged_metrics.csv':
+                self.tails[csv_file] = CsvTail(csv_file)
+
+        new_rows = 0
+        alerts = []
+        for tail in self.tails.values():
+            try:
+                rows = tail.read_new_rows()
+            except Exception as e:
+                print(f"  Error reading {tail.path}: {e}")
+                continue
+            if rows.empty or 'headset_id' not in rows.columns:
+                continue
+            new_rows += len(rows)
+            for headset_id, group in rows.groupby('headset_id', observed=True, sort=False):
+                self.per_headset.setdefault(str(headset_id), SummaryAccumulator()).update(group)
+            self.new_events.extend(self.events.update(rows).to_dict('records'))
+            for alert in check_alerts(rows):
+                key = (alert[0], alert[1])
+                self.alert_counts[key] = self.alert_counts.get(key, 0) + alert[2]
+                alerts.append(alert)
+        self.finished_events.extend(self.new_events)
+        return new_rows, alerts
+
+    def render(self, alerts: list) -> str:
+        """Format the live console view."""
+        lines = [f"[{datetime.now():%H:%M:%S}] {self.session_dir} - {len(self.tails)} file(s)"]
+        lines.append(f"  {'headset':<10} {'samples':>8} {'time':>8} {'fps':>6} {'fps min':>7} "
+                     f"{'lat ms':>7} {'lat max':>8} {'calib':>6} {'alerts':>7}")
+        for headset_id in sorted(self.per_headset):
+            row = self.per_headset[headset_id].to_group_statistics()
+            alert_total = sum(c for (h, _), c in self.alert_counts.items() if h == headset_id)
+            lines.append(f"  {headset_id:<10} {row['samples']:>8,} {row['duration_min']:>7.1f}m "
+                         f"{row.get('fps_mean', np.nan):>6.1f} {row.get('fps_min', np.nan):>7.1f} "
+                         f"{row.get('latency_mean_ms', np.nan):>7.1f} {row.get('latency_max_ms', np.nan):>8.1f} "
+                         f"{row.get('calibration_mean_mm', np.nan):>6.2f} {alert_total:>7}")
+        for event in self.new_events:
+            lines.append(f"  EVENT {event['headset_id']} {event['event']}: {event['duration_sec']:.0f}s "
+                         f"from t={event['start_sec']:.0f}s (peak {event['peak']:.1f})")
+        for headset_id, name, count, worst, timestamp in alerts:
+            col, op, threshold = ALERT_RULES[name]
+            lines.append(f"  ALERT {headset_id} {name}: {count} sample(s) {op} {threshold} "
+                         f"(worst {worst:.1f} at t={timestamp:.0f}s)")
+        return "\n".join(lines)
+
+
+def _watch_dirs(session_dir: str) -> list:
+    dirs = [session_dir]
+    for name in sorted(os.listdir(session_dir)):
+        path = os.path.join(session_dir, name)
+        if name.startswith('H') and os.path.isdir(path):
+            dirs.append(path)
+            if os.path.isdir(os.path.join(path, 'metrics')):
+                dirs.append(os.path.join(path, 'metrics'))
+    return dirs
+
+
+def wait_for_changes(session_dir: str, poll_interval: float):
+    """Yield once per detected change (inotify) or once per poll interval (fallback)."""
+    if not HAS_INOTIFY:
+        while True:
+            yield
+            time.sleep(poll_interval)
+
+    inotify = INotify()
+    mask = flags.MODIFY | flags.CREATE | flags.MOVED_TO | flags.CLOSE_WRITE
+    watched = set()
+    try:
+        while True:
+            # Pick up headset folders created since the last wake-up
+            for path in _watch_dirs(session_dir):
+                if path not in watched:
+                    inotify.add_watch(path, mask)
+                    watched.add(path)
+            yield
+            # The timeout also rescans for new folders when nothing is written
+            inotify.read(timeout=int(poll_interval * 1000), read_delay=100)
+    finally:
+        inotify.close()
+
+
+def follow_session(session_dir: str, poll_interval: float = 2.0, max_updates: int = None) -> SessionFollower:
+    """Follow a session until interrupted (or ``max_updates`` wake-ups), printing a live view."""
+    follower = SessionFollower(session_dir)
+    print(f"Following {session_dir} ({'inotify' if HAS_INOTIFY else f'polling every {poll_interval:g}s'}), "
+          f"Ctrl+C to stop")
+    updates = 0
+    try:
+        for _ in wait_for_changes(session_dir, poll_interval):
+            new_rows, alerts = follower.poll()
+            if new_rows or updates == 0:
+                print(follower.render(alerts) + "\n")
+            updates += 1
+            if max_updates is not None and updates >= max_updates:
+                break
+    except KeyboardInterrupt:
+        print("\nStopped following.")
+    return follower
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+metrics_incremental.py - Incremental re-analysis of a session directory.
+
+Each MetricsLogger CSV is fingerprinted (size, mtime, content hash) and folded
+into per-headset SummaryAccumulators, which are cached in
+<session_dir>/.analysis_cache/manifest.json. On the next run only new or
+changed files are re-read; the cached partial aggregates of every other file
+are merged into the session totals.
+
+A file whose size and mtime are unchanged is trusted without hashing. When
+either changed, the content hash decides whether it really has to be re-read.
+
+Usage:
+    python analyze_metrics.py <session_dir> --incremental
+"""
+
+import os
+import json
+import hashlib
+
+import pandas as pd
+
+from metrics_io import find_session_csvs, iter_metrics_csv
+from metrics_stream import SummaryAccumulator
+
+
+CACHE_DIRNAME = '.analysis_cache'
+MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def content_hash(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-1 of a file's contents, read in blocks."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: str, previous: dict = None) -> dict:
+    """
+    Return {'size', 'mtime_ns', 'sha1'} for a file.
+
+    The hash is reused from ``previous`` when size and mtime are unchanged,
+    so untouched files are never read.
+    """
+    st = os.stat(path)
+    fingerprint = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if previous and previous.get('size') == st.st_size and previous.get('mtime_ns') == st.st_mtime_ns:
+        fingerprint['sha1'] = previous['sha1']
+    else:
+        fingerprint['sha1'] = content_hash(path)
+    return fingerprint
+
+
+def manifest_path(session_dir: str) -> str:
+    return os.path.join(session_dir, CACHE_DIRNAME, MANIFEST_FILENAME)
+
+
+def load_manifest(session_dir: str) -> dict:
+    """Load the cached fingerprints and partial aggregates, or an empty manifest."""
+    path = manifest_path(session_dir)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError) as e:
+            print(f"  Ignoring unreadable cache {path}: {e}")
+    return {'version': MANIFEST_VERSION, 'files': {}}
+
+
+def save_manifest(session_dir: str, manifest: dict):
+    """Write the manifest atomically so an interrupted run never leaves a corrupt cache."""
+    path = manifest_path(session_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def accumulate_by_headset(csv_file: str, chunksize: int = 100_000) -> dict:
+    """Fold one CSV into a SummaryAccumulator per headset_id."""
+    accumulators = {}
+    for chunk in iter_metrics_csv(csv_file, chunksize=chunksize):
+        for headset_id, rows in chunk.groupby('headset_id', observed=True, sort=False):
+            accumulators.setdefault(str(headset_id), SummaryAccumulator()).update(rows)
+    return accumulators
+
+
+def update_session_cache(session_dir: str, chunksize: int = 100_000) -> tuple:
+    """
+    Refresh the cache for ``session_dir``, re-reading only new or changed files.
+
+    Returns (per-headset accumulators merged over all files, change counts).
+    """
+    manifest = load_manifest(session_dir)
+    cached_files = manifest['files']
+    files = {}
+    changes = {'new': 0, 'changed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+    for csv_file in find_session_csvs(session_dir):
+        rel_path = os.path.relpath(csv_file, session_dir)
+        previous = cached_files.get(rel_path)
+        try:
+            fingerprint = file_fingerprint(csv_file, previous)
+            if previous and previous['sha1'] == fingerprint['sha1']:
+                files[rel_path] = dict(previous, **fingerprint)
+                changes['unchanged'] += 1
+                continue
+
+            accumulators = accumulate_by_headset(csv_file, chunksize)
+            files[rel_path] = dict(fingerprint, headsets={h: acc.to_dict() for h, acc in accumulators.items()})
+            changes['changed' if previous else 'new'] += 1
+            print(f"  {'Re-read' if previous else 'Read'}: {csv_file} "
+                  f"({sum(acc.rows for acc in accumulators.values())} rows)")
+        except Exception as e:
+            print(f"  Error loading {csv_file}: {e}")
+            # A failed read (e.g. a file still being written) keeps its cached aggregates
+            if previous:
+                files[rel_path] = previous
+                changes['failed'] += 1
+
+    changes['removed'] = len(set(cached_files) - set(files))
+    manifest['files'] = files
+    save_manifest(session_dir, manifest)
+
+    per_headset = {}
+    for entry in files.values():
+        for headset_id, data in entry['headsets'].items():
+            per_headset.setdefault(headset_id, SummaryAccumulator()).merge(SummaryAccumulator.from_dict(data))
+    return per_headset, changes
+
+
+def incremental_session_statistics(session_dir: str, chunksize: int = 100_000) -> tuple:
+    """
+    Return (summary stats, per-headset table, change counts) from the cache.
+
+    The summary has the same keys as calculate_statistics; percentiles come
+    from the merged t-digests.
+    """
+    per_headset, changes = update_session_cache(session_dir, chunksize)
+
+    total = SummaryAccumulator()
+    rows = []
+    for headset_id in sorted(per_headset):
+        acc = per_headset[headset_id]
+        total.merge(acc)
+        rows.append(dict(headset_id=headset_id, **acc.to_group_statistics()))
+
+    return total.to_statistics(), pd.DataFrame(rows), changes
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+metrics_io.py - Fast, typed reader for MetricsLogger CSV files.
+
+MetricsLogger.cs always writes the same fixed header, so the dtypes of every
+column are known up front. Reading with explicit dtypes avoids pandas' type
+inference, keeps the repeated string columns as categoricals and lets each
+analysis read only the columns it actually needs.
+
+Usage:
+    from metrics_io import read_metrics_csv
+    df = read_metrics_csv(path, columns=['headset_id', 'frame_rate_fps'])
+"""
+
+import io
+import os
+import sys
+import glob
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Optional: pyarrow provides the multi-threaded CSV parser
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# Column order written by MetricsLogger.cs (see StartSession / ToCsvLine)
+METRICS_COLUMNS = [
+    'session_id',
+    'headset_id',
+    'participant_count',
+    'timestamp_sec',
+    'frame_rate_fps',
+    'network_latency_ms',
+    'calibration_error_mm',
+    'battery_temp_c',
+    'battery_level',
+    'scene_state',
+]
+
+# MetricsLogger writes F1/F2 floats, which float32 holds to their last written
+# digit; report them through as_reported_float so 2.4 does not come back as
+# 2.4000000953674316. timestamp_sec stays float64 to keep long sessions at
+# 10 ms resolution.
+METRICS_DTYPES = {
+    'session_id': 'category',
+    'headset_id': 'category',
+    'participant_count': 'int16',
+    'timestamp_sec': 'float64',
+    'frame_rate_fps': 'float32',
+    'network_latency_ms': 'float32',
+    'calibration_error_mm': 'float32',
+    'battery_temp_c': 'float32',
+    'battery_level': 'int16',
+    'scene_state': 'category',
+}
+
+CSV_ENGINE = 'pyarrow' if HAS_PYARROW else 'c'
+
+# Other string columns become categoricals when at most this share of rows is distinct
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+def read_csv_header(csv_path: str) -> list:
+    """Return the column names from the first line of a CSV file."""
+    with open(csv_path, 'r', encoding='utf-8-sig') as f:
+        header = f.readline()
+    return [c.strip() for c in header.rstrip('\r\n').split(',') if c.strip()]
+
+
+def as_reported_float(values):
+    """
+    float64 of float32 values via their shortest decimal repr, i.e. the
+    number as it was written to the CSV (float32(2.4) -> 2.4, not
+    2.4000000953674316). Other dtypes are only cast to float64.
+    """
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        return values.astype(np.float64) if values.ndim else float(values)
+    if values.ndim == 0:
+        return float(str(values))
+    return np.array([float(str(v)) for v in values], dtype=np.float64)
+
+
+def _ends_with_newline(csv_path: str) -> bool:
+    with open(csv_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _parse_tolerant(source, dtypes: dict, drop_last: bool = False, **kwargs) -> pd.DataFrame:
+    """
+    Parse what the strict read rejected: the C parser skips rows with extra
+    fields, and integer columns are read as floats so a short row's gaps
+    become NaN (and are cast back when none are left). ``drop_last`` drops
+    an unterminated last line (a partial write).
+    """
+    int_columns = {c: d for c, d in dtypes.items() if str(d).startswith('int')}
+    read_dtypes = dict(dtypes, **{c: 'float32' for c in int_columns})
+    df = pd.read_csv(source, dtype=read_dtypes, engine='c', on_bad_lines='skip', **kwargs)
+    if drop_last and len(df):
+        df = df.iloc[:-1]
+    complete = {c: d for c, d in int_columns.items() if not df[c].isna().any()}
+    return df.astype(complete) if complete else df
+
+
+def _read_tolerant(csv_path: str, usecols: list, dtypes: dict) -> pd.DataFrame:
+    """Read a file the strict parse rejected, e.g. one whose last line was cut off when the app stopped mid-write."""
+    return _parse_tolerant(csv_path, dtypes, drop_last=not _ends_with_newline(csv_path), usecols=usecols)
+
+
+def parse_metrics_lines(data: bytes, names: list) -> pd.DataFrame:
+    """
+    Typed rows from complete CSV lines without a header (e.g. those appended
+    to a live session file), with read_metrics_csv's tolerance for short or
+    malformed rows.
+    """
+    dtypes = {c: METRICS_DTYPES[c] for c in names if c in METRICS_DTYPES}
+    try:
+        return pd.read_csv(io.BytesIO(data), names=names, header=None, dtype=dtypes)
+    except (ValueError, pd.errors.ParserError):
+        return _parse_tolerant(io.BytesIO(data), dtypes, names=names, header=None)
+
+
+def read_metrics_csv(csv_path: str, columns: list = None) -> pd.DataFrame:
+    """
+    Read a MetricsLogger CSV with explicit dtypes.
+
+    Only the requested columns are parsed; requested columns that are not in
+    the file are skipped so older logs with a different header still load.
+    Columns outside the MetricsLogger header are left to pandas' inference.
+    A file with a truncated or malformed line (a live session that crashed
+    mid-flush) loads without that line instead of failing.
+    """
+    header = read_csv_header(csv_path)
+    if columns is None:
+        usecols = header
+    else:
+        usecols = [c for c in columns if c in header]
+
+    dtypes = {c: METRICS_DTYPES[c] for c in usecols if c in METRICS_DTYPES}
+
+    try:
+        df = pd.read_csv(csv_path, usecols=usecols, dtype=dtypes, engine=CSV_ENGINE)
+    except (ValueError, pd.errors.ParserError):
+        # pyarrow.lib.ArrowInvalid is a ValueError
+        df = _read_tolerant(csv_path, usecols, dtypes)
+
+    # Keep the caller's column order regardless of the order in the file
+    return df[usecols]
+
+
+def find_session_csvs(session_dir: str) -> list:
+    """List MetricsLogger CSVs in the H*/ and H*/metrics/ folders of a session."""
+    csv_files = []
+    for headset_dir in sorted(glob.glob(os.path.join(session_dir, 'H*'))):
+        csv_files.extend(sorted(glob.glob(os.path.join(headset_dir, '*.csv'))))
+        csv_files.extend(sorted(glob.glob(os.path.join(headset_dir, 'metrics', '*.csv'))))
+    return csv_files
+
+
+def iter_metrics_csv(csv_path: str, columns: list = None, chunksize: int = 100_000):
+    """Yield a MetricsLogger CSV as typed DataFrame chunks of at most ``chunksize`` rows."""
+    header = read_csv_header(csv_path)
+    usecols = header if columns is None else [c for c in columns if c in header]
+    dtypes = {c: METRICS_DTYPES[c] for c in usecols if c in METRICS_DTYPES}
+
+    # Integer columns are parsed as floats so a truncated row cannot fail the file
+    int_columns = {c: d for c, d in dtypes.items() if str(d).startswith('int')}
+    read_dtypes = dict(dtypes, **{c: 'float32' for c in int_columns})
+
+    def typed(chunk):
+        complete = {c: d for c, d in int_columns.items() if not chunk[c].isna().any()}
+        return (chunk.astype(complete) if complete else chunk)[usecols]
+
+    # The pyarrow engine cannot read in chunks, so streaming always uses the C parser.
+    # Each chunk is held back one step, so an unterminated last line can be dropped.
+    pending = None
+    with pd.read_csv(csv_path, usecols=usecols, dtype=read_dtypes, engine='c', chunksize=chunksize,
+                     on_bad_lines='skip') as reader:
+        for chunk in reader:
+            if pending is not None:
+                yield typed(pending)
+            pending = chunk
+    if pending is not None:
+        if len(pending) and not _ends_with_newline(csv_path):
+            pending = pending.iloc[:-1]
+        yield typed(pending)
+
+
+def plain_memory_usage(df: pd.DataFrame) -> int:
+    """
+    Estimated bytes of ``df`` as plain pd.concat output would hold it: 64-bit
+    numerics and one Python string object per row for every text column.
+    """
+    total = df.index.memory_usage()
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            string_sizes = np.array([sys.getsizeof(str(c)) for c in values.cat.categories], dtype=np.int64)
+            counts = np.bincount(codes[codes >= 0], minlength=len(string_sizes))
+            total += 8 * len(values) + int(counts @ string_sizes)
+        elif pd.api.types.is_numeric_dtype(values.dtype):
+            total += 8 * len(values)
+        else:
+            total += values.memory_usage(deep=True, index=False)
+    return int(total)
+
+
+def normalize_metrics_frame(df: pd.DataFrame, report: bool = False) -> pd.DataFrame:
+    """
+    Give a merged frame the compact MetricsLogger dtypes.
+
+    pd.concat turns categoricals whose categories differ between files into
+    object columns, and extra columns (such as source_file) arrive as
+    per-row strings. MetricsLogger columns get their METRICS_DTYPES (an
+    integer column holding NaN, e.g. from an older log without it, becomes
+    float32), and other repeated strings become categoricals. With
+    ``report`` the memory used is printed next to the plain float64/object
+    layout (see plain_memory_usage).
+    """
+    converted = {}
+    for col in df.columns:
+        values = df[col]
+        dtype = METRICS_DTYPES.get(col)
+        if dtype is not None:
+            if dtype != 'category' and dtype.startswith('int') and values.isna().any():
+                dtype = 'float32'
+            if values.dtype != dtype:
+                converted[col] = values.astype(dtype)
+        elif (values.dtype == object or pd.api.types.is_string_dtype(values.dtype)) \
+                and not isinstance(values.dtype, pd.CategoricalDtype) \
+                and values.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * max(len(values), 1):
+            converted[col] = values.astype('category')
+    if converted:
+        df = df.assign(**converted)
+
+    if report:
+        plain = plain_memory_usage(df)
+        used = df.memory_usage(deep=True).sum()
+        saved = 100 * (1 - used / plain) if plain else 0.0
+        print(f"  Memory: {used / 1e6:.1f} MB ({plain / 1e6:.1f} MB as float64/object columns, {saved:.0f}% saved)")
+    return df
+
+
+def concat_metrics_frames(frames: list, report: bool = False) -> pd.DataFrame:
+    """
+    Concatenate per-file frames into one normalized frame.
+
+    Categorical columns are given the union of their categories first, so
+    pd.concat keeps them categorical instead of building an object column
+    of per-row strings.
+    """
+    frames = [f for f in frames if len(f.columns)]
+    if not frames:
+        return pd.DataFrame()
+    # Files with a header but no rows carry no categories (of no particular dtype)
+    frames = [f for f in frames if len(f)] or frames[:1]
+    for col in frames[0].columns:
+        if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            categories = union_categoricals([f[col] for f in frames], sort_categories=True).categories
+            frames = [f.assign(**{col: f[col].cat.set_categories(categories)}) for f in frames]
+    return normalize_metrics_frame(pd.concat(frames, ignore_index=True), report=report)
+
+
+def constant_category(value: str, length: int) -> pd.Categorical:
+    """A categorical of ``length`` copies of ``value`` (one code array, one string)."""
+    return pd.Categorical.from_codes(np.zeros(length, dtype=np.int8), categories=[value])
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+metrics_plot.py - Bounded-cost plotting helpers for long sessions.
+
+A multi-hour, multi-headset session has far more samples per series than a
+figure has pixels. Every time series is reduced to at most ``max_points``
+before it reaches matplotlib, with either min/max bucketing (keeps every
+spike, the default) or Largest-Triangle-Three-Buckets (keeps the visual
+shape). Dense scatter plots switch to hexbin density rendering above
+``max_points``, so figure time stays bounded whatever the sample count.
+"""
+
+import numpy as np
+
+
+# Points drawn per series; a few per horizontal pixel of a 14-inch figure
+MAX_POINTS_PER_SERIES = 4000
+
+# Above this many points a scatter plot is drawn as a hexbin density map
+MAX_SCATTER_POINTS = 5000
+
+
+def _finite_xy(x, y) -> tuple:
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+    return x, y
+
+
+def minmax_downsample(x, y, max_points: int = MAX_POINTS_PER_SERIES) -> tuple:
+    """
+    Keep the minimum and maximum of each of ``max_points // 2`` buckets.
+
+    ``x`` must be sorted. Every local extreme survives, so a single latency
+    spike is still drawn at full height.
+    """
+    x, y = _finite_xy(x, y)
+    n = len(y)
+    if n <= max_points or max_points < 4:
+        return x, y
+
+    n_buckets = max_points // 2
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_buckets, size)
+
+    offsets = np.arange(n_buckets) * size
+    lo = np.nanargmin(padded, axis=1) + offsets
+    hi = np.nanargmax(padded, axis=1) + offsets
+    keep = np.unique(np.concatenate([lo, hi, [0, n - 1]]))
+    return x[keep], y[keep]
+
+
+def lttb_downsample(x, y, max_points: int = MAX_POINTS_PER_SERIES) -> tuple:
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series sorted by ``x``.
+
+    Keeps the first and last point and, from each bucket in between, the
+    point spanning the largest triangle with the previously kept point and
+    the next bucket's mean.
+    """
+    x, y = _finite_xy(x, y)
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+
+        bx, by = x[start:stop], y[start:stop]
+        area = np.abs((x[prev] - next_x) * (by - y[prev]) - (x[prev] - bx) * (next_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        keep[i + 1] = prev
+    return x[keep], y[keep]
+
+
+DOWNSAMPLERS = {
+    'minmax': minmax_downsample,
+    'lttb': lttb_downsample,
+}
+
+
+def downsample(x, y, max_points: int = MAX_POINTS_PER_SERIES, method: str = 'minmax') -> tuple:
+    """Reduce a sorted series to at most ``max_points`` with the named method."""
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown downsampling method '{method}' (expected one of {sorted(DOWNSAMPLERS)})")
+    return DOWNSAMPLERS[method](x, y, max_points)
+
+
+def plot_series(ax, x, y, max_points: int = MAX_POINTS_PER_SERIES, method: str = 'minmax', **kwargs):
+    """``ax.plot`` of a downsampled series; kwargs are passed through."""
+    x, y = downsample(x, y, max_points, method)
+    return ax.plot(x, y, **kwargs)
+
+
+def density_scatter(ax, x, y, c=None, max_points: int = MAX_SCATTER_POINTS, gridsize: int = 60,
+                    cmap: str = 'viridis', **scatter_kwargs):
+    """
+    Scatter plot that becomes a hexbin above ``max_points`` points.
+
+    With ``c`` the hexbin cells are coloured by the mean of ``c`` in each
+    cell, so a colour bar keeps its meaning; without it by sample count.
+    Returns the mappable for ``plt.colorbar``.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) <= max_points:
+        return ax.scatter(x, y, c=c, cmap=cmap, **scatter_kwargs)
+    if c is None:
+        return ax.hexbin(x, y, gridsize=gridsize, cmap=cmap, mincnt=1, bins='log')
+    return ax.hexbin(x, y, C=np.asarray(c, dtype=np.float64), reduce_C_function=np.mean,
+                     gridsize=gridsize, cmap=cmap, mincnt=1)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+metrics_profile.py - Per-stage timing and memory for analyze_metrics.py --profile.
+
+StageProfiler records, for each named stage of a run, its wall time, CPU
+time, rows processed, peak traced allocation (tracemalloc) and the process's
+peak RSS so far, and can dump a cProfile file per stage. A disabled profiler
+(the default) does nothing, so the stages can stay instrumented in main().
+
+Usage:
+    python analyze_metrics.py <session_dir> --profile [--cprofile]
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import platform
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Optional: resource (POSIX only) for the peak resident set size
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+
+PROFILE_FILENAME = 'profile.json'
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unavailable."""
+    if not HAS_RESOURCE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak * 1024 / 1e6
+
+
+class StageProfiler:
+    """Collects one record per stage; a no-op unless ``enabled``."""
+
+    def __init__(self, enabled: bool = False, cprofile_dir: str = None):
+        self.enabled = enabled
+        self.cprofile_dir = cprofile_dir
+        self.stages = []
+        self.started = datetime.now()
+        self._start_wall = time.perf_counter()
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str, rows: int = None):
+        """
+        Time the enclosed block as stage ``name``.
+
+        Yields the stage record; set ``record['rows']`` inside the block when
+        the row count is only known afterwards. Stages must not be nested.
+        """
+        record = {'name': name, 'rows': rows}
+        if not self.enabled:
+            yield record
+            return
+
+        profile = cProfile.Profile() if self.cprofile_dir else None
+        tracemalloc.reset_peak()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile:
+                profile.disable()
+            record['wall_s'] = time.perf_counter() - start_wall
+            record['cpu_s'] = time.process_time() - start_cpu
+            record['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+            record['peak_rss_mb'] = peak_rss_mb()
+            if profile:
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                record['cprofile'] = os.path.join(self.cprofile_dir, f"{len(self.stages):02d}_{name}.prof")
+                profile.dump_stats(record['cprofile'])
+            self.stages.append(record)
+
+    def to_dict(self) -> dict:
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'total_wall_s': time.perf_counter() - self._start_wall,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'stages': self.stages,
+        }
+
+    def report(self) -> str:
+        """Format the stage table for the console."""
+        lines = [f"\n{'Profile':=^60}",
+                 f"  {'stage':<18} {'wall s':>8} {'cpu s':>8} {'rows':>11} {'traced MB':>10} {'RSS MB':>8}"]
+        for s in self.stages:
+            rows = f"{s['rows']:,}" if s['rows'] is not None else '-'
+            rss = f"{s['peak_rss_mb']:.0f}" if s['peak_rss_mb'] is not None else '-'
+            lines.append(f"  {s['name']:<18} {s['wall_s']:>8.3f} {s['cpu_s']:>8.3f} {rows:>11} "
+                         f"{s['peak_traced_mb']:>10.1f} {rss:>8}")
+        return "\n".join(lines)
+
+    def save(self, output_dir: str) -> str:
+        """Write <output_dir>/profile.json and return its path (None if disabled)."""
+        if not self.enabled:
+            return None
+        path = os.path.join(output_dir, PROFILE_FILENAME)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
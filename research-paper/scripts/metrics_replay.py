@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+metrics_replay.py - Replay recorded sessions to metrics_collector.py.
+
+Every MetricsLogger CSV of a session folder becomes one simulated headset:
+it sends its metadata as a JSON line, then its rows paced by timestamp_sec
+(``--speed`` times real time; 0 sends as fast as the collector accepts).
+``--copies N`` replays every file N times under headset ids suffixed -c<k>,
+to load-test the collector with many concurrent headsets.
+
+Usage:
+    python metrics_replay.py <session_dir> [--host 127.0.0.1] [--port 9750] [--udp]
+                             [--speed 1] [--copies 1]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from metrics_io import METRICS_COLUMNS, find_session_csvs, read_csv_header
+from metrics_collector import DEFAULT_TCP_PORT, DEFAULT_UDP_PORT
+
+# Datagram payload that stays below a typical Ethernet MTU
+MAX_DATAGRAM_BYTES = 1400
+
+
+def read_session_lines(csv_path: str) -> list:
+    """(timestamp_sec, fields) of every row, in the MetricsLogger column order."""
+    header = read_csv_header(csv_path)
+    if not set(METRICS_COLUMNS) <= set(header):
+        raise ValueError(f"missing columns: {sorted(set(METRICS_COLUMNS) - set(header))}")
+    positions = [header.index(c) for c in METRICS_COLUMNS]
+    timestamp = METRICS_COLUMNS.index('timestamp_sec')
+    rows = []
+    with open(csv_path, 'r', encoding='utf-8-sig') as f:
+        next(f)
+        for line in f:
+            fields = line.rstrip('\r\n').split(',')
+            if len(fields) != len(header):
+                continue
+            fields = [fields[i] for i in positions]
+            try:
+                rows.append((float(fields[timestamp]), fields))
+            except ValueError:
+                continue
+    return rows
+
+
+def read_metadata(csv_path: str) -> dict:
+    try:
+        with open(csv_path[:-len('.csv')] + '_metadata.json', 'r', encoding='utf-8-sig') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def client_lines(rows: list, metadata: dict, headset_id: str) -> tuple:
+    """The metadata line and (timestamp, line) pairs of one simulated headset."""
+    lines = [(t, ','.join([fields[0], headset_id] + fields[2:])) for t, fields in rows]
+    session_id = rows[0][1][0] if rows else metadata.get('sessionId')
+    meta_line = json.dumps(dict(metadata, sessionId=session_id, headsetId=headset_id))
+    return meta_line, lines
+
+
+def _paced(lines: list, speed: float, started: float):
+    """Group consecutive lines into batches due at the same time."""
+    if speed <= 0 or not lines:
+        yield 0.0, lines
+        return
+    first = lines[0][0]
+    batch = []
+    due = None
+    for t, line in lines:
+        line_due = started + (t - first) / speed
+        if batch and line_due - due > 0.01:
+            yield due, batch
+            batch = []
+        if not batch:
+            due = line_due
+        batch.append((t, line))
+    if batch:
+        yield due, batch
+
+
+async def replay_tcp(host: str, port: int, meta_line: str, lines: list, speed: float) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write((meta_line + '\n').encode('utf-8'))
+        sent = 0
+        for due, batch in _paced(lines, speed, time.monotonic()):
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            writer.write(''.join(line + '\n' for _, line in batch).encode('utf-8'))
+            await writer.drain()
+            sent += len(batch)
+        return sent
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def replay_udp(host: str, port: int, meta_line: str, lines: list, speed: float) -> int:
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+    try:
+        transport.sendto(meta_line.encode('utf-8'))
+        sent = 0
+        for due, batch in _paced(lines, speed, time.monotonic()):
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            datagram = b''
+            for _, line in batch:
+                encoded = (line + '\n').encode('utf-8')
+                if datagram and len(datagram) + len(encoded) > MAX_DATAGRAM_BYTES:
+                    transport.sendto(datagram)
+                    datagram = b''
+                datagram += encoded
+            if datagram:
+                transport.sendto(datagram)
+            sent += len(batch)
+            # Let the socket drain between batches when replaying at full speed
+            await asyncio.sleep(0)
+        return sent
+    finally:
+        transport.close()
+
+
+async def replay_session(session_dir: str, host: str, port: int, udp: bool = False,
+                         speed: float = 1.0, copies: int = 1) -> dict:
+    """Replay every CSV of ``session_dir`` ``copies`` times concurrently; returns lines sent per headset id."""
+    clients = []
+    for csv_file in find_session_csvs(session_dir):
+        try:
+            rows = read_session_lines(csv_file)
+        except (OSError, ValueError) as e:
+            print(f"  Error loading {csv_file}: {e}")
+            continue
+        if not rows:
+            continue
+        metadata = read_metadata(csv_file)
+        headset_id = rows[0][1][1]
+        for copy in range(copies):
+            client_id = headset_id if copies == 1 else f"{headset_id}-c{copy + 1}"
+            clients.append((client_id, client_lines(rows, metadata, client_id)))
+
+    replay = replay_udp if udp else replay_tcp
+    print(f"Replaying {len(clients)} headsets to {host}:{port} ({'UDP' if udp else 'TCP'}, "
+          f"{'max' if speed <= 0 else f'{speed:g}x'} speed)")
+    results = await asyncio.gather(*(replay(host, port, meta_line, lines, speed)
+                                     for _, (meta_line, lines) in clients), return_exceptions=True)
+
+    sent = {}
+    for (client_id, _), result in zip(clients, results):
+        if isinstance(result, Exception):
+            print(f"  Error replaying {client_id}: {result}")
+        else:
+            sent[client_id] = sent.get(client_id, 0) + result
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions to metrics_collector.py.")
+    parser.add_argument("session_dir", help="Session directory to replay")
+    parser.add_argument("--host", default='127.0.0.1', help="Collector address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=None,
+                        help=f"Collector port (default: {DEFAULT_TCP_PORT}, or {DEFAULT_UDP_PORT} with --udp)")
+    parser.add_argument("--udp", action="store_true", help="Send datagrams instead of a TCP stream")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed relative to real time; 0 sends as fast as possible (default: 1)")
+    parser.add_argument("--copies", type=int, default=1, help="Simulated headsets per recorded file (default: 1)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.session_dir):
+        print(f"Error: Directory not found: {args.session_dir}")
+        sys.exit(1)
+
+    port = args.port or (DEFAULT_UDP_PORT if args.udp else DEFAULT_TCP_PORT)
+    started = time.monotonic()
+    try:
+        sent = asyncio.run(replay_session(args.session_dir, args.host, port, args.udp, args.speed, args.copies))
+    except KeyboardInterrupt:
+        sys.exit(1)
+    elapsed = time.monotonic() - started
+    total = sum(sent.values())
+    print(f"Sent {total:,} lines for {len(sent)} headset ids in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} lines/s)")
+
+
+if __name__ == '__main__':
+    main()
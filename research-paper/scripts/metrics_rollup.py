@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+metrics_rollup.py - Multi-resolution pre-aggregated buckets for time-range queries.
+
+Every sample is put on the shared wall clock (metrics_align) and folded into
+buckets of 1 s, 10 s, 1 min and 10 min per headset session. For each
+MetricsLogger metric a bucket holds count, sum, sum of squares, min and max,
+and from SKETCH_MIN_RESOLUTION up a histogram over fixed bin edges
+(SKETCH_EDGES). All of these add up, so every level is built from the one
+below it (the first sketched level from the rows), any set of buckets merges
+into one without the raw rows, and quantiles are read from the merged
+histogram (accurate to within one bin, and clamped to the exact min/max).
+A 1 s bucket holds about one sample, so it gets no histogram: a dense one
+per bucket would be mostly zeros and dominate memory and file size.
+
+Rollups are saved in <session_dir>/rollups/ (one .npz per resolution) and
+rebuilt only when an input CSV changed. A query picks the coarsest
+resolution that still gives at least one bucket per pixel for the requested
+time range and width, so a dashboard zoomed out over months reads 10-minute
+buckets and one zoomed into a minute reads 1-second ones.
+
+Usage:
+    python metrics_rollup.py <session_dir> [<session_dir> ...] [--rebuild]
+                             [--start TIME] [--end TIME] [--width 1200] [--headset ID] [--output FILE]
+
+Example:
+    python metrics_rollup.py research-paper/data/sessions/* --start 2025-12-09T14:00 --end 2025-12-09T16:00 --width 800
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from analyze_metrics import load_session_data
+from metrics_align import session_start_times, add_wall_clock
+from metrics_io import find_session_csvs
+from metrics_store import input_fingerprints
+
+
+ROLLUP_DIRNAME = 'rollups'
+INPUTS_FILENAME = '_inputs.json'
+
+# Bucket sizes in seconds; each must divide the next
+RESOLUTIONS_SEC = (1, 10, 60, 600)
+
+ROLLUP_COLUMNS = ['frame_rate_fps', 'network_latency_ms', 'calibration_error_mm',
+                  'battery_temp_c', 'battery_level']
+
+# Inner histogram edges per metric; values beyond the ends fall into the outer bins
+SKETCH_EDGES = {
+    'frame_rate_fps': np.r_[np.arange(10, 50, 10), np.arange(50, 91, 1), 100, 120].astype(np.float64),
+    'network_latency_ms': np.geomspace(1, 2000, 64),
+    'calibration_error_mm': np.r_[np.arange(0.5, 10, 0.5), np.arange(10, 52, 2)].astype(np.float64),
+    'battery_temp_c': np.arange(20, 56, 1, dtype=np.float64),
+    'battery_level': np.arange(5, 100, 5, dtype=np.float64),
+}
+
+# Finest bucket size in seconds that carries histograms (and hence quantiles)
+SKETCH_MIN_RESOLUTION = 10
+
+QUERY_QUANTILES = (0.5, 0.95)
+
+DEFAULT_WIDTH_PX = 1200
+
+# Per-metric bucket fields and the reduction that merges them
+STAT_REDUCERS = {'count': np.add, 'sum': np.add, 'sumsq': np.add, 'min': np.fmin, 'max': np.fmax}
+
+
+class Rollup:
+    """Buckets of one resolution: key arrays plus per-metric stats and histograms, row-aligned."""
+
+    def __init__(self, resolution: int, headset_id: np.ndarray, session_id: np.ndarray,
+                 bucket: np.ndarray, stats: dict):
+        self.resolution = resolution
+        self.headset_id = headset_id
+        self.session_id = session_id
+        # Bucket start, UTC epoch seconds
+        self.bucket = bucket
+        # column -> {'count', 'sum', 'sumsq', 'min', 'max'[, 'hist']}
+        self.stats = stats
+
+    def __len__(self) -> int:
+        return len(self.bucket)
+
+    @property
+    def columns(self) -> list:
+        return list(self.stats)
+
+    def take(self, rows) -> 'Rollup':
+        return Rollup(self.resolution, self.headset_id[rows], self.session_id[rows], self.bucket[rows],
+                      {col: {k: v[rows] for k, v in s.items()} for col, s in self.stats.items()})
+
+    def select(self, start: float = None, end: float = None, headsets: list = None) -> 'Rollup':
+        """Buckets overlapping [start, end) (epoch seconds) of the given headsets."""
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.bucket + self.resolution > start
+        if end is not None:
+            mask &= self.bucket < end
+        if headsets is not None:
+            mask &= np.isin(self.headset_id, [str(h) for h in headsets])
+        return self.take(mask)
+
+    def save(self, path: str):
+        arrays = {'resolution': np.array(self.resolution), 'headset_id': self.headset_id,
+                  'session_id': self.session_id, 'bucket': self.bucket}
+        for col, s in self.stats.items():
+            arrays.update({f'{col}:{k}': v for k, v in s.items()})
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'Rollup':
+        with np.load(path) as data:
+            stats = {}
+            for name in data.files:
+                if ':' in name:
+                    col, field = name.split(':', 1)
+                    stats.setdefault(col, {})[field] = data[name]
+            return cls(int(data['resolution']), data['headset_id'], data['session_id'], data['bucket'], stats)
+
+    @classmethod
+    def concat(cls, rollups: list) -> 'Rollup':
+        rollups = [r for r in rollups if len(r)]
+        if not rollups:
+            return None
+        columns = [c for c in rollups[0].columns if all(c in r.stats for r in rollups)]
+        return cls(rollups[0].resolution,
+                   np.concatenate([r.headset_id for r in rollups]),
+                   np.concatenate([r.session_id for r in rollups]),
+                   np.concatenate([r.bucket for r in rollups]),
+                   {col: {k: np.concatenate([r.stats[col][k] for r in rollups]) for k in rollups[0].stats[col]}
+                    for col in columns})
+
+
+def _group_starts(*keys) -> tuple:
+    """Sort order of the rows by ``keys`` and the first sorted row of every distinct key."""
+    order = np.lexsort(keys[::-1])
+    changed = np.zeros(len(order), dtype=bool)
+    if len(order):
+        changed[0] = True
+    for key in keys:
+        sorted_key = key[order]
+        changed[1:] |= sorted_key[1:] != sorted_key[:-1]
+    return order, np.flatnonzero(changed)
+
+
+def bucket_samples(df: pd.DataFrame, resolution: int, columns: list = None) -> Rollup:
+    """
+    Rollup level from rows with headset_id, session_id, wall_time and the
+    metrics; histograms are added from SKETCH_MIN_RESOLUTION up.
+    """
+    columns = [c for c in (columns or ROLLUP_COLUMNS) if c in df.columns]
+    epoch = df['wall_time'].to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+    bucket = (np.floor(epoch / resolution) * resolution).astype(np.int64)
+    # Fixed-width strings, so the keys save without pickling
+    headset_id = np.asarray(df['headset_id'].astype(str), dtype=str)
+    session_id = np.asarray(df['session_id'].astype(str), dtype=str)
+
+    order, starts = _group_starts(headset_id, session_id, bucket)
+    n_buckets = len(starts)
+    # Bucket number of every sorted row
+    first = np.zeros(len(order), dtype=np.int64)
+    first[starts] = 1
+    row_bucket = np.cumsum(first) - 1
+
+    stats = {}
+    for col in columns:
+        values = df[col].to_numpy(dtype=np.float64)[order]
+        valid = ~np.isnan(values)
+        zeroed = np.where(valid, values, 0.0)
+        edges = SKETCH_EDGES.get(col) if resolution >= SKETCH_MIN_RESOLUTION else None
+        s = {
+            'count': np.add.reduceat(valid.astype(np.uint32), starts),
+            'sum': np.add.reduceat(zeroed, starts),
+            'sumsq': np.add.reduceat(zeroed * zeroed, starts),
+            'min': np.fmin.reduceat(values, starts),
+            'max': np.fmax.reduceat(values, starts),
+        }
+        if edges is not None:
+            bins = np.searchsorted(edges, values[valid], side='right')
+            n_bins = len(edges) + 1
+            s['hist'] = np.bincount(row_bucket[valid] * n_bins + bins,
+                                    minlength=n_buckets * n_bins).astype(np.uint32).reshape(n_buckets, n_bins)
+        stats[col] = s
+    return Rollup(resolution, headset_id[order][starts], session_id[order][starts], bucket[order][starts], stats)
+
+
+def merge_buckets(rollup: Rollup, group_keys: tuple, resolution: int = None) -> Rollup:
+    """
+    Merge the rows of ``rollup`` that share ``group_keys`` (arrays aligned
+    with its rows); the first key row of each group becomes the result's keys.
+    """
+    order, starts = _group_starts(*group_keys)
+    stats = {}
+    for col, s in rollup.stats.items():
+        merged = {k: STAT_REDUCERS[k].reduceat(s[k][order], starts) for k in STAT_REDUCERS}
+        if 'hist' in s:
+            merged['hist'] = np.add.reduceat(s['hist'][order], starts, axis=0)
+        stats[col] = merged
+    keys = order[starts]
+    return Rollup(resolution or rollup.resolution, rollup.headset_id[keys], rollup.session_id[keys],
+                  group_keys[-1][order][starts], stats)
+
+
+def coarsen(rollup: Rollup, resolution: int) -> Rollup:
+    """The same buckets merged into ``resolution``-second buckets."""
+    if resolution % rollup.resolution:
+        raise ValueError(f"{resolution}s buckets cannot be built from {rollup.resolution}s buckets")
+    bucket = rollup.bucket // resolution * resolution
+    return merge_buckets(rollup, (rollup.headset_id, rollup.session_id, bucket), resolution)
+
+
+def build_rollups(df: pd.DataFrame, resolutions: tuple = RESOLUTIONS_SEC, columns: list = None) -> dict:
+    """
+    resolution -> Rollup, each level built from the one below it, except the
+    finest and the first sketched level, which need the rows.
+    """
+    levels = {}
+    finer = None
+    for resolution in sorted(resolutions):
+        if finer is None or finer < SKETCH_MIN_RESOLUTION <= resolution:
+            levels[resolution] = bucket_samples(df, resolution, columns)
+        else:
+            levels[resolution] = coarsen(levels[finer], resolution)
+        finer = resolution
+    return levels
+
+
+def sketch_quantile(hist: np.ndarray, minimum: np.ndarray, maximum: np.ndarray,
+                    edges: np.ndarray, q: float) -> np.ndarray:
+    """q-th quantile of every histogram row, interpolated within its bin and clamped to [min, max]."""
+    hist = np.atleast_2d(hist).astype(np.float64)
+    total = hist.sum(axis=1)
+    cum = hist.cumsum(axis=1)
+    target = q * total
+    idx = np.minimum((cum < target[:, None]).sum(axis=1), hist.shape[1] - 1)
+    rows = np.arange(len(hist))
+    before = np.where(idx > 0, cum[rows, np.maximum(idx - 1, 0)], 0.0)
+    lower = np.r_[-np.inf, edges][idx]
+    upper = np.r_[edges, np.inf][idx]
+    lower = np.fmax(lower, minimum)
+    upper = np.fmin(upper, maximum)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.clip((target - before) / hist[rows, idx], 0.0, 1.0)
+        value = lower + fraction * (upper - lower)
+    return np.where(total > 0, value, np.nan)
+
+
+def rollup_frame(rollup: Rollup, columns: list = None, quantiles: tuple = QUERY_QUANTILES) -> pd.DataFrame:
+    """
+    One row per bucket: keys, time, and count/mean/std/min/max of each
+    metric, plus its quantiles on levels with histograms.
+    """
+    frame = {'headset_id': rollup.headset_id, 'session_id': rollup.session_id,
+             'time': pd.to_datetime(rollup.bucket, unit='s', utc=True)}
+    for col in (columns or rollup.columns):
+        s = rollup.stats[col]
+        count = s['count'].astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, s['sum'] / count, np.nan)
+            var = np.where(count > 1, (s['sumsq'] - count * mean ** 2) / (count - 1), np.nan)
+        frame[f'{col}_count'] = s['count']
+        frame[f'{col}_mean'] = mean
+        frame[f'{col}_std'] = np.sqrt(np.maximum(var, 0.0))
+        frame[f'{col}_min'] = s['min']
+        frame[f'{col}_max'] = s['max']
+        if 'hist' in s:
+            for q in quantiles:
+                frame[f'{col}_p{q * 100:g}'] = sketch_quantile(s['hist'], s['min'], s['max'], SKETCH_EDGES[col], q)
+    return pd.DataFrame(frame)
+
+
+def rollup_path(session_dir: str) -> str:
+    return os.path.join(session_dir, ROLLUP_DIRNAME)
+
+
+def _level_file(resolution: int) -> str:
+    return f'rollup_{resolution}s.npz'
+
+
+def _load_inputs(session_dir: str) -> dict:
+    try:
+        with open(os.path.join(rollup_path(session_dir), INPUTS_FILENAME), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def rollups_are_current(session_dir: str, csv_files: list, resolutions: tuple = RESOLUTIONS_SEC) -> bool:
+    """True when every level exists and was built from exactly these unchanged CSVs."""
+    path = rollup_path(session_dir)
+    if not all(os.path.exists(os.path.join(path, _level_file(r))) for r in resolutions):
+        return False
+    stored = _load_inputs(session_dir)
+    if stored is None or set(stored) != {os.path.relpath(f, session_dir) for f in csv_files}:
+        return False
+    current = input_fingerprints(session_dir, csv_files, stored)
+    return all(current[p]['sha1'] == stored[p]['sha1'] for p in current)
+
+
+def update_session_rollups(session_dir: str, resolutions: tuple = RESOLUTIONS_SEC, rebuild: bool = False) -> bool:
+    """
+    Build the rollups of a session unless they are current. The new levels
+    are written next to the old ones and swapped in. Returns True when built.
+
+    The inputs are fingerprinted before they are read, and a CSV that fails
+    to load is not recorded, so the next run retries it.
+    """
+    csv_files = find_session_csvs(session_dir)
+    if not csv_files or (not rebuild and rollups_are_current(session_dir, csv_files, resolutions)):
+        return False
+
+    fingerprints = input_fingerprints(session_dir, csv_files, _load_inputs(session_dir))
+    columns = ['session_id', 'headset_id', 'timestamp_sec', 'source_file'] + ROLLUP_COLUMNS
+    df = load_session_data(session_dir, columns=columns, use_store=True)
+    if df.empty:
+        return False
+    # Set when the rows came from the CSVs: the files that loaded
+    loaded = df.attrs.get('input_fingerprints')
+    if loaded is not None:
+        fingerprints = {p: fp for p, fp in fingerprints.items() if p in loaded}
+    df = add_wall_clock(df, session_start_times(csv_files))
+
+    path = rollup_path(session_dir)
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for resolution, rollup in build_rollups(df, resolutions).items():
+        rollup.save(os.path.join(tmp_path, _level_file(resolution)))
+    with open(os.path.join(tmp_path, INPUTS_FILENAME), 'w') as f:
+        json.dump(fingerprints, f, indent=2)
+
+    old_path = path + '.old'
+    if os.path.isdir(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return True
+
+
+def available_resolutions(session_dirs: list) -> list:
+    """Resolutions saved for every one of ``session_dirs``."""
+    common = None
+    for session_dir in session_dirs:
+        path = rollup_path(session_dir)
+        found = set()
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                if name.startswith('rollup_') and name.endswith('s.npz'):
+                    found.add(int(name[len('rollup_'):-len('s.npz')]))
+        common = found if common is None else common & found
+    return sorted(common or [])
+
+
+def choose_resolution(start: float, end: float, width_px: int, resolutions: list) -> int:
+    """Coarsest resolution giving at least one bucket per pixel over [start, end); else the finest."""
+    per_pixel = (end - start) / max(width_px, 1)
+    fitting = [r for r in resolutions if r <= per_pixel]
+    return max(fitting) if fitting else min(resolutions)
+
+
+def load_rollup(session_dirs: list, resolution: int) -> Rollup:
+    return Rollup.concat([Rollup.load(os.path.join(rollup_path(d), _level_file(resolution)))
+                          for d in session_dirs
+                          if os.path.exists(os.path.join(rollup_path(d), _level_file(resolution)))])
+
+
+def _epoch(value) -> float:
+    """Epoch seconds of a time string or Timestamp (naive times are read as local time)."""
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is None:
+        return stamp.to_pydatetime().timestamp()
+    return stamp.timestamp()
+
+
+def query(session_dirs: list, start=None, end=None, width_px: int = DEFAULT_WIDTH_PX,
+          columns: list = None, headsets: list = None) -> tuple:
+    """
+    Buckets of all ``session_dirs`` overlapping [start, end), at the coarsest
+    resolution that still resolves ``width_px`` pixels. Without start/end the
+    span of the coarsest level is used. Returns (resolution, frame).
+    """
+    resolutions = available_resolutions(session_dirs)
+    if not resolutions:
+        return None, pd.DataFrame()
+    if start is None or end is None:
+        coarse = load_rollup(session_dirs, max(resolutions))
+        if coarse is None:
+            return None, pd.DataFrame()
+        start = coarse.bucket.min() if start is None else _epoch(start)
+        end = coarse.bucket.max() + coarse.resolution if end is None else _epoch(end)
+    else:
+        start, end = _epoch(start), _epoch(end)
+
+    resolution = choose_resolution(start, end, width_px, resolutions)
+    rollup = load_rollup(session_dirs, resolution)
+    if rollup is None:
+        return resolution, pd.DataFrame()
+    return resolution, rollup_frame(rollup.select(start, end, headsets), columns)
+
+
+def summarize(rollup: Rollup, by: str = 'headset_id', columns: list = None) -> pd.DataFrame:
+    """One row per ``by`` value (headset_id or session_id) over all buckets, merged without raw rows."""
+    keys = getattr(rollup, by)
+    merged = merge_buckets(rollup, (keys, np.zeros(len(rollup), dtype=np.int64)))
+    frame = rollup_frame(merged, columns).drop(columns=['time'])
+    frame = frame.drop(columns=[k for k in ('headset_id', 'session_id') if k != by])
+    first = pd.Series(rollup.bucket).groupby(keys).min()
+    last = pd.Series(rollup.bucket + rollup.resolution).groupby(keys).max()
+    frame.insert(1, 'first', pd.to_datetime(frame[by].map(first), unit='s', utc=True))
+    frame.insert(2, 'last', pd.to_datetime(frame[by].map(last), unit='s', utc=True))
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-resolution metric rollups and time-range queries.")
+    parser.add_argument("session_dirs", nargs="+", help="Session directories")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the rollups even when current")
+    parser.add_argument("--start", help="Query start (ISO time; naive times are local)")
+    parser.add_argument("--end", help="Query end (ISO time; naive times are local)")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH_PX,
+                        help=f"Query width in pixels (default: {DEFAULT_WIDTH_PX})")
+    parser.add_argument("--headset", action="append", help="Only this headset id (repeatable)")
+    parser.add_argument("--output", help="Write the queried buckets to this CSV file")
+    args = parser.parse_args()
+
+    for session_dir in args.session_dirs:
+        if not os.path.isdir(session_dir):
+            print(f"Error: Directory not found: {session_dir}")
+            sys.exit(1)
+        built = update_session_rollups(session_dir, rebuild=args.rebuild)
+        print(f"  Rollups {'built' if built else 'current'}: {rollup_path(session_dir)}")
+
+    started = time.perf_counter()
+    resolution, buckets = query(args.session_dirs, args.start, args.end, args.width, headsets=args.headset)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if resolution is None or buckets.empty:
+        print("No data in range.")
+        sys.exit(1)
+    print(f"\nQuery: {len(buckets):,} buckets at {resolution}s resolution in {elapsed_ms:.0f} ms")
+
+    levels = available_resolutions(args.session_dirs)
+    summary = summarize(load_rollup(args.session_dirs, max(levels)).select(headsets=args.headset))
+    print(f"\n{'Overview':=^60}")
+    columns = ['headset_id', 'first', 'last', 'frame_rate_fps_mean', 'frame_rate_fps_p50',
+               'network_latency_ms_mean', 'network_latency_ms_p95', 'calibration_error_mm_mean']
+    print(summary[[c for c in columns if c in summary.columns]].to_string(
+        index=False, float_format=lambda v: f"{v:.1f}"))
+
+    if args.output:
+        buckets.to_csv(args.output, index=False)
+        print(f"\nBuckets saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
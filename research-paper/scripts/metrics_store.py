@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+metrics_store.py - Partitioned Parquet store for a session's merged metrics.
+
+The merged rows of a session are kept in <session_dir>/merged_metrics/ as a
+Parquet dataset partitioned by headset_id and session_id
+(merged_metrics/headset_id=H_4193/session_id=20251208_121551/part-0.parquet),
+with the compact dtypes from metrics_io. The store is rewritten only when
+the fingerprint of an input CSV changed (see metrics_incremental), and is
+read back memory-mapped with column and partition pruning.
+
+Without pyarrow, analyze_metrics.py falls back to writing merged_metrics.csv.
+
+Usage:
+    from metrics_store import read_merged_store
+    df = read_merged_store(session_dir, columns=['frame_rate_fps'], headsets=['H_4193'])
+"""
+
+import os
+import json
+import shutil
+
+import pandas as pd
+
+from metrics_io import HAS_PYARROW, concat_metrics_frames, normalize_metrics_frame
+from metrics_incremental import file_fingerprint
+
+if HAS_PYARROW:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs
+
+
+STORE_DIRNAME = 'merged_metrics'
+LEGACY_CSV_FILENAME = 'merged_metrics.csv'
+INPUTS_FILENAME = '_inputs.json'
+PARTITION_COLUMNS = ['headset_id', 'session_id']
+# Partition value for rows of a log without that column
+MISSING_PARTITION = 'unknown'
+
+
+def store_path(session_dir: str) -> str:
+    return os.path.join(session_dir, STORE_DIRNAME)
+
+
+def _load_inputs(session_dir: str) -> dict:
+    path = os.path.join(store_path(session_dir), INPUTS_FILENAME)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def input_fingerprints(session_dir: str, csv_files: list, previous: dict = None) -> dict:
+    """Fingerprint every input CSV, keyed by its path relative to ``session_dir``."""
+    previous = previous or {}
+    fingerprints = {}
+    for csv_file in csv_files:
+        rel_path = os.path.relpath(csv_file, session_dir)
+        fingerprints[rel_path] = file_fingerprint(csv_file, previous.get(rel_path))
+    return fingerprints
+
+
+def fingerprint_before_read(session_dir: str, csv_files: list) -> dict:
+    """
+    Fingerprint the input CSVs ahead of reading them, reusing the store's
+    hashes of unchanged files. A file that cannot be fingerprinted is left
+    out, as it will fail to load as well.
+    """
+    stored = _load_inputs(session_dir)
+    fingerprints = {}
+    for csv_file in csv_files:
+        rel_path = os.path.relpath(csv_file, session_dir)
+        try:
+            fingerprints[rel_path] = file_fingerprint(csv_file, stored.get(rel_path))
+        except OSError:
+            pass
+    return fingerprints
+
+
+def store_is_current(session_dir: str, csv_files: list) -> bool:
+    """True when the store exists and was built from exactly these unchanged CSVs."""
+    if not HAS_PYARROW or not os.path.isdir(store_path(session_dir)):
+        return False
+    stored = _load_inputs(session_dir)
+    if set(stored) != {os.path.relpath(f, session_dir) for f in csv_files}:
+        return False
+    current = input_fingerprints(session_dir, csv_files, stored)
+    return all(current[p]['sha1'] == stored[p]['sha1'] for p in current)
+
+
+def _partition_schema():
+    return pa.schema([(col, pa.string()) for col in PARTITION_COLUMNS])
+
+
+def _with_partition_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """A copy with every partition column as strings, MISSING_PARTITION where a log has none."""
+    frame = df.copy()
+    for col in PARTITION_COLUMNS:
+        frame[col] = frame[col].astype(str) if col in frame.columns else MISSING_PARTITION
+    return frame
+
+
+def write_merged_store(df: pd.DataFrame, session_dir: str, csv_files: list, fingerprints: dict = None) -> tuple:
+    """
+    Write the merged rows unless the store is already current.
+
+    ``fingerprints`` are those of the CSVs the rows were read from, taken
+    before reading (see fingerprint_before_read); only these files are
+    recorded as inputs, so one that changed during the load or failed to
+    load makes the store stale. Without them, ``csv_files`` are
+    fingerprinted now.
+
+    The new store is built next to the old one and swapped in, so readers
+    never see a half-written dataset. Returns (path, written).
+    """
+    if not HAS_PYARROW:
+        path = os.path.join(session_dir, LEGACY_CSV_FILENAME)
+        df.to_csv(path, index=False)
+        return path, True
+
+    path = store_path(session_dir)
+    if store_is_current(session_dir, csv_files):
+        return path, False
+
+    table = pa.Table.from_pandas(_with_partition_keys(df), preserve_index=False)
+
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    ds.write_dataset(table, tmp_path, format='parquet',
+                     partitioning=ds.partitioning(_partition_schema(), flavor='hive'))
+    with open(os.path.join(tmp_path, INPUTS_FILENAME), 'w') as f:
+        if fingerprints is None:
+            fingerprints = input_fingerprints(session_dir, csv_files, _load_inputs(session_dir))
+        json.dump(fingerprints, f, indent=2)
+
+    old_path = path + '.old'
+    if os.path.isdir(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    # A store replaces the text copy written by earlier versions
+    legacy_path = os.path.join(session_dir, LEGACY_CSV_FILENAME)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+    return path, True
+
+
+def _partition_dir(path: str, headset_id: str, session_id: str) -> str:
+    return os.path.join(path, f'headset_id={headset_id}', f'session_id={session_id}')
+
+
+def refresh_merged_store(session_dir: str, csv_files: list):
+    """
+    Bring an existing store up to date by rewriting only the partitions that
+    hold rows of new, changed or removed CSVs; every other partition and CSV
+    is left unread. Inputs are fingerprinted before they are read, and a file
+    that fails to load keeps its previous rows and fingerprint.
+
+    Returns {'files': re-read files, 'partitions': rewritten partitions}, or
+    None when there is no store to update (load everything and call
+    write_merged_store instead).
+    """
+    path = store_path(session_dir)
+    if not HAS_PYARROW or not os.path.isdir(path):
+        return None
+    from analyze_metrics import _load_metrics_file
+
+    stored = _load_inputs(session_dir)
+    current = {}
+    for csv_file in csv_files:
+        rel_path = os.path.relpath(csv_file, session_dir)
+        try:
+            current[rel_path] = file_fingerprint(csv_file, stored.get(rel_path))
+        except OSError as e:
+            print(f"  Error loading {csv_file}: {e}")
+            if rel_path in stored:
+                current[rel_path] = stored[rel_path]
+    stale = {p for p in stored if p not in current or stored[p]['sha1'] != current[p]['sha1']}
+    to_read = [f for f in csv_files if os.path.relpath(f, session_dir) in current and
+               (os.path.relpath(f, session_dir) in stale or os.path.relpath(f, session_dir) not in stored)]
+    if not stale and not to_read:
+        return {'files': 0, 'partitions': 0}
+
+    frames = []
+    for csv_file, df, error in map(_load_metrics_file, to_read):
+        rel_path = os.path.relpath(csv_file, session_dir)
+        if error is not None:
+            print(f"  Error loading {csv_file}: {error}")
+            # Keep what the store already has for this file
+            stale.discard(rel_path)
+            if rel_path in stored:
+                current[rel_path] = stored[rel_path]
+            else:
+                current.pop(rel_path)
+            continue
+        print(f"  Loaded: {csv_file} ({len(df)} rows)")
+        frames.append(df)
+    new_rows = _with_partition_keys(concat_metrics_frames(frames)) if frames else pd.DataFrame(columns=PARTITION_COLUMNS)
+    stale_names = {os.path.basename(p) for p in stale}
+
+    dataset = ds.dataset(path, format='parquet',
+                         partitioning=ds.partitioning(_partition_schema(), flavor='hive'),
+                         exclude_invalid_files=True)
+    file_schema = pa.schema([f for f in dataset.schema if f.name not in PARTITION_COLUMNS])
+    # Partitions that hold rows of a stale file, found from three small columns
+    keys = dataset.to_table(columns=PARTITION_COLUMNS + ['source_file'],
+                            filter=ds.field('source_file').isin(sorted(stale_names))).to_pandas()
+    affected = set(map(tuple, keys[PARTITION_COLUMNS].astype(str).drop_duplicates().to_numpy()))
+    affected |= set(map(tuple, new_rows[PARTITION_COLUMNS].astype(str).drop_duplicates().to_numpy()))
+
+    for headset_id, session_id in sorted(affected):
+        condition = (ds.field('headset_id') == headset_id) & (ds.field('session_id') == session_id)
+        kept = dataset.to_table(filter=condition).to_pandas()
+        kept = kept[~kept['source_file'].astype(str).isin(stale_names)]
+        added = new_rows[(new_rows['headset_id'].astype(str) == headset_id) &
+                         (new_rows['session_id'].astype(str) == session_id)]
+        frame = pd.concat([kept[file_schema.names], added[file_schema.names]], ignore_index=True)
+
+        partition = _partition_dir(path, headset_id, session_id)
+        old_files = os.listdir(partition) if os.path.isdir(partition) else []
+        if len(frame):
+            os.makedirs(partition, exist_ok=True)
+            # Dot-prefixed files are ignored by dataset readers until renamed
+            tmp_file = os.path.join(partition, '.part-0.parquet.tmp')
+            table = pa.Table.from_pandas(frame, preserve_index=False).cast(file_schema)
+            pq.write_table(table, tmp_file)
+            os.replace(tmp_file, os.path.join(partition, 'part-0.parquet'))
+        for name in old_files:
+            if name != 'part-0.parquet' or not len(frame):
+                os.remove(os.path.join(partition, name))
+        if not len(frame) and os.path.isdir(partition):
+            os.rmdir(partition)
+
+    with open(os.path.join(path, INPUTS_FILENAME), 'w') as f:
+        json.dump(current, f, indent=2)
+    return {'files': len(frames), 'partitions': len(affected)}
+
+
+def read_merged_store(session_dir: str, columns: list = None,
+                      headsets: list = None, sessions: list = None) -> pd.DataFrame:
+    """
+    Read the store memory-mapped, loading only ``columns`` from the
+    partitions of the given ``headsets`` and ``sessions`` (default: all).
+
+    Rows come back sorted by headset_id and timestamp_sec, as from
+    load_session_data.
+    """
+    dataset = ds.dataset(store_path(session_dir), format='parquet',
+                         partitioning=ds.partitioning(_partition_schema(), flavor='hive'),
+                         filesystem=fs.LocalFileSystem(use_mmap=True),
+                         exclude_invalid_files=True)
+    names = dataset.schema.names
+    if columns is not None:
+        columns = [c for c in columns if c in names]
+        # Sorting needs both keys even when the caller did not ask for them
+        read_columns = columns + [c for c in ('headset_id', 'timestamp_sec') if c in names and c not in columns]
+    else:
+        read_columns = names
+
+    condition = None
+    for col, values in (('headset_id', headsets), ('session_id', sessions)):
+        if values is not None:
+            clause = ds.field(col).isin([str(v) for v in values])
+            condition = clause if condition is None else condition & clause
+
+    df = normalize_metrics_frame(dataset.to_table(columns=read_columns, filter=condition).to_pandas())
+
+    sort_keys = [c for c in ('headset_id', 'timestamp_sec') if c in df.columns]
+    if sort_keys:
+        df = df.sort_values(sort_keys, kind='stable', ignore_index=True)
+    return df[columns] if columns is not None else df
+
+
+def read_current_store(session_dir: str, csv_files: list, columns: list = None):
+    """The store's rows if it is current for ``csv_files``, else None."""
+    if not store_is_current(session_dir, csv_files):
+        return None
+    return read_merged_store(session_dir, columns=columns)
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+metrics_stream.py - Bounded-memory session statistics from mergeable accumulators.
+
+Instead of loading every row into one DataFrame, the CSVs are read in chunks
+and folded into small accumulators (Welford mean/variance, min/max, threshold
+counters and a t-digest quantile sketch). Accumulators from different chunks,
+files or runs can be merged, and the result is the same summary dict that
+analyze_metrics.calculate_statistics produces, with sketched percentiles.
+
+Usage:
+    from metrics_stream import stream_session_statistics
+    stats = stream_session_statistics('research-paper/data/sessions/20251209')
+"""
+
+import numpy as np
+import pandas as pd
+
+from analyze_metrics import THRESHOLDS, SUMMARY_COLUMNS, SUMMARY_QUANTILES
+from metrics_io import as_reported_float, find_session_csvs, iter_metrics_csv
+
+
+# Threshold counters: summary key -> (column, comparison, threshold)
+THRESHOLD_COUNTERS = {
+    'fps_target_achieved_pct': ('frame_rate_fps', '>=', THRESHOLDS['fps_target']),
+    'fps_minimum_achieved_pct': ('frame_rate_fps', '>=', THRESHOLDS['fps_minimum']),
+    'latency_target_achieved_pct': ('network_latency_ms', '<=', THRESHOLDS['latency_target_ms']),
+    'packet_loss_target_achieved_pct': ('packet_loss_pct', '<=', THRESHOLDS['packet_loss_target_pct']),
+    'calibration_target_achieved_pct': ('calibration_error_mm', '<=', THRESHOLDS['calibration_target_mm']),
+}
+
+# Columns whose percentiles are reported, and so get a quantile sketch
+SKETCHED_COLUMNS = ['frame_rate_fps', 'network_latency_ms']
+
+
+class RunningStats:
+    """Mergeable count/mean/variance (Welford, Chan et al. merge) plus min/max."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray):
+        """Fold a batch of values into the running totals."""
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        batch = RunningStats()
+        batch.count = values.size
+        batch.mean = values.mean(dtype=np.float64)
+        centered = values - batch.mean
+        batch.m2 = np.dot(centered, centered)
+        batch.min = as_reported_float(values.min())
+        batch.max = as_reported_float(values.max())
+        self.merge(batch)
+
+    def merge(self, other: 'RunningStats'):
+        """Combine another accumulator into this one."""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1), as pandas reports it."""
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': float(self.min), 'max': float(self.max)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RunningStats':
+        stats = cls()
+        stats.count = int(data['count'])
+        stats.mean = float(data['mean'])
+        stats.m2 = float(data['m2'])
+        stats.min = float(data['min'])
+        stats.max = float(data['max'])
+        return stats
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest, arcsine scale function).
+
+    Centroids are re-clustered in one vectorized pass per update: values are
+    sorted, each is mapped onto the k-scale and neighbours that share an
+    integer k are merged. Clusters stay small near the tails, so p5/p95/p99
+    remain accurate with about compression / 2 centroids.
+    """
+
+    def __init__(self, compression: float = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return self.weights.sum()
+
+    def update(self, values: np.ndarray):
+        """Add a batch of raw values."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(values.size)]))
+
+    def merge(self, other: 'TDigest'):
+        """Combine another digest into this one."""
+        if other.weights.size == 0:
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        order = np.argsort(means, kind='stable')
+        means = means[order]
+        weights = weights[order]
+
+        total = weights.sum()
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+        cluster = np.floor(k)
+
+        starts = np.flatnonzero(np.r_[True, cluster[1:] != cluster[:-1]])
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-th quantile (0 <= q <= 1)."""
+        if self.weights.size == 0:
+            return np.nan
+        if self.weights.size == 1:
+            return self.means[0]
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        # Anchor the ends at the exact min/max so the extremes interpolate sensibly
+        positions = np.concatenate([[0.0], centers, [total]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q * total, positions, values))
+
+    def to_dict(self) -> dict:
+        return {'compression': self.compression, 'means': self.means.tolist(),
+                'weights': self.weights.tolist(), 'min': float(self.min), 'max': float(self.max)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TDigest':
+        digest = cls(data['compression'])
+        digest.means = np.asarray(data['means'], dtype=np.float64)
+        digest.weights = np.asarray(data['weights'], dtype=np.float64)
+        digest.min = float(data['min'])
+        digest.max = float(data['max'])
+        return digest
+
+
+class SummaryAccumulator:
+    """Mergeable state from which the calculate_statistics summary can be rebuilt."""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+        self.digests = {}
+        self.threshold_counts = {key: 0 for key in THRESHOLD_COUNTERS}
+        # headset_id -> [first timestamp, first battery level, last timestamp, last battery level]
+        self.battery = {}
+        self.scene_counts = {}
+
+    def update(self, df: pd.DataFrame):
+        """Fold one chunk of MetricsLogger rows into the accumulator."""
+        if df.empty:
+            return
+        self.rows += len(df)
+
+        for col in SUMMARY_COLUMNS:
+            if col in df.columns:
+                self.columns.setdefault(col, RunningStats()).update(df[col].to_numpy())
+        for col in SKETCHED_COLUMNS:
+            if col in df.columns:
+                self.digests.setdefault(col, TDigest()).update(df[col].to_numpy())
+
+        for key, (col, op, threshold) in THRESHOLD_COUNTERS.items():
+            if col in df.columns:
+                values = df[col].to_numpy()
+                hits = values >= threshold if op == '>=' else values <= threshold
+                self.threshold_counts[key] += int(np.count_nonzero(hits))
+
+        if {'headset_id', 'timestamp_sec', 'battery_level'} <= set(df.columns):
+            ordered = df[['headset_id', 'timestamp_sec', 'battery_level']].sort_values(
+                ['headset_id', 'timestamp_sec'], kind='stable')
+            grouped = ordered.groupby('headset_id', observed=True, sort=False)
+            edges = grouped.agg(first_ts=('timestamp_sec', 'first'), first_level=('battery_level', 'first'),
+                                last_ts=('timestamp_sec', 'last'), last_level=('battery_level', 'last'))
+            for headset_id, row in edges.iterrows():
+                self._merge_battery(str(headset_id), [row['first_ts'], row['first_level'],
+                                                      row['last_ts'], row['last_level']])
+
+        if 'scene_state' in df.columns:
+            for state, count in df['scene_state'].value_counts(sort=False).items():
+                if count:
+                    self.scene_counts[str(state)] = self.scene_counts.get(str(state), 0) + int(count)
+
+    def _merge_battery(self, headset_id: str, edge: list):
+        current = self.battery.get(headset_id)
+        if current is None:
+            self.battery[headset_id] = [float(v) for v in edge]
+            return
+        if edge[0] < current[0]:
+            current[0], current[1] = float(edge[0]), float(edge[1])
+        if edge[2] >= current[2]:
+            current[2], current[3] = float(edge[2]), float(edge[3])
+
+    def merge(self, other: 'SummaryAccumulator'):
+        """Combine another accumulator (another chunk, file or run) into this one."""
+        self.rows += other.rows
+        for col, stats in other.columns.items():
+            self.columns.setdefault(col, RunningStats()).merge(stats)
+        for col, digest in other.digests.items():
+            self.digests.setdefault(col, TDigest()).merge(digest)
+        for key, count in other.threshold_counts.items():
+            self.threshold_counts[key] = self.threshold_counts.get(key, 0) + count
+        for headset_id, edge in other.battery.items():
+            self._merge_battery(headset_id, edge)
+        for state, count in other.scene_counts.items():
+            self.scene_counts[state] = self.scene_counts.get(state, 0) + count
+
+    def to_statistics(self) -> dict:
+        """Build the summary dict with the same keys and order as calculate_statistics."""
+        if self.rows == 0:
+            return {}
+
+        temp_col = 'battery_temp_c' if 'battery_temp_c' in self.columns else 'headset_temp_c'
+
+        def col_stat(col, stat):
+            stats = self.columns.get(col)
+            if stats is None:
+                return 0
+            return {'mean': stats.mean, 'std': stats.std, 'min': stats.min, 'max': stats.max}[stat]
+
+        def col_quantile(col, q):
+            digest = self.digests.get(col)
+            return digest.quantile(q) if digest is not None else 0
+
+        def pct(key):
+            col = THRESHOLD_COUNTERS[key][0]
+            if col not in self.columns:
+                return 0
+            return self.threshold_counts[key] / self.rows * 100
+
+        headsets = sorted(self.battery)
+        battery_start = np.mean([self.battery[h][1] for h in headsets]) if headsets else np.nan
+        battery_end = np.mean([self.battery[h][3] for h in headsets]) if headsets else np.nan
+
+        p5, p50, p95, p99 = SUMMARY_QUANTILES
+        return {
+            # Session info
+            'total_samples': self.rows,
+            'headset_count': len(headsets),
+            'headsets': headsets,
+            'duration_seconds': col_stat('timestamp_sec', 'max'),
+            'duration_minutes': col_stat('timestamp_sec', 'max') / 60,
+
+            # Frame rate
+            'fps_mean': col_stat('frame_rate_fps', 'mean'),
+            'fps_std': col_stat('frame_rate_fps', 'std'),
+            'fps_min': col_stat('frame_rate_fps', 'min'),
+            'fps_max': col_stat('frame_rate_fps', 'max'),
+            'fps_p5': col_quantile('frame_rate_fps', p5),
+            'fps_p95': col_quantile('frame_rate_fps', p95),
+            'fps_target_achieved_pct': pct('fps_target_achieved_pct'),
+            'fps_minimum_achieved_pct': pct('fps_minimum_achieved_pct'),
+
+            # Frame time
+            'frame_time_mean_ms': col_stat('frame_time_ms', 'mean'),
+            'frame_time_max_ms': col_stat('frame_time_ms', 'max'),
+
+            # Network latency
+            'latency_mean_ms': col_stat('network_latency_ms', 'mean'),
+            'latency_std_ms': col_stat('network_latency_ms', 'std'),
+            'latency_min_ms': col_stat('network_latency_ms', 'min'),
+            'latency_max_ms': col_stat('network_latency_ms', 'max'),
+            'latency_p50_ms': col_quantile('network_latency_ms', p50),
+            'latency_p95_ms': col_quantile('network_latency_ms', p95),
+            'latency_p99_ms': col_quantile('network_latency_ms', p99),
+            'latency_target_achieved_pct': pct('latency_target_achieved_pct'),
+
+            # Packet loss
+            'packet_loss_mean_pct': col_stat('packet_loss_pct', 'mean'),
+            'packet_loss_max_pct': col_stat('packet_loss_pct', 'max'),
+            'packet_loss_target_achieved_pct': pct('packet_loss_target_achieved_pct'),
+
+            # Calibration
+            'calibration_mean_mm': col_stat('calibration_error_mm', 'mean'),
+            'calibration_std_mm': col_stat('calibration_error_mm', 'std'),
+            'calibration_max_mm': col_stat('calibration_error_mm', 'max'),
+            'calibration_target_achieved_pct': pct('calibration_target_achieved_pct'),
+
+            # Battery Temperature
+            'battery_temp_mean_c': col_stat(temp_col, 'mean'),
+            'battery_temp_max_c': col_stat(temp_col, 'max'),
+
+            # CPU Usage
+            'cpu_usage_mean_pct': col_stat('cpu_usage_pct', 'mean'),
+            'cpu_usage_max_pct': col_stat('cpu_usage_pct', 'max'),
+
+            # Memory Usage
+            'memory_used_mean_mb': col_stat('memory_used_mb', 'mean'),
+            'memory_used_max_mb': col_stat('memory_used_mb', 'max'),
+
+            # Battery
+            'battery_start_pct': battery_start,
+            'battery_end_pct': battery_end,
+            'battery_drain_pct': battery_start - battery_end,
+        }
+
+    def to_group_statistics(self) -> dict:
+        """Build one row of the calculate_group_statistics table for this accumulator's rows."""
+        def stat(col, name):
+            stats = self.columns.get(col)
+            return getattr(stats, name) if stats is not None else np.nan
+
+        row = {
+            'samples': self.rows,
+            'duration_min': stat('timestamp_sec', 'max') / 60,
+        }
+        if self.scene_counts:
+            # Most frequent state; ties go to the first in sort order, like Series.mode()
+            row['scene_state'] = min(self.scene_counts, key=lambda s: (-self.scene_counts[s], s))
+        for name, col, attr in [('fps_mean', 'frame_rate_fps', 'mean'), ('fps_min', 'frame_rate_fps', 'min'),
+                                ('latency_mean_ms', 'network_latency_ms', 'mean'),
+                                ('latency_max_ms', 'network_latency_ms', 'max'),
+                                ('calibration_mean_mm', 'calibration_error_mm', 'mean'),
+                                ('packet_loss_mean_pct', 'packet_loss_pct', 'mean')]:
+            if col in self.columns:
+                row[name] = stat(col, attr)
+        if self.battery:
+            edges = list(self.battery.values())
+            row['battery_drain_pct'] = (min(edges, key=lambda e: e[0])[1] - max(edges, key=lambda e: e[2])[3])
+        return row
+
+    def to_dict(self) -> dict:
+        return {
+            'rows': self.rows,
+            'columns': {col: stats.to_dict() for col, stats in self.columns.items()},
+            'digests': {col: digest.to_dict() for col, digest in self.digests.items()},
+            'threshold_counts': dict(self.threshold_counts),
+            'battery': {headset_id: list(edge) for headset_id, edge in self.battery.items()},
+            'scene_counts': dict(self.scene_counts),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SummaryAccumulator':
+        acc = cls()
+        acc.rows = int(data['rows'])
+        acc.columns = {col: RunningStats.from_dict(d) for col, d in data['columns'].items()}
+        acc.digests = {col: TDigest.from_dict(d) for col, d in data['digests'].items()}
+        acc.threshold_counts.update(data['threshold_counts'])
+        acc.battery = {headset_id: list(edge) for headset_id, edge in data['battery'].items()}
+        acc.scene_counts = dict(data.get('scene_counts', {}))
+        return acc
+
+
+def accumulate_file(csv_file: str, chunksize: int = 100_000) -> SummaryAccumulator:
+    """Fold one MetricsLogger CSV into a fresh accumulator, one chunk at a time."""
+    acc = SummaryAccumulator()
+    for chunk in iter_metrics_csv(csv_file, chunksize=chunksize):
+        acc.update(chunk)
+    return acc
+
+
+def stream_session_statistics(session_dir: str, chunksize: int = 100_000) -> dict:
+    """Calculate the session summary in constant memory by streaming every CSV in chunks."""
+    total = SummaryAccumulator()
+    for csv_file in find_session_csvs(session_dir):
+        try:
+            acc = accumulate_file(csv_file, chunksize)
+            total.merge(acc)
+            print(f"  Streamed: {csv_file} ({acc.rows} rows)")
+        except Exception as e:
+            print(f"  Error loading {csv_file}: {e}")
+    return total.to_statistics()
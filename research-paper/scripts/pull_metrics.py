@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+pull_metrics.py - Pull MetricsLogger files from all connected headsets concurrently.
+
+A Python counterpart of extract_metrics.sh that produces the same layout
+(<root>/<session>/H<k>/ with device_info.json, and session_info.json) but
+works on all devices at once. Every adb call runs as a subprocess in one
+thread pool:
+
+- each device is probed with a single `adb shell` call for its model,
+  Android version and battery level, and a second one that stats the whole
+  metrics folder (size and mtime of every file);
+- a file is only pulled when no local copy with the same size and mtime
+  exists, so re-running after a play-test fetches just the new sessions;
+- a pull is written to a temporary name, stamped with the remote mtime and
+  renamed into place, so an interrupted run never leaves a truncated CSV.
+
+A headset keeps its H<k> folder across runs (matched by the serial in its
+device_info.json). When every pull is done, session_index.py's index is
+updated in one transaction.
+
+The adb command can be replaced with --adb (or the ADB environment
+variable), e.g. with fake_adb.py to try the puller without headsets.
+
+Usage:
+    python pull_metrics.py [session_name] [--root DIR] [--jobs 8] [--adb CMD] [--no-index]
+
+Example:
+    FAKE_ADB_ROOT=/tmp/devices python pull_metrics.py test --adb "python fake_adb.py" --root /tmp/sessions
+"""
+
+import os
+import sys
+import glob
+import json
+import shlex
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from session_index import DEFAULT_SESSIONS_ROOT, update_index
+
+
+PACKAGE_NAME = 'com.jJFiisJ.ArenaShooting'
+REMOTE_METRICS_DIR = f'/sdcard/Android/data/{PACKAGE_NAME}/files/metrics'
+
+ADB_SEARCH_PATHS = [
+    os.path.expanduser('~/Android/Sdk/platform-tools/adb'),
+    '/opt/android-sdk/platform-tools/adb',
+    os.path.expanduser('~/AppData/Local/Android/Sdk/platform-tools/adb.exe'),
+]
+
+DEFAULT_JOBS = 8
+ADB_TIMEOUT_SEC = 120
+
+# One round trip per device for everything device_info.json records
+DEVICE_INFO_COMMAND = ('getprop ro.product.model; getprop ro.build.version.release; '
+                       'dumpsys battery | grep level')
+
+
+def find_adb(command: str = None) -> list:
+    """The adb command as an argument list, or None when adb is not found."""
+    command = command or os.environ.get('ADB')
+    if command:
+        return shlex.split(command)
+    found = shutil.which('adb')
+    if found:
+        return [found]
+    for path in ADB_SEARCH_PATHS:
+        if os.path.isfile(path):
+            return [path]
+    return None
+
+
+def run_adb(adb: list, *args, serial: str = None, timeout: float = ADB_TIMEOUT_SEC) -> subprocess.CompletedProcess:
+    command = adb + (['-s', serial] if serial else []) + list(args)
+    return subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+
+
+def list_devices(adb: list) -> list:
+    """Serials of the devices in the 'device' state, in `adb devices` order."""
+    result = run_adb(adb, 'devices')
+    devices = []
+    for line in result.stdout.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) == 2 and fields[1] == 'device':
+            devices.append(fields[0])
+    return devices
+
+
+def device_info(adb: list, serial: str) -> dict:
+    lines = [line.strip() for line in run_adb(adb, 'shell', DEVICE_INFO_COMMAND, serial=serial).stdout.splitlines()]
+    lines += [''] * (3 - len(lines))
+    return {
+        'serial': serial,
+        'model': lines[0],
+        'androidVersion': lines[1],
+        'batteryLevel': lines[2],
+        'extractedAt': datetime.now().astimezone().isoformat(timespec='seconds'),
+    }
+
+
+def list_remote_files(adb: list, serial: str, remote_dir: str = REMOTE_METRICS_DIR) -> dict:
+    """file name -> (size, mtime) of every file in ``remote_dir``, from one stat call."""
+    command = f"cd {shlex.quote(remote_dir)} 2>/dev/null && stat -c '%s %Y %n' * 2>/dev/null"
+    files = {}
+    for line in run_adb(adb, 'shell', command, serial=serial).stdout.splitlines():
+        fields = line.strip().split(' ', 2)
+        if len(fields) == 3 and fields[0].isdigit() and fields[1].isdigit():
+            files[fields[2]] = (int(fields[0]), int(fields[1]))
+    return files
+
+
+def is_current(local_path: str, size: int, mtime: int) -> bool:
+    """True when the local copy has the remote file's size and mtime."""
+    try:
+        stat = os.stat(local_path)
+    except OSError:
+        return False
+    return stat.st_size == size and int(stat.st_mtime) == mtime
+
+
+def pull_file(adb: list, serial: str, remote_path: str, local_path: str, mtime: int) -> bool:
+    """Pull one file via a temporary name; returns True when it was written."""
+    tmp_path = local_path + '.part'
+    result = run_adb(adb, 'pull', remote_path, tmp_path, serial=serial)
+    if result.returncode != 0 or not os.path.exists(tmp_path):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    os.utime(tmp_path, (mtime, mtime))
+    os.replace(tmp_path, local_path)
+    return True
+
+
+def write_json(path: str, data: dict):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def assign_headset_dirs(session_dir: str, serials: list) -> dict:
+    """serial -> H<k> folder: the folder already holding its device_info.json, else the next free one."""
+    assigned = {}
+    used = set()
+    for info_path in glob.glob(os.path.join(session_dir, 'H*', 'device_info.json')):
+        name = os.path.basename(os.path.dirname(info_path))
+        try:
+            with open(info_path, 'r', encoding='utf-8-sig') as f:
+                serial = json.load(f).get('serial')
+        except (OSError, ValueError):
+            serial = None
+        if serial in serials:
+            assigned.setdefault(serial, name)
+    for headset_dir in glob.glob(os.path.join(session_dir, 'H*')):
+        name = os.path.basename(headset_dir)
+        if name[1:].isdigit():
+            used.add(int(name[1:]))
+
+    index = 1
+    for serial in serials:
+        if serial in assigned:
+            continue
+        while index in used:
+            index += 1
+        assigned[serial] = f"H{index}"
+        used.add(index)
+    return assigned
+
+
+def pull_session(adb: list, session_dir: str, jobs: int = DEFAULT_JOBS,
+                 remote_dir: str = REMOTE_METRICS_DIR) -> dict:
+    """Probe and pull every connected device concurrently; returns per-device counts."""
+    serials = list_devices(adb)
+    if not serials:
+        return {}
+    os.makedirs(session_dir, exist_ok=True)
+    headset_dirs = assign_headset_dirs(session_dir, serials)
+    results = {serial: {'headset_dir': headset_dirs[serial], 'files': 0, 'pulled': 0, 'skipped': 0, 'failed': 0}
+               for serial in serials}
+
+    def probe(serial):
+        return device_info(adb, serial), list_remote_files(adb, serial, remote_dir)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        probes = {pool.submit(probe, serial): serial for serial in serials}
+        pulls = {}
+        for future in as_completed(probes):
+            serial = probes[future]
+            headset_dir = os.path.join(session_dir, headset_dirs[serial])
+            os.makedirs(headset_dir, exist_ok=True)
+            try:
+                info, files = future.result()
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"  Error probing {serial}: {e}")
+                results[serial]['failed'] += 1
+                continue
+            write_json(os.path.join(headset_dir, 'device_info.json'), info)
+            print(f"  {headset_dirs[serial]} ({serial}, {info['model'] or 'unknown model'}): {len(files)} file(s)")
+
+            for name, (size, mtime) in sorted(files.items()):
+                local_path = os.path.join(headset_dir, name)
+                results[serial]['files'] += 1
+                if is_current(local_path, size, mtime):
+                    results[serial]['skipped'] += 1
+                    continue
+                future = pool.submit(pull_file, adb, serial, f"{remote_dir}/{name}", local_path, mtime)
+                pulls[future] = (serial, name)
+
+        for future in as_completed(pulls):
+            serial, name = pulls[future]
+            try:
+                pulled = future.result()
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"  Error pulling {name} from {serial}: {e}")
+                pulled = False
+            results[serial]['pulled' if pulled else 'failed'] += 1
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pull MetricsLogger files from all connected headsets concurrently.")
+    parser.add_argument("session_name", nargs="?", default=None, help="Session folder name (default: today, yyyyMMdd)")
+    parser.add_argument("--root", default=DEFAULT_SESSIONS_ROOT, help="Sessions root (default: research-paper/data/sessions)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Concurrent adb processes (default: {DEFAULT_JOBS})")
+    parser.add_argument("--adb", default=None, help="adb command (default: $ADB, adb on PATH or the SDK location)")
+    parser.add_argument("--no-index", action="store_true", help="Do not update the session index")
+    args = parser.parse_args()
+
+    adb = find_adb(args.adb)
+    if adb is None:
+        print("Error: ADB not found. Please install Android SDK platform-tools.")
+        sys.exit(1)
+
+    session_name = args.session_name or datetime.now().strftime('%Y%m%d')
+    session_dir = os.path.join(args.root, session_name)
+    print(f"Using ADB: {' '.join(adb)}")
+    print(f"Output directory: {session_dir}")
+
+    results = pull_session(adb, session_dir, max(args.jobs, 1))
+    if not results:
+        print("Error: No devices connected. Please connect your Meta Quest headset(s) via USB.")
+        sys.exit(1)
+
+    totals = {key: sum(r[key] for r in results.values()) for key in ('files', 'pulled', 'skipped', 'failed')}
+    write_json(os.path.join(session_dir, 'session_info.json'), {
+        'sessionName': session_name,
+        'extractedAt': datetime.now().astimezone().isoformat(timespec='seconds'),
+        'deviceCount': len(results),
+        'totalFilesExtracted': totals['pulled'] + totals['skipped'],
+        'filesPulled': totals['pulled'],
+        'filesUnchanged': totals['skipped'],
+        'filesFailed': totals['failed'],
+    })
+
+    print(f"\nPulled {totals['pulled']} file(s), {totals['skipped']} unchanged, {totals['failed']} failed "
+          f"from {len(results)} device(s)")
+    if not args.no_index:
+        counts = update_index(args.root)
+        print(f"Index updated: {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed")
+    if totals['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
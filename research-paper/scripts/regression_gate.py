@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+regression_gate.py - Compare app builds on real-device session metrics.
+
+Sessions are grouped by the appVersion (and optionally unityVersion) in
+their metadata, and a candidate build is compared with a baseline build on
+per-session summaries: mean FPS, latency p95/p99, mean calibration error
+and battery drain per hour. Each session counts once, because rows within a
+session are autocorrelated while sessions are independent runs.
+
+Each metric gets a one-sided Mann-Whitney U test (is the candidate worse
+than the baseline?), Cliff's delta and the Hodges-Lehmann shift (median of
+all candidate - baseline differences). A metric regresses when the shift is
+worse than its margin and the test is significant; the exit code is then 1
+(2 when a build has too few sessions to judge, including when no outcome
+with that many sessions could reach --alpha).
+
+The per-session summaries are kept in the session index (session_index.py)
+and only computed for sessions that are new or whose CSV changed, so the
+gate stays fast on large corpora.
+
+Usage:
+    python regression_gate.py --baseline 0.1 --candidate 0.2 [--by app|unity|both]
+                              [--margin latency_p95_ms=15] [--alpha 0.05] [--min-sessions 4]
+
+Example:
+    python regression_gate.py --candidate 0.2     # baseline: the previous build
+"""
+
+import os
+import sys
+import json
+import math
+import sqlite3
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from metrics_io import read_metrics_csv
+from session_index import DEFAULT_SESSIONS_ROOT, default_index_path, update_index, select_sessions
+
+
+# Gated metrics: name -> (direction in which it gets worse, default margin)
+GATE_METRICS = {
+    'fps_mean': (-1, 2.0),
+    'latency_p95_ms': (1, 10.0),
+    'latency_p99_ms': (1, 20.0),
+    'calibration_mean_mm': (1, 1.0),
+    'battery_drain_pct_per_hour': (1, 5.0),
+}
+
+SUMMARY_COLUMNS = ['samples', 'duration_min', 'fps_mean', 'fps_p5', 'latency_mean_ms', 'latency_p95_ms',
+                   'latency_p99_ms', 'calibration_mean_mm', 'battery_drain_pct_per_hour', 'temp_rise_c']
+
+SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_summaries (
+    csv_path TEXT PRIMARY KEY,
+    csv_size INTEGER,
+    {columns}
+);
+""".format(columns=',\n    '.join(f"{c} REAL" for c in SUMMARY_COLUMNS))
+
+BUILD_KEYS = {
+    'app': ['app_version'],
+    'unity': ['unity_version'],
+    'both': ['app_version', 'unity_version'],
+}
+
+EXIT_PASS, EXIT_REGRESSION, EXIT_INSUFFICIENT = 0, 1, 2
+
+
+def summarize_session(csv_path: str) -> dict:
+    """Per-session summary of one MetricsLogger CSV."""
+    df = read_metrics_csv(csv_path, columns=['timestamp_sec', 'frame_rate_fps', 'network_latency_ms',
+                                             'calibration_error_mm', 'battery_temp_c', 'battery_level'])
+    summary = dict.fromkeys(SUMMARY_COLUMNS, None)
+    summary['samples'] = len(df)
+    if df.empty:
+        return summary
+
+    def col(name):
+        return df[name].to_numpy(dtype=np.float64) if name in df.columns else np.array([np.nan])
+
+    t = col('timestamp_sec')
+    duration_h = (np.nanmax(t) - np.nanmin(t)) / 3600
+    fps, latency, battery, temp = col('frame_rate_fps'), col('network_latency_ms'), col('battery_level'), col('battery_temp_c')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary.update({
+            'duration_min': duration_h * 60,
+            'fps_mean': np.nanmean(fps),
+            'fps_p5': np.nanpercentile(fps, 5),
+            'latency_mean_ms': np.nanmean(latency),
+            'latency_p95_ms': np.nanpercentile(latency, 95),
+            'latency_p99_ms': np.nanpercentile(latency, 99),
+            'calibration_mean_mm': np.nanmean(col('calibration_error_mm')),
+            'battery_drain_pct_per_hour': (battery[0] - battery[-1]) / duration_h if duration_h > 0 else None,
+            'temp_rise_c': temp[-1] - temp[0],
+        })
+    # SQLite stores plain floats; NaN (an all-missing column) becomes NULL
+    return {k: (None if v is None or np.isnan(v) else float(v)) for k, v in summary.items()}
+
+
+def update_summaries(root: str = DEFAULT_SESSIONS_ROOT, index_path: str = None) -> dict:
+    """
+    Bring the session index and its per-session summaries up to date.
+
+    A summary is recomputed only when its CSV is new or changed size.
+    Returns counts of computed and removed summaries.
+    """
+    root = os.path.abspath(root)
+    index_path = index_path or default_index_path(root)
+    update_index(root, index_path)
+    counts = {'computed': 0, 'removed': 0}
+
+    conn = sqlite3.connect(index_path)
+    try:
+        with conn:
+            conn.executescript(SUMMARY_SCHEMA)
+            stale = conn.execute(
+                "SELECT s.csv_path, s.csv_size FROM sessions s LEFT JOIN session_summaries m "
+                "ON s.csv_path = m.csv_path WHERE m.csv_size IS NULL OR m.csv_size != s.csv_size").fetchall()
+            for csv_path, csv_size in stale:
+                try:
+                    summary = summarize_session(os.path.join(root, csv_path))
+                except Exception as e:
+                    print(f"  Error summarizing {csv_path}: {e}")
+                    continue
+                row = dict(csv_path=csv_path, csv_size=csv_size, **summary)
+                conn.execute(f"INSERT OR REPLACE INTO session_summaries ({', '.join(row)}) "
+                             f"VALUES ({', '.join('?' for _ in row)})", list(row.values()))
+                counts['computed'] += 1
+            counts['removed'] = conn.execute(
+                "DELETE FROM session_summaries WHERE csv_path NOT IN (SELECT csv_path FROM sessions)").rowcount
+    finally:
+        conn.close()
+    return counts
+
+
+def load_summaries(root: str = DEFAULT_SESSIONS_ROOT, index_path: str = None, **filters) -> pd.DataFrame:
+    """Indexed sessions (see select_sessions for ``filters``) joined with their summaries."""
+    root = os.path.abspath(root)
+    index_path = index_path or default_index_path(root)
+    sessions = select_sessions(root, index_path, **filters)
+    conn = sqlite3.connect(index_path)
+    try:
+        summaries = pd.read_sql_query("SELECT * FROM session_summaries", conn)
+    finally:
+        conn.close()
+    return sessions.merge(summaries.drop(columns='csv_size'), on='csv_path', how='inner')
+
+
+def build_labels(sessions: pd.DataFrame, by: str = 'app') -> pd.Series:
+    """Build label of every session, e.g. '0.1' or '0.1/6000.0.62f1'."""
+    keys = BUILD_KEYS[by]
+    return sessions[keys].fillna('unknown').astype(str).agg('/'.join, axis=1)
+
+
+def builds_in_order(sessions: pd.DataFrame, labels: pd.Series) -> list:
+    """Build labels ordered by their first session's start time."""
+    return list(sessions.groupby(labels)['start_ts'].min().sort_values().index)
+
+
+def min_p_value(n_baseline: int, n_candidate: int) -> float:
+    """Smallest one-sided Mann-Whitney p-value these sample sizes can give (complete separation)."""
+    return 1 / math.comb(n_baseline + n_candidate, n_baseline)
+
+
+def compare_metric(baseline: np.ndarray, candidate: np.ndarray, direction: int, margin: float,
+                   alpha: float) -> dict:
+    """Two-sample comparison of one metric's per-session values, tested in the ``direction`` it gets worse."""
+    baseline = baseline[~np.isnan(baseline)]
+    candidate = candidate[~np.isnan(candidate)]
+    result = {'n_baseline': len(baseline), 'n_candidate': len(candidate),
+              'baseline_median': np.median(baseline) if len(baseline) else np.nan,
+              'candidate_median': np.median(candidate) if len(candidate) else np.nan}
+    if not len(baseline) or not len(candidate):
+        return dict(result, shift=np.nan, cliffs_delta=np.nan, p_value=np.nan, regression=False)
+
+    u, p_value = stats.mannwhitneyu(candidate, baseline, alternative='greater' if direction > 0 else 'less')
+    shift = float(np.median(np.subtract.outer(candidate, baseline)))
+    result.update({
+        'shift': shift,
+        # P(candidate > baseline) - P(candidate < baseline), from U
+        'cliffs_delta': 2 * u / (len(candidate) * len(baseline)) - 1,
+        'p_value': p_value,
+        'regression': bool(direction * shift > margin and p_value < alpha),
+    })
+    return result
+
+
+def run_gate(sessions: pd.DataFrame, baseline: str, candidate: str, by: str = 'app',
+             margins: dict = None, alpha: float = 0.05) -> pd.DataFrame:
+    """Compare every gated metric of ``candidate`` against ``baseline``; one row per metric."""
+    margins = margins or {}
+    labels = build_labels(sessions, by)
+    base, cand = sessions[labels == baseline], sessions[labels == candidate]
+    rows = []
+    for metric, (direction, default_margin) in GATE_METRICS.items():
+        margin = margins.get(metric, default_margin)
+        result = compare_metric(base[metric].to_numpy(dtype=np.float64), cand[metric].to_numpy(dtype=np.float64),
+                                direction, margin, alpha)
+        rows.append(dict(metric=metric, worse='higher' if direction > 0 else 'lower', margin=margin, **result))
+    return pd.DataFrame(rows)
+
+
+def _parse_margins(values: list) -> dict:
+    margins = {}
+    for value in values or []:
+        name, _, number = value.partition('=')
+        if name not in GATE_METRICS or not number:
+            raise ValueError(f"Invalid margin '{value}' (expected one of {', '.join(GATE_METRICS)}=VALUE)")
+        margins[name] = float(number)
+    return margins
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gate a candidate build against a baseline build on session metrics.")
+    parser.add_argument("--root", default=DEFAULT_SESSIONS_ROOT, help="Sessions root (default: research-paper/data/sessions)")
+    parser.add_argument("--index", default=None, help="Index file (default: <root>/session_index.sqlite)")
+    parser.add_argument("--by", choices=list(BUILD_KEYS), default='app',
+                        help="Group sessions by appVersion, unityVersion or both (default: app)")
+    parser.add_argument("--baseline", help="Baseline build (default: the build before the candidate)")
+    parser.add_argument("--candidate", help="Candidate build (default: the most recent build)")
+    parser.add_argument("--margin", action="append", metavar="METRIC=VALUE",
+                        help="Allowed worsening of a metric before it fails, e.g. latency_p95_ms=15 (repeatable)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level (default: 0.05)")
+    parser.add_argument("--min-sessions", type=int, default=4, help="Sessions needed per build (default: 4)")
+    parser.add_argument("--min-duration", type=float, default=5.0,
+                        help="Ignore sessions shorter than this many minutes (default: 5)")
+    parser.add_argument("--output", help="Write the comparison to this JSON file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"Error: Directory not found: {args.root}")
+        sys.exit(EXIT_INSUFFICIENT)
+    try:
+        margins = _parse_margins(args.margin)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(EXIT_INSUFFICIENT)
+
+    counts = update_summaries(args.root, args.index)
+    print(f"Session summaries: {counts['computed']} computed, {counts['removed']} removed")
+    sessions = load_summaries(args.root, args.index, min_duration=args.min_duration)
+    if sessions.empty:
+        print("No sessions to compare.")
+        sys.exit(EXIT_INSUFFICIENT)
+
+    labels = build_labels(sessions, args.by)
+    builds = builds_in_order(sessions, labels)
+    candidate = args.candidate or builds[-1]
+    baseline = args.baseline
+    if baseline is None and candidate in builds and builds.index(candidate) > 0:
+        baseline = builds[builds.index(candidate) - 1]
+
+    print("Builds: " + ", ".join(f"{b} ({(labels == b).sum()} sessions)" for b in builds))
+    n_base, n_cand = int((labels == baseline).sum()), int((labels == candidate).sum())
+    if baseline is None or min(n_base, n_cand) < args.min_sessions:
+        print(f"Not enough sessions to compare: baseline {baseline} has {n_base}, candidate {candidate} has {n_cand} "
+              f"(need {args.min_sessions} each)")
+        sys.exit(EXIT_INSUFFICIENT)
+    if min_p_value(n_base, n_cand) >= args.alpha:
+        print(f"Not enough sessions to compare: with {n_base} baseline and {n_cand} candidate sessions "
+              f"the smallest possible p-value is {min_p_value(n_base, n_cand):.3g} (alpha {args.alpha:g})")
+        sys.exit(EXIT_INSUFFICIENT)
+
+    result = run_gate(sessions, baseline, candidate, args.by, margins, args.alpha)
+    print(f"\n{f' {candidate} vs {baseline} ':=^60}")
+    for _, row in result.iterrows():
+        status = 'REGRESSION' if row['regression'] else 'ok'
+        print(f"  {row['metric']:<28} {row['baseline_median']:>9.2f} -> {row['candidate_median']:>9.2f} "
+              f"shift {row['shift']:+8.2f} (margin {row['margin']:g}, {row['worse']} is worse) "
+              f"delta {row['cliffs_delta']:+.2f} p={row['p_value']:.3g}  {status}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'baseline': baseline, 'candidate': candidate, 'by': args.by, 'alpha': args.alpha,
+                       'metrics': result.to_dict('records')}, f, indent=2)
+        print(f"\nComparison saved to: {args.output}")
+
+    regressions = result.loc[result['regression'], 'metric'].tolist()
+    if regressions:
+        print(f"\nFAIL: {candidate} regresses {', '.join(regressions)}")
+        sys.exit(EXIT_REGRESSION)
+    print(f"\nPASS: {candidate} has no regression against {baseline}")
+
+
+if __name__ == '__main__':
+    main()
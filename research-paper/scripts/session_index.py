@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+session_index.py - SQLite index over MetricsLogger sessions.
+
+Every MetricsLogger CSV has a *_metadata.json next to it with the session id,
+headset id, start/end time, duration, sample count and app version. This
+script records those fields in a SQLite index so sessions can be selected by
+date range, headset, app version or minimum duration without opening any CSV.
+
+The index updates incrementally: the folders are only stat'ed, and a session
+is re-read only when its CSV size or metadata mtime changed.
+
+Usage:
+    python session_index.py [--root DIR] [--rebuild] [--since DATE] [--until DATE]
+                            [--headset ID] [--app-version V] [--min-duration MIN] [--paths]
+
+Example:
+    python session_index.py --since 2025-12-08 --headset H_4193 --min-duration 5
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+
+import pandas as pd
+
+
+DEFAULT_SESSIONS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'sessions')
+INDEX_FILENAME = 'session_index.sqlite'
+
+# MetricsLogger file name: session_<yyyyMMdd_HHmmss>_<headsetId>.csv; metrics_collector.py
+# continues rotated sessions in session_<...>_<headsetId>_part<k>.csv
+SESSION_FILE_RE = re.compile(r'^session_(\d{8}_\d{6})_(.+?)(?:_part\d+)?\.csv$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    csv_path TEXT PRIMARY KEY,
+    session_folder TEXT,
+    session_id TEXT,
+    headset_id TEXT,
+    device_name TEXT,
+    device_model TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    start_ts REAL,
+    end_ts REAL,
+    session_date TEXT,
+    duration_minutes REAL,
+    total_metrics INTEGER,
+    app_version TEXT,
+    unity_version TEXT,
+    has_metadata INTEGER,
+    csv_size INTEGER,
+    metadata_mtime REAL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions (session_date);
+CREATE INDEX IF NOT EXISTS idx_sessions_headset ON sessions (headset_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_app ON sessions (app_version);
+"""
+
+
+def default_index_path(root: str) -> str:
+    return os.path.join(root, INDEX_FILENAME)
+
+
+def parse_timestamp(value: str):
+    """Parse an ISO-8601 time as written by C# ("o" format, 7 fractional digits)."""
+    if not value:
+        return None
+    # datetime only accepts microseconds, so trim the 100 ns digit
+    value = re.sub(r'(\.\d{6})\d+', r'\1', value.strip())
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _session_row(root: str, csv_path: str) -> dict:
+    """Build the index row for one CSV from its metadata JSON (or its file name)."""
+    rel_path = os.path.relpath(csv_path, root)
+    meta_path = csv_path[:-len('.csv')] + '_metadata.json'
+    row = {
+        'csv_path': rel_path,
+        'session_folder': rel_path.split(os.sep)[0],
+        'csv_size': os.path.getsize(csv_path),
+        'has_metadata': 0,
+        'metadata_mtime': None,
+    }
+
+    match = SESSION_FILE_RE.match(os.path.basename(csv_path))
+    if match:
+        row['session_id'], row['headset_id'] = match.groups()
+        start = datetime.strptime(row['session_id'], '%Y%m%d_%H%M%S')
+        row['start_time'] = start.isoformat()
+        row['start_ts'] = start.timestamp()
+        row['session_date'] = start.date().isoformat()
+
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8-sig') as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  Error reading {meta_path}: {e}")
+            return row
+        start = parse_timestamp(meta.get('startTime'))
+        end = parse_timestamp(meta.get('endTime'))
+        row.update({
+            'session_id': meta.get('sessionId', row.get('session_id')),
+            'headset_id': meta.get('headsetId', row.get('headset_id')),
+            'device_name': meta.get('deviceName'),
+            'device_model': meta.get('deviceModel'),
+            'start_time': meta.get('startTime', row.get('start_time')),
+            'end_time': meta.get('endTime'),
+            'start_ts': start.timestamp() if start else row.get('start_ts'),
+            'end_ts': end.timestamp() if end else None,
+            'session_date': start.date().isoformat() if start else row.get('session_date'),
+            'duration_minutes': meta.get('durationMinutes'),
+            'total_metrics': meta.get('totalMetrics'),
+            'app_version': meta.get('appVersion'),
+            'unity_version': meta.get('unityVersion'),
+            'has_metadata': 1,
+            'metadata_mtime': os.path.getmtime(meta_path),
+        })
+    return row
+
+
+def _upsert(conn: sqlite3.Connection, row: dict):
+    columns = ', '.join(row)
+    placeholders = ', '.join('?' for _ in row)
+    conn.execute(f"INSERT OR REPLACE INTO sessions ({columns}) VALUES ({placeholders})", list(row.values()))
+
+
+def update_index(root: str = DEFAULT_SESSIONS_ROOT, index_path: str = None, rebuild: bool = False) -> dict:
+    """
+    Bring the index up to date with the session folders under ``root``.
+
+    Files are only stat'ed; a session is re-read when it is new or its CSV
+    size or metadata mtime changed, and sessions whose CSV disappeared are
+    dropped. Returns counts of added, updated and removed sessions.
+    """
+    root = os.path.abspath(root)
+    index_path = index_path or default_index_path(root)
+    counts = {'added': 0, 'updated': 0, 'removed': 0}
+
+    conn = sqlite3.connect(index_path)
+    try:
+        with conn:
+            if rebuild:
+                conn.execute("DROP TABLE IF EXISTS sessions")
+            conn.executescript(SCHEMA)
+
+            indexed = {path: (meta_mtime, size) for path, meta_mtime, size in
+                       conn.execute("SELECT csv_path, metadata_mtime, csv_size FROM sessions")}
+            present = set()
+
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if not (name.endswith('.csv') and name.startswith('session_')):
+                        continue
+                    csv_path = os.path.join(dirpath, name)
+                    rel_path = os.path.relpath(csv_path, root)
+                    present.add(rel_path)
+
+                    meta_path = csv_path[:-len('.csv')] + '_metadata.json'
+                    meta_mtime = os.path.getmtime(meta_path) if os.path.exists(meta_path) else None
+                    if indexed.get(rel_path) == (meta_mtime, os.path.getsize(csv_path)):
+                        continue
+                    _upsert(conn, _session_row(root, csv_path))
+                    counts['updated' if rel_path in indexed else 'added'] += 1
+
+            for rel_path in set(indexed) - present:
+                conn.execute("DELETE FROM sessions WHERE csv_path = ?", (rel_path,))
+                counts['removed'] += 1
+    finally:
+        conn.close()
+
+    return counts
+
+
+def select_sessions(root: str = DEFAULT_SESSIONS_ROOT, index_path: str = None,
+                    since: str = None, until: str = None, headset: str = None,
+                    app_version: str = None, min_duration: float = None,
+                    session_folder: str = None) -> pd.DataFrame:
+    """
+    Select indexed sessions without opening any CSV.
+
+    ``since``/``until`` are inclusive ISO dates compared against the session's
+    start date. The returned frame has an absolute ``path`` column.
+    """
+    root = os.path.abspath(root)
+    index_path = index_path or default_index_path(root)
+
+    clauses, params = [], []
+    if since:
+        clauses.append("session_date >= ?")
+        params.append(since)
+    if until:
+        clauses.append("session_date <= ?")
+        params.append(until)
+    if headset:
+        clauses.append("headset_id = ?")
+        params.append(headset)
+    if app_version:
+        clauses.append("app_version = ?")
+        params.append(app_version)
+    if min_duration is not None:
+        clauses.append("duration_minutes >= ?")
+        params.append(min_duration)
+    if session_folder:
+        clauses.append("session_folder = ?")
+        params.append(session_folder)
+
+    query = "SELECT * FROM sessions"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY start_ts, csv_path"
+
+    conn = sqlite3.connect(index_path)
+    try:
+        sessions = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+    sessions.insert(0, 'path', [os.path.join(root, p) for p in sessions['csv_path']])
+    return sessions
+
+
+def latest_session_folder(root: str = DEFAULT_SESSIONS_ROOT, index_path: str = None):
+    """Return the most recent session folder name in the index, or None."""
+    root = os.path.abspath(root)
+    conn = sqlite3.connect(index_path or default_index_path(root))
+    try:
+        row = conn.execute("SELECT MAX(session_folder) FROM sessions").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index MetricsLogger sessions and select them by metadata.")
+    parser.add_argument("--root", default=DEFAULT_SESSIONS_ROOT, help="Sessions root (default: research-paper/data/sessions)")
+    parser.add_argument("--index", default=None, help="Index file (default: <root>/session_index.sqlite)")
+    parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild the index from scratch")
+    parser.add_argument("--since", help="Earliest session start date (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--until", help="Latest session start date (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--headset", help="Headset id, e.g. H_4193")
+    parser.add_argument("--app-version", help="appVersion from the metadata")
+    parser.add_argument("--min-duration", type=float, help="Minimum duration in minutes")
+    parser.add_argument("--paths", action="store_true", help="Print only the matching CSV paths")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"Error: Directory not found: {args.root}")
+        sys.exit(1)
+
+    counts = update_index(args.root, args.index, rebuild=args.rebuild)
+    sessions = select_sessions(args.root, args.index, since=args.since, until=args.until,
+                               headset=args.headset, app_version=args.app_version,
+                               min_duration=args.min_duration)
+
+    if args.paths:
+        for path in sessions['path']:
+            print(path)
+        return
+
+    print(f"Index updated: {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed")
+    print(f"{len(sessions)} matching session file(s)")
+    if not sessions.empty:
+        columns = ['csv_path', 'headset_id', 'session_date', 'duration_minutes', 'total_metrics', 'app_version']
+        print(sessions[columns].to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
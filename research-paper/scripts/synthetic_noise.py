@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+synthetic_noise.py - Noise models for generate_synthetic_client.py.
+
+A noise model is fitted to a source session and then turns the source's
+series into ``n`` synthetic variants at once, as (n, samples) arrays drawn
+from a seeded np.random.Generator. Every model costs O(samples) per headset.
+
+'iid' reproduces the original generator: independent Gaussian jitter and
+independent 5% latency spikes.
+
+'correlated' splits each source series into a rolling-median trend and a
+residual, and fits the residual as AR(1) noise plus Markov-modulated bursts
+(latency spikes, FPS dips) whose entry/exit rates and magnitudes come from
+the source. Temperature gets a slow per-headset thermal drift, and FPS is
+lowered by the source's FPS-per-degree slope wherever a synthetic headset
+runs hotter than the source.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+
+# Series a noise model varies; the rest of the source is copied unchanged
+NOISE_COLUMNS = ['frame_rate_fps', 'network_latency_ms', 'calibration_error_mm', 'battery_temp_c', 'battery_level']
+
+
+def ar1_noise(rng: np.random.Generator, shape: tuple, phi: float, sigma: float) -> np.ndarray:
+    """Stationary AR(1) noise with lag-1 correlation ``phi`` and std ``sigma`` along the last axis."""
+    if sigma <= 0:
+        return np.zeros(shape)
+    z = rng.normal(0, sigma * np.sqrt(1 - phi ** 2), shape)
+    z[..., 0] = rng.normal(0, sigma, shape[:-1])
+    return lfilter([1.0], [1.0, -phi], z, axis=-1)
+
+
+def markov_bursts(rng: np.random.Generator, n: int, length: int, p_enter: float, p_exit: float) -> np.ndarray:
+    """
+    Boolean (n, length) burst states of a two-state Markov chain.
+
+    Run lengths are drawn as geometric variables, so the cost is O(length)
+    per row whatever the transition probabilities.
+    """
+    states = np.zeros((n, length), dtype=bool)
+    if p_enter <= 0:
+        return states
+    p_exit = max(p_exit, 1.0 / length)
+    expected_runs = int(length * p_enter) + 2
+    for row in range(n):
+        in_burst = rng.random() < p_enter / (p_enter + p_exit)
+        runs, total = [], 0
+        while total < length:
+            calm = rng.geometric(p_enter, expected_runs)
+            burst = rng.geometric(p_exit, expected_runs)
+            pairs = np.column_stack([burst, calm] if in_burst else [calm, burst]).ravel()
+            runs.append(pairs)
+            total += pairs.sum()
+        runs = np.concatenate(runs)
+        flags = np.resize([in_burst, not in_burst], len(runs))
+        states[row] = np.repeat(flags, runs)[:length]
+    return states
+
+
+class SeriesNoise:
+    """Trend + AR(1) residual + Markov bursts, fitted to one source series."""
+
+    def __init__(self, window: int = 31, direction: int = 1, threshold: float = 3.0):
+        self.window = window
+        self.direction = direction
+        self.threshold = threshold
+        self.phi = 0.0
+        self.sigma = 0.0
+        self.p_enter = 0.0
+        self.p_exit = 1.0
+        self.excess = np.zeros(0)
+
+    def trend(self, values: np.ndarray) -> np.ndarray:
+        return pd.Series(values).rolling(self.window, center=True, min_periods=1).median().to_numpy()
+
+    def fit(self, values: np.ndarray) -> 'SeriesNoise':
+        values = np.asarray(values, dtype=np.float64)
+        residual = values - self.trend(values)
+        mad = 1.4826 * np.median(np.abs(residual - np.median(residual)))
+        bursts = self.direction * residual > self.threshold * mad if mad > 0 else np.zeros(len(values), bool)
+
+        if bursts.any():
+            calm_before, burst_before = ~bursts[:-1], bursts[:-1]
+            self.p_enter = (calm_before & bursts[1:]).sum() / max(calm_before.sum(), 1)
+            self.p_exit = (burst_before & ~bursts[1:]).sum() / max(burst_before.sum(), 1)
+            self.excess = residual[bursts]
+
+        calm = residual.copy()
+        calm[bursts] = 0.0
+        if len(calm) > 2 and calm.std() > 0:
+            self.phi = float(np.clip(np.corrcoef(calm[:-1], calm[1:])[0, 1], 0.0, 0.99))
+            self.sigma = float(calm[~bursts].std())
+        return self
+
+    def simulate(self, values: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+        """``n`` variants of ``values``: its trend plus freshly drawn residuals."""
+        trend = self.trend(np.asarray(values, dtype=np.float64))
+        out = trend + ar1_noise(rng, (n, len(trend)), self.phi, self.sigma)
+        if len(self.excess):
+            bursts = markov_bursts(rng, n, len(trend), self.p_enter, self.p_exit)
+            out[bursts] += rng.choice(self.excess, size=int(bursts.sum()))
+        return out
+
+
+class NoiseModel:
+    """Base class: ``fit`` to a source frame, then ``apply`` to its (tiled) series."""
+
+    name = None
+
+    @classmethod
+    def fit(cls, source: pd.DataFrame) -> 'NoiseModel':
+        return cls()
+
+    def apply(self, base: dict, n: int, rng: np.random.Generator) -> dict:
+        """Return (n, samples) arrays for NOISE_COLUMNS from the 1-D ``base`` series."""
+        raise NotImplementedError
+
+
+class IIDNoise(NoiseModel):
+    """The original jitter: independent Gaussian noise and 5% latency spikes."""
+
+    name = 'iid'
+
+    def apply(self, base: dict, n: int, rng: np.random.Generator) -> dict:
+        shape = (n, len(base['frame_rate_fps']))
+        # 1. Frame Rate: small jitter, clamped to a reasonable range
+        fps = np.clip(base['frame_rate_fps'] + rng.normal(0, 0.5, shape), 30, 75)
+        # 2. Network Latency: jitter with a 2ms bias, plus occasional 20-50ms spikes
+        spikes = (rng.random(shape) < 0.05) * rng.uniform(20, 50, shape)
+        latency = np.clip(base['network_latency_ms'] + rng.normal(2, 5, shape) + spikes, 1, None)
+        # 3. Calibration Error: small drift; error is a magnitude
+        calibration = np.abs(base['calibration_error_mm'] + rng.normal(0, 1.5, shape))
+        # 4. Battery Temp: start slightly different, trend similarly
+        temp = base['battery_temp_c'] + rng.uniform(-1.0, 1.0, (n, 1))
+        # 5. Battery Level: start slightly different
+        battery = np.clip(base['battery_level'] + rng.integers(-5, 5, (n, 1)), 0, 100)
+        return {'frame_rate_fps': fps, 'network_latency_ms': latency, 'calibration_error_mm': calibration,
+                'battery_temp_c': temp, 'battery_level': battery}
+
+
+class CorrelatedNoise(NoiseModel):
+    """Autocorrelated, bursty noise with temperature-coupled FPS, fitted to the source."""
+
+    name = 'correlated'
+
+    # Time constant of the synthetic thermal drift, in samples (~1 Hz logging)
+    THERMAL_TAU = 600
+
+    def __init__(self):
+        self.fps = SeriesNoise(direction=-1)
+        self.latency = SeriesNoise(direction=1)
+        self.calibration = SeriesNoise(window=61, direction=1)
+        self.fps_per_degree = 0.0
+        self.fps_max = 75.0
+        self.thermal_sigma = 0.5
+
+    @classmethod
+    def fit(cls, source: pd.DataFrame) -> 'CorrelatedNoise':
+        model = cls()
+        fps = source['frame_rate_fps'].to_numpy(dtype=np.float64)
+        temp = source['battery_temp_c'].to_numpy(dtype=np.float64)
+        model.fps.fit(fps)
+        model.latency.fit(source['network_latency_ms'].to_numpy(dtype=np.float64))
+        model.calibration.fit(source['calibration_error_mm'].to_numpy(dtype=np.float64))
+        model.fps_max = float(np.nanmax(fps))
+
+        if np.ptp(temp) > 0:
+            # A hotter headset never gains frames: keep only a negative slope
+            model.fps_per_degree = min(float(np.polyfit(temp, model.fps.trend(fps), 1)[0]), 0.0)
+            slow = pd.Series(temp).rolling(cls.THERMAL_TAU, center=True, min_periods=1).mean().to_numpy()
+            model.thermal_sigma = max(float(np.std(temp - slow)), 0.1)
+        return model
+
+    def apply(self, base: dict, n: int, rng: np.random.Generator) -> dict:
+        length = len(base['frame_rate_fps'])
+
+        # Slow thermal drift around a per-headset offset
+        drift = ar1_noise(rng, (n, length), np.exp(-1.0 / self.THERMAL_TAU), self.thermal_sigma)
+        temp_delta = rng.uniform(-1.0, 1.0, (n, 1)) + drift
+        temp = base['battery_temp_c'] + temp_delta
+
+        # Only a headset running hotter than its source loses frames; a cooler one gains none
+        fps = self.fps.simulate(base['frame_rate_fps'], n, rng) + self.fps_per_degree * np.maximum(temp_delta, 0)
+        latency = self.latency.simulate(base['network_latency_ms'], n, rng)
+        calibration = np.abs(self.calibration.simulate(base['calibration_error_mm'], n, rng))
+        battery = np.clip(base['battery_level'] + rng.integers(-5, 5, (n, 1)), 0, 100)
+        return {'frame_rate_fps': np.clip(fps, 1, self.fps_max), 'network_latency_ms': np.clip(latency, 1, None),
+                'calibration_error_mm': calibration, 'battery_temp_c': temp, 'battery_level': battery}
+
+
+NOISE_MODELS = {model.name: model for model in (IIDNoise, CorrelatedNoise)}